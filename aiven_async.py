@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asyncio Execution Mode for the Aiven Admin Scripts
+Runs the existing cursor-based course logic over an aiomysql pool so many courses' I/O overlaps.
+The course bodies stay synchronous: each runs on a thread of the pool's own executor, sized to the
+pool, and its queries are handed to the event loop. Threads remain the unit of concurrency here.
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from aiven_db import AIVEN_CONFIG, is_transient, retry_delay
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+DEFAULT_CONCURRENCY = 8
+RETRIES = 3
+
+def require_aiomysql():
+    if aiomysql is None:
+        raise RuntimeError("The async mode needs aiomysql: pip install aiomysql")
+
+def aiomysql_config(config=None):
+    """Translate AIVEN_CONFIG (pymysql keyword names) into aiomysql.connect arguments"""
+    config = dict(config or AIVEN_CONFIG)
+    return {
+        "host": config["host"],
+        "port": config["port"],
+        "user": config["user"],
+        "password": config["password"],
+        "db": config["db"],
+        "charset": config.get("charset", "utf8mb4"),
+        "connect_timeout": config.get("connect_timeout"),
+        "cursorclass": aiomysql.DictCursor,
+    }
+
+async def create_pool(maxsize=DEFAULT_CONCURRENCY, config=None, on_connect=None):
+    """aiomysql pool plus a dedicated executor with one thread per connection.
+
+    The default executor is capped at min(32, cpus + 4) threads and shared
+    with everything else on the loop, which would silently limit how many
+    course bodies run at once; close_pool() shuts this one down.
+    on_connect, as for aiven_db.ConnectionPool, is called with the seconds
+    each new connection took (see acquire()).
+    """
+    require_aiomysql()
+    # minsize=0: every connection is opened by an acquire(), which can time it
+    pool = await aiomysql.create_pool(minsize=0, maxsize=maxsize, pool_recycle=3600,
+                                      autocommit=False, **aiomysql_config(config))
+    pool.executor = ThreadPoolExecutor(max_workers=maxsize, thread_name_prefix="aiven-async")
+    pool.on_connect = on_connect
+    pool.known_connections = weakref.WeakSet()
+    return pool
+
+class acquire:
+    """pool.acquire() that reports new connections to pool.on_connect and
+    closes a connection that failed with a transient error, so the pool
+    drops it instead of handing it out again"""
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._connection = None
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        self._connection = await self._pool.acquire()
+        known = getattr(self._pool, "known_connections", None)
+        if known is not None and self._connection not in known:
+            known.add(self._connection)
+            if self._pool.on_connect:
+                self._pool.on_connect(time.perf_counter() - started)
+        return self._connection
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc is not None and is_transient(exc):
+            self._connection.close()
+        await self._pool.release(self._connection)
+
+class BridgedCursor:
+    """Synchronous cursor facade over an aiomysql cursor.
+
+    Lets functions written against a pymysql cursor (update_course,
+    sync_course, iter_courses...) run unchanged in a worker thread while the
+    actual network I/O happens on the event loop. Must not be used from the
+    event loop thread itself.
+    """
+
+    def __init__(self, loop, cursor, connection=None):
+        self._loop = loop
+        self._cursor = cursor
+        self.connection = connection
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def execute(self, sql, args=None):
+        return self._call(_invoke(self._cursor.execute, sql, args))
+
+    def executemany(self, sql, args):
+        return self._call(_invoke(self._cursor.executemany, sql, args))
+
+    def fetchone(self):
+        return self._call(_invoke(self._cursor.fetchone))
+
+    def fetchmany(self, size=None):
+        return self._call(_invoke(self._cursor.fetchmany, size))
+
+    def fetchall(self):
+        return self._call(_invoke(self._cursor.fetchall))
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._call(_invoke(self._cursor.close))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class BridgedConnection:
+    """Synchronous connection facade over an aiomysql connection (see BridgedCursor)"""
+
+    def __init__(self, loop, connection):
+        self._loop = loop
+        self._connection = connection
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def cursor(self, cursorclass=None):
+        if cursorclass is not None:
+            # Map pymysql cursor classes onto their aiomysql equivalents by name
+            cursorclass = getattr(aiomysql, cursorclass.__name__)
+        args = (cursorclass,) if cursorclass else ()
+        cursor = self._call(_invoke(self._connection.cursor, *args))
+        return BridgedCursor(self._loop, cursor, self)
+
+    def commit(self):
+        self._call(_invoke(self._connection.commit))
+
+    def rollback(self):
+        self._call(_invoke(self._connection.rollback))
+
+async def _invoke(method, *args):
+    # Call on the loop thread: aiomysql returns plain values or futures from
+    # buffered cursors and coroutines from unbuffered ones
+    value = method(*args)
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+def _run_in_thread(loop, pool, fn, *args, **kwargs):
+    # Pools from create_pool() carry their own executor; None falls back to the loop default
+    return loop.run_in_executor(getattr(pool, "executor", None), functools.partial(fn, *args, **kwargs))
+
+async def with_retry(fn, retries=RETRIES, base_delay=0.5, max_delay=8.0):
+    """Await fn(), retrying transient errors like aiven_db.with_retry does"""
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt >= retries or not is_transient(e):
+                raise
+            delay = retry_delay(attempt, base_delay, max_delay)
+            print(f"⚠️ Transient database error ({e}); retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+async def run_in_transaction(pool, fn, *args, retries=RETRIES, **kwargs):
+    """Run fn(cursor, *args) on the pool's executor against a pooled aiomysql connection, in one transaction.
+
+    Like aiven_db.ConnectionPool.run_in_transaction, the whole transaction
+    is retried on a fresh connection when it fails with a transient error.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def attempt():
+        async with acquire(pool) as connection:
+            await connection.begin()
+            cursor = await connection.cursor()
+            try:
+                result = await _run_in_thread(loop, pool, fn, BridgedCursor(loop, cursor), *args, **kwargs)
+                await connection.commit()
+                return result
+            except BaseException as e:
+                if not is_transient(e):
+                    await connection.rollback()
+                raise
+            finally:
+                if not connection.closed:
+                    await cursor.close()
+
+    return await with_retry(attempt, retries)
+
+async def run_with_connection(pool, fn, *args, **kwargs):
+    """Run fn(connection, *args) on the pool's executor against a pooled aiomysql connection"""
+    loop = asyncio.get_running_loop()
+    async with acquire(pool) as connection:
+        return await _run_in_thread(loop, pool, fn, BridgedConnection(loop, connection), *args, **kwargs)
+
+async def gather_limited(coros, concurrency=DEFAULT_CONCURRENCY):
+    """Await coroutines with at most `concurrency` of them in flight, keeping order"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(limited(c) for c in coros))
+
+async def close_pool(pool):
+    pool.close()
+    await pool.wait_closed()
+    executor = getattr(pool, "executor", None)
+    if executor is not None:
+        executor.shutdown(wait=True)
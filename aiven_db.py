@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared Aiven MySQL Connection Layer
+Pooled, health-checked connections with retries and transactions for the admin scripts
+"""
+
+import pymysql
+import os
+import re
+import time
+import queue
+import random
+import threading
+from contextlib import contextmanager
+
+# Try to load from .env, but don't fail if it doesn't exist
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except:
+    pass
+
+# Load from environment variables for security (NEVER hardcode passwords!)
+AIVEN_CONFIG = {
+    "charset": "utf8mb4",
+    "connect_timeout": 10,
+    "cursorclass": pymysql.cursors.DictCursor,
+    "db": os.getenv("AIVEN_DB", "defaultdb"),
+    "host": os.getenv("AIVEN_HOST", "veelearndb-asterloop-483e.i.aivencloud.com"),
+    "password": os.getenv("AIVEN_PASSWORD", ""),
+    "read_timeout": 10,
+    "port": int(os.getenv("AIVEN_PORT", "26399")),
+    "user": os.getenv("AIVEN_USER", "avnadmin"),
+    "write_timeout": 10,
+}
+
+POOL_SIZE = int(os.getenv("AIVEN_POOL_SIZE", "4"))
+
+# MySQL error codes worth retrying: the connection dropped or the server
+# was busy, rather than the statement itself being wrong.
+TRANSIENT_ERROR_CODES = {
+    1040,  # Too many connections
+    1205,  # Lock wait timeout exceeded
+    1213,  # Deadlock found when trying to get lock
+    2003,  # Can't connect to MySQL server
+    2006,  # MySQL server has gone away
+    2013,  # Lost connection to MySQL server during query
+    2055,  # Lost connection to MySQL server (system error)
+}
+
+def is_transient(error):
+    """True if the error is a dropped connection, deadlock or similar"""
+    if isinstance(error, pymysql.err.InterfaceError):
+        return True
+    if isinstance(error, pymysql.err.OperationalError):
+        return bool(error.args) and error.args[0] in TRANSIENT_ERROR_CODES
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+def retry_delay(attempt, base_delay=0.5, max_delay=8.0):
+    """Exponential backoff with jitter for the given (0-based) retry attempt"""
+    return min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+def with_retry(fn, retries=3, base_delay=0.5, max_delay=8.0):
+    """Call fn(), retrying transient errors with exponential backoff and jitter"""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries or not is_transient(e):
+                raise
+            delay = retry_delay(attempt, base_delay, max_delay)
+            print(f"⚠️ Transient database error ({e}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            attempt += 1
+
+_SELECT_RE = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+def execute(cursor, sql, args=None, timeout=None):
+    """cursor.execute with an optional per-query timeout in seconds.
+
+    SELECTs carry a MAX_EXECUTION_TIME hint, so the server abandons them
+    (error 3024) once the timeout passes. Other statements are bounded by
+    the connection's read_timeout and the server's lock wait timeout.
+    """
+    if timeout is not None and _SELECT_RE.match(sql):
+        sql = _SELECT_RE.sub(f"SELECT /*+ MAX_EXECUTION_TIME({int(timeout * 1000)}) */", sql, count=1)
+    return cursor.execute(sql, args)
+
+class TimeoutCursor:
+    """Cursor wrapper that sends every statement through execute() with one timeout"""
+
+    def __init__(self, cursor, timeout):
+        self._cursor = cursor
+        self.timeout = timeout
+
+    def execute(self, sql, args=None):
+        return execute(self._cursor, sql, args, self.timeout)
+
+    def executemany(self, sql, args):
+        return self._cursor.executemany(sql, args)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+def with_timeout(cursor, timeout):
+    return cursor if timeout is None else TimeoutCursor(cursor, timeout)
+
+class PooledConnection:
+    """A pymysql connection plus the bookkeeping the pool needs"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+class ConnectionPool:
+    """Bounded pool of warm connections to the Aiven database.
+
+    Connections are handed out most-recently-used first, pinged before reuse
+    once they have sat idle for health_check_after seconds, recycled after
+    max_lifetime seconds, and kept alive by a background ping every
+    keepalive_interval seconds so long jobs never pay a fresh TLS handshake.
+    on_connect, if given, is called with the seconds each new connection took.
+    """
+
+    def __init__(self, config=None, max_size=POOL_SIZE, health_check_after=30,
+                 keepalive_interval=60, max_lifetime=3600, retries=3, on_connect=None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.config = dict(config or AIVEN_CONFIG)
+        self.max_size = max_size
+        self.health_check_after = health_check_after
+        self.keepalive_interval = keepalive_interval
+        self.max_lifetime = max_lifetime
+        self.retries = retries
+        self.on_connect = on_connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._closed = threading.Event()
+        self._keepalive_thread = None
+        if keepalive_interval:
+            self._keepalive_thread = threading.Thread(target=self._keepalive_loop, daemon=True)
+            self._keepalive_thread.start()
+
+    def _connect(self):
+        started = time.perf_counter()
+        connection = with_retry(lambda: pymysql.connect(**self.config), self.retries)
+        if self.on_connect:
+            self.on_connect(time.perf_counter() - started)
+        return PooledConnection(connection)
+
+    def _is_healthy(self, pooled):
+        now = time.monotonic()
+        if self.max_lifetime and now - pooled.created_at > self.max_lifetime:
+            return False
+        if now - pooled.last_used < self.health_check_after:
+            return True
+        try:
+            pooled.connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """Check out a healthy connection, blocking while the pool is exhausted"""
+        if self._closed.is_set():
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No database connection free after {timeout}s")
+        try:
+            while True:
+                try:
+                    pooled = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_healthy(pooled):
+                    return pooled
+                self._discard(pooled)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, pooled, discard=False):
+        """Return a connection to the pool, or close it if it is broken"""
+        try:
+            if discard or self._closed.is_set() or self._idle.qsize() >= self.max_size:
+                self._discard(pooled)
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.put(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        pooled = self.acquire(timeout)
+        broken = False
+        try:
+            yield pooled.connection
+        except Exception as e:
+            broken = is_transient(e)
+            raise
+        finally:
+            self.release(pooled, discard=broken)
+
+    @contextmanager
+    def cursor(self, timeout=None):
+        """A cursor on a pooled connection; timeout (seconds) applies to each query, see execute()"""
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                yield with_timeout(cursor, timeout)
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def transaction(self, timeout=None):
+        """A cursor whose work is committed on success and rolled back on error"""
+        with self.connection() as connection:
+            connection.begin()
+            cursor = connection.cursor()
+            try:
+                yield with_timeout(cursor, timeout)
+                connection.commit()
+            except BaseException:
+                try:
+                    connection.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                cursor.close()
+
+    def run_in_transaction(self, fn, *args, timeout=None, **kwargs):
+        """Run fn(cursor, *args, **kwargs) in a transaction, retrying it whole on transient errors"""
+        def attempt():
+            with self.transaction(timeout) as cursor:
+                return fn(cursor, *args, **kwargs)
+        return with_retry(attempt, self.retries)
+
+    def keepalive(self):
+        """Ping every idle connection, dropping the ones that no longer answer"""
+        alive = []
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                pooled.connection.ping(reconnect=False)
+                pooled.last_used = time.monotonic()
+                alive.append(pooled)
+            except Exception:
+                self._discard(pooled)
+        # Put back oldest first so the most recently used stays on top
+        for pooled in reversed(alive):
+            if self._idle.qsize() >= self.max_size:
+                self._discard(pooled)
+            else:
+                self._idle.put(pooled)
+
+    def _keepalive_loop(self):
+        while not self._closed.wait(self.keepalive_interval):
+            self.keepalive()
+
+    def close(self):
+        self._closed.set()
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool(**kwargs):
+    """Process-wide pool, created on first use.
+
+    Later calls return the same pool; settings passed then must match it,
+    or a ValueError says so instead of silently ignoring them (call
+    close_pool() first, or pass an explicit ConnectionPool around).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(**kwargs)
+            return _pool
+        for name, value in kwargs.items():
+            current = getattr(_pool, name, None)
+            if name == "config":
+                value = dict(value or AIVEN_CONFIG)
+            if current != value:
+                raise ValueError(f"get_pool({name}=...) does not match the pool already created "
+                                 f"({name}={current!r}); call close_pool() first")
+        return _pool
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
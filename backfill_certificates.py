@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Volunteer Certificate Backfill
+Issues every missing 5-hour volunteer milestone certificate for all users in one pass; safe to run from cron
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+
+MILESTONE_HOURS = 5
+USER_CHUNK_SIZE = 1000
+INSERT_BATCH_SIZE = 500
+# Same shape as server.js: crypto.randomBytes(16).toString('hex')
+CODE_BYTES = 16
+
+def milestones_for(total_hours, step=MILESTONE_HOURS):
+    """Every milestone a user has reached: 5, 10, ... up to floor(hours / 5) * 5"""
+    top = int((total_hours or 0) // step) * step
+    return range(step, top + 1, step)
+
+def verification_codes(count, nbytes=CODE_BYTES):
+    """`count` random hex codes from a single urandom read"""
+    raw = os.urandom(count * nbytes)
+    return [raw[i * nbytes:(i + 1) * nbytes].hex() for i in range(count)]
+
+def iter_user_chunks(connection, chunk_size=USER_CHUNK_SIZE, step=MILESTONE_HOURS):
+    """Yield lists of (user id, total hours) for users past the first milestone, in id order"""
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, total_volunteer_hours FROM users "
+                "WHERE id > %s AND total_volunteer_hours >= %s ORDER BY id LIMIT %s",
+                (last_id, step, chunk_size))
+            rows = cursor.fetchall()
+        connection.commit()
+        if not rows:
+            return
+        last_id = rows[-1]["id"]
+        yield [(r["id"], r["total_volunteer_hours"]) for r in rows]
+        if len(rows) < chunk_size:
+            return
+
+def missing_milestones(users, issued, step=MILESTONE_HOURS):
+    """(user id, hours) for every reached milestone without a volunteer_hours certificate"""
+    missing = []
+    for user_id, hours in users:
+        have = issued.get(user_id, set())
+        missing.extend((user_id, m) for m in milestones_for(hours, step) if m not in have)
+    return missing
+
+def insert_certificates(cursor, rows):
+    """One multi-row insert; rows already issued by a concurrent request are skipped.
+
+    The rows come from a derived table so NOT EXISTS is checked per row in
+    the same statement, which keeps the insert idempotent even if server.js
+    issued one of the milestones since we read the certificates.
+    """
+    codes = verification_codes(len(rows))
+    params = []
+    for (user_id, hours), code in zip(rows, codes):
+        params.extend((user_id, hours, code))
+    cursor.execute(
+        "INSERT INTO certificates (user_id, certificate_type, hours_certified, verification_code) "
+        "SELECT m.user_id, 'volunteer_hours', m.hours, m.code FROM ("
+        + " UNION ALL ".join(["SELECT %s AS user_id, %s AS hours, %s AS code"] * len(rows))
+        + ") m WHERE NOT EXISTS (SELECT 1 FROM certificates c WHERE c.user_id = m.user_id "
+          "AND c.certificate_type = 'volunteer_hours' AND c.hours_certified = m.hours)",
+        params,
+    )
+    return cursor.rowcount
+
+def backfill_chunk(connection, users, batch_size=INSERT_BATCH_SIZE, step=MILESTONE_HOURS, dry_run=False):
+    """Issue the missing certificates for one chunk of users in a single transaction.
+
+    The existing certificates are read FOR UPDATE, which locks those users'
+    certificate index range until commit, so two overlapping runs (or a run
+    and the request path) cannot both issue the same milestone.
+    """
+    ids = [user_id for user_id, _ in users]
+    connection.begin()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT user_id, hours_certified FROM certificates "
+                "WHERE certificate_type = 'volunteer_hours' AND user_id IN (" + ", ".join(["%s"] * len(ids)) + ")"
+                + ("" if dry_run else " FOR UPDATE"),
+                ids)
+            issued = {}
+            for row in cursor.fetchall():
+                issued.setdefault(row["user_id"], set()).add(int(round(row["hours_certified"])))
+            missing = missing_milestones(users, issued, step)
+            inserted = 0
+            if not dry_run:
+                for start in range(0, len(missing), batch_size):
+                    inserted += insert_certificates(cursor, missing[start:start + batch_size])
+        if dry_run:
+            connection.rollback()
+        else:
+            connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return len(missing), inserted
+
+def backfill(connection, chunk_size=USER_CHUNK_SIZE, batch_size=INSERT_BATCH_SIZE, step=MILESTONE_HOURS,
+             dry_run=False):
+    stats = {"users": 0, "missing": 0, "inserted": 0}
+    started = time.perf_counter()
+    for users in iter_user_chunks(connection, chunk_size, step):
+        missing, inserted = backfill_chunk(connection, users, batch_size, step, dry_run)
+        stats["users"] += len(users)
+        stats["missing"] += missing
+        stats["inserted"] += inserted
+        if missing:
+            print(f"  ... {stats['users']:,} users checked, {stats['missing']:,} milestones missing so far")
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Issue missing volunteer-hour milestone certificates")
+    parser.add_argument("--chunk-size", type=int, default=USER_CHUNK_SIZE, help="users per transaction")
+    parser.add_argument("--batch-size", type=int, default=INSERT_BATCH_SIZE, help="certificates per INSERT")
+    parser.add_argument("--dry-run", action="store_true", help="count missing milestones, write nothing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    print(f"🎓 Backfilling volunteer certificates{' (dry run)' if args.dry_run else ''}...")
+    try:
+        with get_pool().connection() as connection:
+            stats = backfill(connection, args.chunk_size, args.batch_size, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ Backfill failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print(f"\n✅ {stats['users']:,} users checked in {stats['seconds']:.2f}s")
+    print(f"  ✓ {stats['missing']:,} milestones missing, {stats['inserted']:,} certificates issued")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
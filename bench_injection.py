@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Course Injection Benchmark
+Measures update_course / sync_course / check_courses against a local MySQL or the in-process stand-in
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import ENHANCED_COURSES_WITH_CONTENT as injector
+import check_db_courses as checker
+from course_bundles import CourseCatalog
+from mysql_standin import SERVER_SCHEMA, StandInConnection
+from query_profiler import QueryProfiler
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_REPEAT = 5
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+# Allowed throughput drop before a run counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+BENCH_COURSE_ID = 1
+# Real course bundle the synthetic benchmark courses are built from
+SOURCE_COURSE = CourseCatalog().get(12)
+
+# Local MySQL/MariaDB used by --backend mysql; never point this at Aiven
+BENCH_MYSQL_CONFIG = {
+    "host": os.getenv("BENCH_MYSQL_HOST", "127.0.0.1"),
+    "port": int(os.getenv("BENCH_MYSQL_PORT", "3306")),
+    "user": os.getenv("BENCH_MYSQL_USER", "root"),
+    "password": os.getenv("BENCH_MYSQL_PASSWORD", ""),
+    "db": os.getenv("BENCH_MYSQL_DB", "veelearn_bench"),
+    "charset": "utf8mb4",
+}
+
+class LatencyCursor:
+    """Cursor proxy that sleeps before every statement to mimic the WAN round trip"""
+
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self._latency = latency
+
+    def execute(self, sql, args=None):
+        time.sleep(self._latency)
+        return self._cursor.execute(sql, args)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+class LatencyConnection:
+    def __init__(self, connection, latency):
+        self._connection = connection
+        self._latency = latency
+
+    def cursor(self, *args):
+        return LatencyCursor(self._connection.cursor(*args), self._latency)
+
+    def commit(self):
+        time.sleep(self._latency)
+        self._connection.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+def open_backend(backend, latency):
+    """Return a fresh connection with the server.js schema and nothing else in it"""
+    if backend == "standin":
+        return StandInConnection(latency=latency)
+
+    import pymysql
+    config = dict(BENCH_MYSQL_CONFIG)
+    db = config.pop("db")
+    connection = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **config)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {db}")
+        cursor.execute(f"CREATE DATABASE {db} CHARACTER SET utf8mb4")
+        cursor.execute(f"USE {db}")
+        for ddl in SERVER_SCHEMA:
+            cursor.execute(ddl)
+    connection.commit()
+    return LatencyConnection(connection, latency) if latency else connection
+
+def make_questions(count):
+    """Synthetic question bank of the requested size, cycling the real algebra questions"""
+    source = SOURCE_COURSE["questions"]
+    questions = []
+    for i in range(count):
+        q = dict(source[i % len(source)])
+        q["question_text"] = f"{q['question_text']} (#{i + 1})"
+        q["order_index"] = i + 1
+        questions.append(q)
+    return questions
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(size, timings, round_trips):
+    p50 = percentile(timings, 50)
+    return {
+        "rows": size,
+        "throughput": size / p50 if p50 > 0 else 0.0,
+        "p50_ms": p50 * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "round_trips": round_trips,
+    }
+
+def timed_runs(connection, repeat, fn):
+    """Run fn(cursor) `repeat` times, each committed; returns (timings, round trips of one run)"""
+    timings, round_trips = [], 0
+    for _ in range(repeat):
+        profiler = QueryProfiler()
+        cursor = profiler.wrap_cursor(connection.cursor())
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = fn(cursor)
+        connection.commit()
+        timings.append(time.perf_counter() - started)
+        if ok is False:
+            raise RuntimeError("benchmarked operation reported failure")
+        # +1 for the commit
+        round_trips = len(profiler.records) + 1
+        cursor.close()
+    return timings, round_trips
+
+def bench_update_course(connection, size, repeat, batch_size):
+    questions = make_questions(size)
+    content = SOURCE_COURSE["content"]
+    return timed_runs(connection, repeat, lambda cursor: injector.update_course(
+        cursor, BENCH_COURSE_ID, "Benchmark Course", content, questions, batch_size))
+
+def bench_sync_unchanged(connection, size, repeat, batch_size):
+    questions = make_questions(size)
+    content = SOURCE_COURSE["content"]
+    sync = lambda cursor: injector.sync_course(
+        cursor, BENCH_COURSE_ID, "Benchmark Course", content, questions, batch_size)
+    cursor = connection.cursor()
+    injector.ensure_sync_table(cursor)
+    cursor.close()
+    timed_runs(connection, 1, sync)  # prime the hashes
+    return timed_runs(connection, repeat, sync)
+
+def bench_check_courses(connection, size, repeat, batch_size):
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM courses WHERE id > %s", (BENCH_COURSE_ID,))
+    for start in range(0, size, batch_size):
+        count = min(batch_size, size - start)
+        cursor.execute("INSERT INTO courses (title, status) VALUES " + ", ".join(["(%s, 'approved')"] * count),
+                       [f"Catalogue course {start + i}" for i in range(count)])
+    connection.commit()
+    cursor.close()
+
+    timings, round_trips = [], 0
+    for _ in range(repeat):
+        profiler = QueryProfiler()
+        started = time.perf_counter()
+        checker.stream_courses(profiler.wrap_connection(connection), io.StringIO(), "jsonl")
+        timings.append(time.perf_counter() - started)
+        round_trips = len(profiler.records)
+    return timings, round_trips
+
+BENCHMARKS = {
+    "update_course": bench_update_course,
+    "sync_course_unchanged": bench_sync_unchanged,
+    "check_courses": bench_check_courses,
+}
+
+def run(backend="standin", sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, latency=0.0,
+        batch_size=injector.QUESTION_BATCH_SIZE, only=None):
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        results[name] = {}
+        for size in sizes:
+            connection = open_backend(backend, latency)
+            try:
+                cursor = connection.cursor()
+                cursor.execute("INSERT INTO courses (id, title, status) VALUES (%s, %s, 'approved')",
+                               (BENCH_COURSE_ID, "Benchmark Course"))
+                injector.ensure_sections_table(cursor)
+                connection.commit()
+                cursor.close()
+                timings, round_trips = bench(connection, size, repeat, batch_size)
+            finally:
+                connection.close()
+            results[name][str(size)] = summarize(size, timings, round_trips)
+            r = results[name][str(size)]
+            print(f"  {name:<22} {size:>6} rows  {r['throughput']:>10.0f} rows/s  "
+                  f"p50 {r['p50_ms']:8.1f}ms  p99 {r['p99_ms']:8.1f}ms  {r['round_trips']:>5} round trips")
+    return results
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a list of regressions against a stored baseline.
+
+    Round trips are deterministic, so any increase is a regression;
+    throughput is machine-dependent and may drop by `tolerance` before failing.
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for size, r in sizes.items():
+            base = baseline.get("results", {}).get(name, {}).get(size)
+            if not base:
+                continue
+            if r["round_trips"] > base["round_trips"]:
+                regressions.append(f"{name}[{size}]: round trips {base['round_trips']} -> {r['round_trips']}")
+            if r["throughput"] < base["throughput"] * (1 - tolerance):
+                regressions.append(f"{name}[{size}]: throughput {base['throughput']:.0f} -> {r['throughput']:.0f} rows/s")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark course injection against a local database")
+    parser.add_argument("--backend", choices=["standin", "mysql"], default="standin",
+                        help="in-process SQLite stand-in, or the local MySQL in BENCH_MYSQL_* (default standin)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated question/course counts")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="artificial delay added to every round trip")
+    parser.add_argument("--batch-size", type=int, default=injector.QUESTION_BATCH_SIZE)
+    parser.add_argument("--only", help="comma-separated benchmark names: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", help="also write this run's results as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = set(args.only.split(",")) if args.only else None
+    print("=" * 70)
+    print(f"🏁 COURSE INJECTION BENCHMARK ({args.backend}, {args.latency_ms:g}ms/round trip)")
+    print("=" * 70)
+    results = run(args.backend, sizes, args.repeat, args.latency_ms / 1000, args.batch_size, only)
+    run_info = {
+        "backend": args.backend,
+        "latency_ms": args.latency_ms,
+        "batch_size": args.batch_size,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run_info, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(run_info, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nℹ️ No baseline to compare against (run with --save-baseline)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if (baseline.get("backend"), baseline.get("latency_ms"), baseline.get("batch_size")) != \
+            (args.backend, args.latency_ms, args.batch_size):
+        print("\n⚠️ Baseline was recorded with a different backend/latency/batch size; skipping comparison")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for r in regressions:
+            print(f"  - {r}")
+        return 1
+    print("\n✅ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
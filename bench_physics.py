@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Physics Benchmark
+Times physics_batch against a per-body loop written like block-physics-engine.js, from 10 to 100k bodies
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from physics_batch import Bodies, BatchIntegrator, broadphase_pairs, brute_force_pairs
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+DEFAULT_STEPS = 20
+# The per-body loop checks every pair, so it stops being worth timing past this
+SCALAR_MAX_BODIES = 1000
+# Grid pairs are compared with the n^2 pair list up to this many bodies
+VERIFY_MAX_BODIES = 2000
+RADIUS = 2.0
+# 10 x 10 units of floor per body keeps the contact density equal at every size
+AREA_PER_BODY = 100.0
+
+class Vector:
+    """The immutable JS Vector: every operation allocates a new object"""
+
+    __slots__ = ("x", "y")
+
+    def __init__(self, x=0.0, y=0.0):
+        self.x = x
+        self.y = y
+
+    def add(self, v):
+        return Vector(self.x + v.x, self.y + v.y)
+
+    def subtract(self, v):
+        return Vector(self.x - v.x, self.y - v.y)
+
+    def scale(self, s):
+        return Vector(self.x * s, self.y * s)
+
+    def dot(self, v):
+        return self.x * v.x + self.y * v.y
+
+    def magnitude(self):
+        return math.sqrt(self.x * self.x + self.y * self.y)
+
+def make_bodies(count, seed=1):
+    rng = np.random.default_rng(seed)
+    side = math.sqrt(count * AREA_PER_BODY)
+    return Bodies.from_arrays(
+        x=rng.uniform(RADIUS, side - RADIUS, count), y=rng.uniform(RADIUS, side - RADIUS, count),
+        vx=rng.uniform(-20, 20, count), vy=rng.uniform(-20, 20, count),
+        mass=rng.uniform(0.5, 2.0, count), radius=np.full(count, RADIUS),
+    ), (0.0, 0.0, side, side)
+
+def scalar_step(objects, dt, gravity, restitution, collisions=True):
+    """One step the way the browser does it: Vector objects, one body and one pair at a time"""
+    acc = Vector(0, gravity)
+    for o in objects:
+        o["vel"] = o["vel"].add(acc.scale(dt))
+        o["pos"] = o["pos"].add(o["vel"].scale(dt))
+    if not collisions:
+        return
+    for a in range(len(objects)):
+        for b in range(a + 1, len(objects)):
+            p, q = objects[a], objects[b]
+            delta = q["pos"].subtract(p["pos"])
+            distance = delta.magnitude()
+            reach = p["r"] + q["r"]
+            if distance >= reach:
+                continue
+            normal = delta.scale(1 / distance) if distance > 0 else Vector(1, 0)
+            inv_p, inv_q = 1 / p["mass"], 1 / q["mass"]
+            overlap = reach - distance
+            p["pos"] = p["pos"].subtract(normal.scale(overlap * inv_p / (inv_p + inv_q)))
+            q["pos"] = q["pos"].add(normal.scale(overlap * inv_q / (inv_p + inv_q)))
+            closing = q["vel"].subtract(p["vel"]).dot(normal)
+            if closing < 0:
+                impulse = -(1 + restitution) * closing / (inv_p + inv_q)
+                p["vel"] = p["vel"].subtract(normal.scale(impulse * inv_p))
+                q["vel"] = q["vel"].add(normal.scale(impulse * inv_q))
+
+def to_objects(bodies):
+    return [{"pos": Vector(float(x), float(y)), "vel": Vector(float(vx), float(vy)), "mass": float(m), "r": float(r)}
+            for x, y, vx, vy, m, r in zip(bodies.x, bodies.y, bodies.vx, bodies.vy, bodies.mass, bodies.radius)]
+
+def verify(count):
+    """Grid pairs match the n^2 pairs, and without contacts both integrators agree"""
+    bodies, _ = make_bodies(count, seed=count)
+    i, j = broadphase_pairs(bodies.x, bodies.y, bodies.radius)
+    dx, dy = bodies.x[j] - bodies.x[i], bodies.y[j] - bodies.y[i]
+    touching = dx * dx + dy * dy < (bodies.radius[i] + bodies.radius[j]) ** 2
+    grid = set(zip(np.minimum(i, j)[touching].tolist(), np.maximum(i, j)[touching].tolist()))
+    brute = set(zip(*(a.tolist() for a in brute_force_pairs(bodies.x, bodies.y, bodies.radius))))
+    objects = to_objects(bodies)
+    integrator = BatchIntegrator(bodies, gravity=9.8, bounds=None, collisions=False)
+    for _ in range(5):
+        integrator.step(0.016)
+        scalar_step(objects, 0.016, 9.8, 0.8, collisions=False)
+    drift = max(max(abs(o["pos"].x - x), abs(o["pos"].y - y)) for o, x, y in zip(objects, bodies.x, bodies.y))
+    return grid == brute and drift < 1e-9
+
+def bench_size(count, steps):
+    bodies, bounds = make_bodies(count)
+    integrator = BatchIntegrator(bodies, gravity=9.8, restitution=0.8, bounds=bounds)
+    integrator.step(0.016)  # warm-up
+    started = time.perf_counter()
+    contacts = pairs = 0
+    for _ in range(steps):
+        integrator.step(0.016)
+        contacts += integrator.contact_count
+        pairs += integrator.pair_count
+    batch = (time.perf_counter() - started) / steps
+    result = {"bodies": count, "batch_ms": batch * 1000, "bodies_per_s": count / batch,
+              "candidate_pairs": pairs // steps, "contacts": contacts // steps, "scalar_ms": None}
+    if count <= SCALAR_MAX_BODIES:
+        objects = to_objects(make_bodies(count)[0])
+        scalar_steps = max(1, min(steps, 2_000_000 // (count * count)))
+        started = time.perf_counter()
+        for _ in range(scalar_steps):
+            scalar_step(objects, 0.016, 9.8, 0.8)
+        result["scalar_ms"] = (time.perf_counter() - started) / scalar_steps * 1000
+    if count <= VERIFY_MAX_BODIES:
+        result["verified"] = verify(count)
+    return result
+
+def print_table(results):
+    print(f"\n{'bodies':>8} {'batch ms/step':>14} {'bodies/s':>14} {'pairs':>10} {'contacts':>9} "
+          f"{'per-body ms':>12} {'speedup':>8}  check")
+    for r in results:
+        scalar = f"{r['scalar_ms']:12.2f}" if r["scalar_ms"] is not None else f"{'—':>12}"
+        speedup = f"{r['scalar_ms'] / r['batch_ms']:7.1f}x" if r["scalar_ms"] is not None else f"{'—':>8}"
+        check = {True: "✓", False: "❌"}.get(r.get("verified"), "")
+        print(f"{r['bodies']:>8,} {r['batch_ms']:14.3f} {r['bodies_per_s']:14,.0f} {r['candidate_pairs']:>10,} "
+              f"{r['contacts']:>9,} {scalar} {speedup}  {check}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the batch physics integrator")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated body counts (default 10..100000)")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="timed steps per size")
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",")]
+    print(f"⏱️ Stepping {', '.join(f'{s:,}' for s in sizes)} bodies, {args.steps} steps each...")
+    results = [bench_size(size, args.steps) for size in sizes]
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n  ✓ Results written to {args.output}")
+    if any(r.get("verified") is False for r in results):
+        print("\n❌ Grid broadphase or integrator disagrees with the per-body reference")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version History Benchmark
+Builds synthetic simulator histories on the stand-in and reports storage saved and version reconstruction latency before and after delta compaction
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from bench_injection import percentile
+from mysql_standin import StandInConnection
+from simulator_evaluator import TEMPLATES
+import simulator_version_history as history
+
+DEFAULT_VERSIONS = [10, 50, 200]
+DEFAULT_SIMULATORS = 5
+DEFAULT_BLOCKS = 40
+DEFAULT_SAMPLES = 500
+NUMERIC_TYPES = [t for t, template in TEMPLATES.items() if template["outputs"]]
+
+def new_block(rng, block_id):
+    block_type = rng.choice(NUMERIC_TYPES)
+    return {"id": block_id, "type": block_type, "x": rng.randrange(0, 1200), "y": rng.randrange(0, 800),
+            "inputs": {name: default for name, default in TEMPLATES[block_type]["inputs"]}}
+
+def edit(rng, blocks, connections, next_id):
+    """One editing session: drag a few blocks, tweak inputs, sometimes add or delete a block"""
+    blocks = json.loads(json.dumps(blocks))
+    connections = list(connections)
+    for block in rng.sample(blocks, min(3, len(blocks))):
+        block["x"] += rng.randrange(-40, 41)
+        block["y"] += rng.randrange(-40, 41)
+    block = rng.choice(blocks)
+    numeric = [name for name, default in TEMPLATES[block["type"]]["inputs"] if not isinstance(default, str)]
+    if numeric:
+        block["inputs"][rng.choice(numeric)] = round(rng.uniform(-100, 100), 2)
+    roll = rng.random()
+    if roll < 0.3:
+        source = rng.choice(blocks)
+        blocks.append(new_block(rng, next_id))
+        target = TEMPLATES[blocks[-1]["type"]]["inputs"][0][0]
+        connections.append({"from": source["id"], "fromOutputType": TEMPLATES[source["type"]]["outputs"][0],
+                            "to": next_id, "toInputType": target})
+        next_id += 1
+    elif roll < 0.4 and len(blocks) > 5:
+        gone = blocks.pop(rng.randrange(len(blocks)))["id"]
+        connections = [c for c in connections if gone not in (c["from"], c["to"])]
+    return blocks, connections, next_id
+
+def build_histories(connection, simulators, versions, block_count, seed=1):
+    rng = random.Random(seed)
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO users (id, email, password, role) VALUES (1, 'bench@example.com', 'x', 'admin')")
+        for simulator_id in range(1, simulators + 1):
+            blocks = [new_block(rng, i) for i in range(1, block_count + 1)]
+            connections = [{"from": i, "fromOutputType": TEMPLATES[blocks[i - 1]["type"]]["outputs"][0],
+                            "to": i + 1, "toInputType": TEMPLATES[blocks[i]["type"]]["inputs"][0][0]}
+                           for i in range(1, block_count, 2)]
+            next_id = block_count + 1
+            cursor.execute("INSERT INTO simulators (id, creator_id, title, blocks, connections) VALUES (%s, 1, %s, %s, %s)",
+                           (simulator_id, f"Bench {simulator_id}", json.dumps(blocks), json.dumps(connections)))
+            rows = []
+            for number in range(1, versions + 1):
+                rows.append((simulator_id, number, json.dumps(blocks, separators=(",", ":")),
+                             json.dumps(connections, separators=(",", ":"))))
+                blocks, connections, next_id = edit(rng, blocks, connections, next_id)
+            cursor.executemany("INSERT INTO simulator_versions (simulator_id, version_number, blocks, connections) "
+                               "VALUES (%s, %s, %s, %s)", rows)
+    connection.commit()
+
+def snapshot(connection, simulators, versions):
+    return {(s, v): json.dumps(history.load_version(connection, s, v)) for s in range(1, simulators + 1)
+            for v in range(1, versions + 1)}
+
+def stored_total(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT SUM(LENGTH(blocks) + COALESCE(LENGTH(connections), 0) + COALESCE(LENGTH(delta), 0)) "
+                       "AS total FROM simulator_versions")
+        total = cursor.fetchone()["total"]
+    connection.commit()
+    return int(total or 0)
+
+def time_loads(connection, simulators, versions, samples, seed=2):
+    rng = random.Random(seed)
+    timings = []
+    for _ in range(samples):
+        s, v = rng.randint(1, simulators), rng.randint(1, versions)
+        started = time.perf_counter()
+        history.load_version(connection, s, v)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def bench(versions, simulators=DEFAULT_SIMULATORS, block_count=DEFAULT_BLOCKS, samples=DEFAULT_SAMPLES,
+          interval=history.KEYFRAME_INTERVAL):
+    connection = StandInConnection()
+    build_histories(connection, simulators, versions, block_count)
+    before_bytes = stored_total(connection)
+    before_state = snapshot(connection, simulators, versions)
+    before_times = time_loads(connection, simulators, versions, samples)
+
+    started = time.perf_counter()
+    history.compact_histories(connection, interval=interval)
+    migrate = time.perf_counter() - started
+
+    after_bytes = stored_total(connection)
+    after_state = snapshot(connection, simulators, versions)
+    after_times = time_loads(connection, simulators, versions, samples)
+    connection.close()
+    return {
+        "versions": versions, "simulators": simulators, "before_bytes": before_bytes, "after_bytes": after_bytes,
+        "migrate_s": migrate, "lossless": before_state == after_state,
+        "full_p50_ms": percentile(before_times, 50) * 1000, "full_p95_ms": percentile(before_times, 95) * 1000,
+        "delta_p50_ms": percentile(after_times, 50) * 1000, "delta_p95_ms": percentile(after_times, 95) * 1000,
+    }
+
+def print_table(results):
+    print(f"\n{'versions':>8} {'before KiB':>11} {'after KiB':>10} {'saved':>7} {'migrate s':>10} "
+          f"{'full p50/p95 ms':>16} {'delta p50/p95 ms':>17}  lossless")
+    for r in results:
+        saved = 100.0 * (r["before_bytes"] - r["after_bytes"]) / r["before_bytes"]
+        print(f"{r['versions']:>8} {r['before_bytes'] / 1024:11,.1f} {r['after_bytes'] / 1024:10,.1f} {saved:6.1f}% "
+              f"{r['migrate_s']:10.2f} {r['full_p50_ms']:7.3f}/{r['full_p95_ms']:<8.3f} "
+              f"{r['delta_p50_ms']:7.3f}/{r['delta_p95_ms']:<9.3f}  {'✓' if r['lossless'] else '❌'}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark delta-compressed simulator version history")
+    parser.add_argument("--versions", default=",".join(map(str, DEFAULT_VERSIONS)),
+                        help="comma-separated versions per simulator")
+    parser.add_argument("--simulators", type=int, default=DEFAULT_SIMULATORS)
+    parser.add_argument("--blocks", type=int, default=DEFAULT_BLOCKS, help="blocks in each simulator's first version")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="random versions loaded per run")
+    parser.add_argument("--interval", type=int, default=history.KEYFRAME_INTERVAL)
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(v) for v in args.versions.split(",")]
+    print(f"⏱️ {args.simulators} simulators x {', '.join(map(str, sizes))} versions, keyframe every {args.interval}...")
+    results = [bench(v, args.simulators, args.blocks, args.samples, args.interval) for v in sizes]
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n  ✓ Results written to {args.output}")
+    if not all(r["lossless"] for r in results):
+        print("\n❌ Some versions rebuild differently after compaction")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precompiled Course Artifacts
+Builds one render-ready, precompressed JSON file per approved course, rebuilding only courses whose updated_at moved
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_ARTIFACT_DIR = os.getenv(
+    "COURSE_ARTIFACT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dist", "courses"),
+)
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+BATCH_SIZE = 50
+HASH_LENGTH = 16
+
+# No updated_at: it only says when to rebuild (kept in the manifest), and hashing it would give a
+# touched-but-unchanged course a new file name
+COURSE_FIELDS = "id, title, description, content, blocks, creator_id, status, is_paid, shells_cost, creation_time"
+# correct_answer is checked server-side by POST .../answer, and the explanation comes back with it
+QUESTION_FIELDS = "id, course_id, question_text, question_type, options, points, order_index"
+SIMULATOR_FIELDS = ("csu.course_id, csu.added_at, s.id, s.title, s.description, s.creator_id, s.tags, "
+                    "s.downloads, s.rating, s.version")
+PARAM_FIELDS = ("id, course_id, simulator_block_id, block_id, param_name, param_label, "
+                "min_value, max_value, step_value, default_value, created_at")
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def encode(bundle):
+    """Canonical bytes: sorted keys and no whitespace, so unchanged data hashes the same"""
+    return json.dumps(bundle, default=_json_default, ensure_ascii=False, sort_keys=True,
+                      separators=(",", ":")).encode("utf-8")
+
+def _parse_json(value, fallback):
+    if value is None or value == "":
+        return fallback
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return fallback
+
+def _in_list(ids):
+    return "(" + ", ".join(["%s"] * len(ids)) + ")"
+
+def _grouped(cursor, sql, ids):
+    cursor.execute(sql.format(ids=_in_list(ids)), ids)
+    grouped = {course_id: [] for course_id in ids}
+    for row in cursor.fetchall():
+        grouped[row.pop("course_id")].append(row)
+    return grouped
+
+def fetch_bundles(cursor, course_ids):
+    """Assemble the bundles for a batch of courses with one query per table"""
+    cursor.execute(f"SELECT {COURSE_FIELDS} FROM courses WHERE id IN {_in_list(course_ids)}", course_ids)
+    courses = {row["id"]: row for row in cursor.fetchall()}
+    questions = _grouped(cursor, f"SELECT {QUESTION_FIELDS} FROM course_questions "
+                                 "WHERE course_id IN {ids} ORDER BY course_id, order_index, id", course_ids)
+    simulators = _grouped(cursor, f"SELECT {SIMULATOR_FIELDS} FROM course_simulator_usage csu "
+                                  "JOIN simulators s ON s.id = csu.simulator_id "
+                                  "WHERE csu.course_id IN {ids} ORDER BY csu.course_id, csu.added_at, s.id", course_ids)
+    params = _grouped(cursor, f"SELECT {PARAM_FIELDS} FROM simulator_interactive_params "
+                              "WHERE course_id IN {ids} ORDER BY course_id, simulator_block_id, id", course_ids)
+
+    bundles = {}
+    for course_id, course in courses.items():
+        course["blocks"] = _parse_json(course["blocks"], [])
+        for q in questions[course_id]:
+            q["options"] = _parse_json(q["options"], [])
+        bundles[course_id] = {
+            "format": FORMAT_VERSION,
+            "course": course,
+            "questions": questions[course_id],
+            "simulators": simulators[course_id],
+            "params": params[course_id],
+        }
+    return bundles
+
+# ===== ARTIFACTS =====
+
+def load_manifest(artifact_dir):
+    try:
+        with open(os.path.join(artifact_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {int(k): v for k, v in manifest.get("courses", {}).items()}
+
+def save_manifest(artifact_dir, entries):
+    path = os.path.join(artifact_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"format": FORMAT_VERSION, "courses": {str(k): entries[k] for k in sorted(entries)}}, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def _write_atomic(path, data):
+    if os.path.exists(path):
+        return  # content-addressed: same name, same bytes
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+def write_artifacts(artifact_dir, course_id, data):
+    """Write <id>.<hash>.json plus .gz and (if brotli is installed) .br; returns the manifest entry"""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    name = f"{course_id}.{digest}.json"
+    entry = {"hash": digest, "bytes": len(data), "files": {"identity": name}}
+    _write_atomic(os.path.join(artifact_dir, name), data)
+
+    gz_name = name + ".gz"
+    _write_atomic(os.path.join(artifact_dir, gz_name), gzip.compress(data, compresslevel=9, mtime=0))
+    entry["files"]["gzip"] = gz_name
+    if brotli is not None:
+        br_name = name + ".br"
+        _write_atomic(os.path.join(artifact_dir, br_name), brotli.compress(data, quality=11))
+        entry["files"]["br"] = br_name
+    entry["compressed_bytes"] = {encoding: os.path.getsize(os.path.join(artifact_dir, f))
+                                 for encoding, f in entry["files"].items()}
+    return entry
+
+def remove_artifacts(artifact_dir, entry):
+    for name in (entry or {}).get("files", {}).values():
+        try:
+            os.remove(os.path.join(artifact_dir, name))
+        except FileNotFoundError:
+            pass
+
+def _stamp(value):
+    return value.isoformat(sep=" ") if isinstance(value, datetime) else str(value)
+
+def build(connection, artifact_dir=DEFAULT_ARTIFACT_DIR, force=False, batch_size=BATCH_SIZE):
+    """Bring the artifact directory in line with the approved courses.
+
+    Only (id, updated_at) is read for every course; full rows and their
+    questions/simulators/params are fetched just for courses whose updated_at
+    differs from the manifest (or everything with force). Courses that were
+    unapproved or deleted lose their artifacts. Files are never rewritten in
+    place: a changed course gets new content-hashed names, the manifest is
+    swapped atomically, and only then are the old files removed.
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+    manifest = load_manifest(artifact_dir)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, updated_at FROM courses WHERE status = 'approved' ORDER BY id")
+        approved = {row["id"]: _stamp(row["updated_at"]) for row in cursor.fetchall()}
+
+    stale = [course_id for course_id, stamp in approved.items()
+             if force or course_id not in manifest or manifest[course_id].get("updated_at") != stamp
+             or not os.path.exists(os.path.join(artifact_dir, manifest[course_id]["files"]["identity"]))]
+    removed = [course_id for course_id in manifest if course_id not in approved]
+
+    entries = {k: v for k, v in manifest.items() if k in approved}
+    replaced = []
+    stats = {"courses": len(approved), "built": 0, "unchanged": 0, "removed": len(removed), "bytes": 0}
+    for start in range(0, len(stale), batch_size):
+        batch = stale[start:start + batch_size]
+        with connection.cursor() as cursor:
+            bundles = fetch_bundles(cursor, batch)
+        for course_id, bundle in bundles.items():
+            entry = write_artifacts(artifact_dir, course_id, encode(bundle))
+            entry["updated_at"] = approved[course_id]
+            previous = entries.get(course_id)
+            if previous and previous["hash"] == entry["hash"]:
+                stats["unchanged"] += 1
+            else:
+                stats["built"] += 1
+                stats["bytes"] += entry["bytes"]
+                if previous:
+                    replaced.append(previous)
+            entries[course_id] = entry
+
+    save_manifest(artifact_dir, entries)
+    for entry in replaced:
+        remove_artifacts(artifact_dir, entry)
+    for course_id in removed:
+        remove_artifacts(artifact_dir, manifest[course_id])
+    return stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build precompressed JSON bundles for approved courses")
+    parser.add_argument("--output", default=DEFAULT_ARTIFACT_DIR, help="artifact directory (default ./dist/courses)")
+    parser.add_argument("--force", action="store_true", help="rebuild every course, not just changed ones")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="courses fetched per query")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+    if brotli is None:
+        print("ℹ️ brotli is not installed (pip install brotli); writing gzip only")
+
+    print(f"📦 Building course artifacts in {args.output}...")
+    started = time.perf_counter()
+    try:
+        with get_pool().connection() as connection:
+            stats = build(connection, args.output, args.force, args.batch_size)
+    except Exception as e:
+        print(f"❌ Build failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print(f"\n✅ {stats['courses']} approved courses in {time.perf_counter() - started:.2f}s")
+    print(f"  ✓ {stats['built']} rebuilt ({stats['bytes'] / 1024:,.1f} KiB uncompressed), "
+          f"{stats['unchanged']} unchanged, {stats['removed']} removed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,209 @@
-import pymysql
-import os
+import argparse
+import asyncio
+import csv
+import json
 import sys
+import time
+
+import pymysql
+
+import aiven_async
+from aiven_db import AIVEN_CONFIG, get_pool
+from course_state_cache import DEFAULT_CACHE_PATH, CourseStateCache, print_changes
+from query_profiler import QueryProfiler
+
+# Columns that are cheap to stream for every row
+COURSE_COLUMNS = ["id", "title", "description", "creator_id", "status", "is_paid",
+                  "shells_cost", "created_at", "updated_at"]
+# LONGTEXT/TEXT columns, only fetched when asked for by name
+LARGE_COURSE_COLUMNS = ["content", "blocks", "feedback"]
+
+DEFAULT_COLUMNS = ["id", "title"]
+PAGE_SIZE = 5000
+
+def parse_columns(spec):
+    """Turn 'id,title,content' into a validated column list ('all' = every column)"""
+    if not spec:
+        return list(DEFAULT_COLUMNS)
+    if spec == "all":
+        return COURSE_COLUMNS + LARGE_COURSE_COLUMNS
+    columns = [c.strip() for c in spec.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in COURSE_COLUMNS + LARGE_COURSE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown course column(s): {', '.join(unknown)}")
+    if "id" not in columns:
+        # Keyset pagination needs the id of the last row seen
+        columns.insert(0, "id")
+    return columns
+
+def iter_courses(connection, columns=None, page_size=PAGE_SIZE, after_id=0):
+    """Yield course rows in id order without holding the result set in memory.
+
+    Each page is a keyset query (WHERE id > last id) read through an
+    unbuffered SSDictCursor, so rows are yielded as they come off the wire
+    and no single query has to walk the whole table.
+    """
+    columns = columns or list(DEFAULT_COLUMNS)
+    sql = f"SELECT {', '.join(columns)} FROM courses WHERE id > %s ORDER BY id LIMIT %s"
+    last_id = after_id
+    while True:
+        seen = 0
+        with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+            cursor.execute(sql, (last_id, page_size))
+            for row in cursor:
+                seen += 1
+                last_id = row["id"]
+                yield row
+        if seen < page_size:
+            return
+
+def write_table(rows, out, columns):
+    print("--- Existing Courses ---", file=out)
+    for row in rows:
+        if columns == DEFAULT_COLUMNS:
+            print(f"ID: {row['id']} | Title: {row['title']}", file=out)
+        else:
+            print(" | ".join(f"{c}: {row[c]}" for c in columns), file=out)
+        yield row
+    print("------------------------", file=out)
+
+def write_jsonl(rows, out, columns):
+    for row in rows:
+        out.write(json.dumps(row, default=str, ensure_ascii=False) + "\n")
+        yield row
+
+def write_csv(rows, out, columns):
+    writer = csv.DictWriter(out, fieldnames=columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield row
+
+WRITERS = {"table": write_table, "jsonl": write_jsonl, "csv": write_csv}
+
+def stream_courses(connection, out=sys.stdout, fmt="table", columns=None, page_size=PAGE_SIZE, after_id=0):
+    """Stream courses to `out` as they arrive; returns (rows, seconds to first row)"""
+    columns = columns or list(DEFAULT_COLUMNS)
+    started = time.perf_counter()
+    first_row_at = None
+    count = 0
+    rows = iter_courses(connection, columns, page_size, after_id)
+    for _ in WRITERS[fmt](rows, out, columns):
+        if first_row_at is None:
+            first_row_at = time.perf_counter() - started
+        count += 1
+        if fmt != "table" and count % page_size == 0:
+            out.flush()
+    out.flush()
+    return count, first_row_at
 
-# Try to load from .env, but don't fail if it doesn't exist
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except:
-    pass
-
-AIVEN_CONFIG = {
-    "charset": "utf8mb4",
-    "connect_timeout": 10,
-    "cursorclass": pymysql.cursors.DictCursor,
-    "db": os.getenv("AIVEN_DB", "defaultdb"),
-    "host": os.getenv("AIVEN_HOST", "veelearndb-asterloop-483e.i.aivencloud.com"),
-    "password": os.getenv("AIVEN_PASSWORD", ""),
-    "read_timeout": 10,
-    "port": int(os.getenv("AIVEN_PORT", "26399")),
-    "user": os.getenv("AIVEN_USER", "avnadmin"),
-    "write_timeout": 10,
-}
+def export_courses(out=sys.stdout, fmt="table", columns=None, page_size=PAGE_SIZE, after_id=0, profiler=None):
+    on_connect = profiler.record_connect if profiler else None
+    with get_pool(on_connect=on_connect).connection() as connection:
+        if profiler:
+            connection = profiler.wrap_connection(connection)
+        return stream_courses(connection, out, fmt, columns, page_size, after_id)
+
+async def export_courses_async(out=sys.stdout, fmt="table", columns=None, page_size=PAGE_SIZE, after_id=0,
+                               profiler=None):
+    """export_courses over an aiomysql pool"""
+    pool = await aiven_async.create_pool(1)
+
+    def stream(connection):
+        if profiler:
+            connection = profiler.wrap_connection(connection)
+        return stream_courses(connection, out, fmt, columns, page_size, after_id)
+
+    try:
+        return await aiven_async.run_with_connection(pool, stream)
+    finally:
+        await aiven_async.close_pool(pool)
+
+def report_changes(cache_path=DEFAULT_CACHE_PATH, detect_deletes=False, profiler=None):
+    """Print what changed since the last run, fetching only rows past the cache's watermark"""
+    cache = CourseStateCache(cache_path)
+    try:
+        first_run = len(cache) == 0
+        on_connect = profiler.record_connect if profiler else None
+        with get_pool(on_connect=on_connect).connection() as connection:
+            if profiler:
+                connection = profiler.wrap_connection(connection)
+            changes = cache.refresh(connection)
+            deleted = cache.detect_deletes(connection) if detect_deletes else []
+        if first_run:
+            print(f"Cached {len(changes['new'])} courses in {cache_path} (first run, nothing to compare)")
+        else:
+            print_changes(changes, deleted)
+        return len(changes["new"]) + len(changes["modified"]) + len(deleted)
+    finally:
+        cache.close()
 
 def check_courses():
     try:
-        connection = pymysql.connect(**AIVEN_CONFIG)
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT id, title FROM courses")
-            courses = cursor.fetchall()
-            print("--- Existing Courses ---")
-            for course in courses:
-                print(f"ID: {course['id']} | Title: {course['title']}")
-            print("------------------------")
-        connection.close()
+        export_courses()
+    except Exception as e:
+        print(f"Error: {e}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="List or export Veelearn courses")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="table")
+    parser.add_argument("--columns", help="comma-separated columns, or 'all' "
+                        f"(large columns {', '.join(LARGE_COURSE_COLUMNS)} are only fetched on request)")
+    parser.add_argument("--output", help="write to this file instead of stdout")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--after-id", type=int, default=0, help="resume after this course id")
+    parser.add_argument("--changes", action="store_true",
+                        help="only report courses added/changed since the last --changes run")
+    parser.add_argument("--detect-deletes", action="store_true",
+                        help="with --changes, also scan course ids to find deleted courses")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="local course state cache (SQLite)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="read through an asyncio/aiomysql pool")
+    parser.add_argument("--profile", action="store_true",
+                        help="print query timings, a latency histogram and round trips to stderr")
+    parser.add_argument("--trace", metavar="PATH", help="write every statement as a JSON trace")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        columns = parse_columns(args.columns)
+        profiler = QueryProfiler() if args.profile or args.trace else None
+        started = time.perf_counter()
+        if args.changes:
+            count = report_changes(args.cache, args.detect_deletes, profiler)
+            print(f"{count} changes in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+            if args.profile:
+                profiler.print_report(file=sys.stderr)
+            if args.trace:
+                profiler.write_trace(args.trace)
+            return 0
+
+        def export(out):
+            if args.use_async:
+                return asyncio.run(export_courses_async(out, args.format, columns, args.page_size,
+                                                        args.after_id, profiler))
+            return export_courses(out, args.format, columns, args.page_size, args.after_id, profiler)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as out:
+                count, first_row_at = export(out)
+        else:
+            count, first_row_at = export(sys.stdout)
+        elapsed = time.perf_counter() - started
+        first = f"{first_row_at:.3f}s" if first_row_at is not None else "n/a"
+        print(f"Exported {count} courses in {elapsed:.2f}s (first row after {first})", file=sys.stderr)
+        if args.profile:
+            profiler.print_report(file=sys.stderr)
+        if args.trace:
+            profiler.write_trace(args.trace)
     except Exception as e:
         print(f"Error: {e}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
     if not AIVEN_CONFIG["password"]:
         print("ERROR: AIVEN_PASSWORD not set")
     else:
-        check_courses()
+        sys.exit(main())
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulator JSON Compactor
+Validates the stored block graphs (simulators, simulator_versions, courses.blocks) in parallel, drops dangling connections and rewrites them as minified JSON
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+from simulator_evaluator import is_dangling, normalize_connections, topological_order
+
+BATCH_SIZE = 200
+ER_NO_SUCH_TABLE = 1146
+ER_BAD_FIELD_ERROR = 1054
+# JSON.parse keeps integers exactly only up to here
+MAX_SAFE_INTEGER = 2 ** 53 - 1
+
+# Which JSON columns each table has, and the column guarding against concurrent edits
+SOURCES = {
+    "simulators": {"columns": ("blocks", "connections"), "stamp": "updated_at"},
+    # Versions are write-once snapshots: nothing edits them concurrently. Delta rows hold a
+    # patch, not a graph, and keyframes with deltas against them must keep their exact value,
+    # so both are left to simulator_version_history.py
+    "simulator_versions": {
+        "columns": ("blocks", "connections"), "stamp": None,
+        "where": "storage = 'full' AND NOT EXISTS (SELECT 1 FROM simulator_versions d "
+                 "WHERE d.simulator_id = simulator_versions.simulator_id "
+                 "AND d.base_version = simulator_versions.version_number)",
+    },
+    "courses": {"columns": ("blocks",), "stamp": "updated_at"},
+}
+
+# ===== CANONICAL JSON =====
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+def parse_blob(text):
+    """json.loads, except NaN / Infinity are rejected like JSON.parse does"""
+    return json.loads(text, parse_constant=_reject_constant)
+
+def _js_numbers(value):
+    """Integral floats become ints so they print as JSON.stringify would (5, not 5.0)"""
+    if isinstance(value, float) and value.is_integer() and abs(value) <= MAX_SAFE_INTEGER:
+        return int(value)
+    if isinstance(value, list):
+        return [_js_numbers(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _js_numbers(v) for k, v in value.items()}
+    return value
+
+def canonical_json(value):
+    """Minified JSON. Key order is kept: the visual simulator lists its variables in key order"""
+    return json.dumps(_js_numbers(value), ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+# ===== GRAPHS =====
+
+def _valid_id(block_id):
+    return isinstance(block_id, (int, str)) and not isinstance(block_id, bool)
+
+def check_graph(blocks, connections):
+    """Validate one block graph and drop its dangling connections.
+
+    Returns (blocks, connections, dropped, problems). Problems are blocks
+    without an id or type, duplicate ids (the engine keys blocks by id)
+    and cycles, found with the same Kahn sort as
+    BlockExecutionEngine.topologicalSort. Dangling wires are removed from
+    the top-level list and from per-block `connections`.
+    """
+    if not isinstance(blocks, list):
+        return blocks, connections, 0, ["blocks is not a list"]
+    if connections is None:
+        connections = []
+    if not isinstance(connections, list):
+        return blocks, connections, 0, ["connections is not a list"]
+
+    problems = []
+    ids, seen, duplicates = [], set(), set()
+    for index, block in enumerate(blocks):
+        if not isinstance(block, dict) or not _valid_id(block.get("id")):
+            problems.append(f"block {index} has no id")
+            continue
+        if not block.get("type"):
+            problems.append(f"block {block['id']} has no type")
+        if block["id"] in seen:
+            duplicates.add(block["id"])
+        else:
+            seen.add(block["id"])
+            ids.append(block["id"])
+    if duplicates:
+        problems.append(f"duplicate block ids {sorted(duplicates, key=str)[:10]}")
+
+    kept = [c for c in connections if not is_dangling(c, seen)]
+    dropped = len(connections) - len(kept)
+    cleaned = []
+    for block in blocks:
+        if isinstance(block, dict) and _valid_id(block.get("id")) and isinstance(block.get("connections"), list):
+            wires = [c for c in block["connections"] if not is_dangling(c, seen, block["id"])]
+            dropped += len(block["connections"]) - len(wires)
+            if len(wires) != len(block["connections"]):
+                block = dict(block, connections=wires)
+        cleaned.append(block)
+
+    edges, _ = normalize_connections([b for b in cleaned if isinstance(b, dict) and _valid_id(b.get("id"))], kept)
+    _, cyclic = topological_order(ids, edges)
+    if cyclic:
+        problems.append(f"circular dependency through blocks {cyclic[:10]}")
+    return cleaned, kept, dropped, problems
+
+def compact_row(item):
+    """Worker entry point: (table, row id, {column: text}) -> result dict with the columns to rewrite"""
+    table, row_id, texts = item
+    before = sum(len(t.encode("utf-8")) for t in texts.values() if t)
+    result = {"table": table, "id": row_id, "before": before, "after": before, "dropped": 0,
+              "problems": [], "changes": {}}
+    values = {}
+    for column, text in texts.items():
+        if text is None or not text.strip():
+            values[column] = None
+            continue
+        try:
+            values[column] = parse_blob(text)
+        except ValueError as e:
+            result["problems"].append(f"{column} is not valid JSON ({e})")
+            return result
+
+    if table == "courses":
+        course_blocks = values["blocks"]
+        if course_blocks is None:
+            return result
+        if not isinstance(course_blocks, list):
+            result["problems"].append("blocks is not a list")
+        else:
+            # Custom simulators are embedded as {data: {blocks, connections}} course blocks
+            for position, block in enumerate(course_blocks):
+                data = block.get("data") if isinstance(block, dict) else None
+                if not isinstance(data, dict) or "blocks" not in data:
+                    continue
+                graph, wires, dropped, problems = check_graph(data["blocks"], data.get("connections"))
+                result["dropped"] += dropped
+                result["problems"].extend(f"course block {block.get('id')}: {p}" for p in problems)
+                if dropped:
+                    course_blocks[position] = dict(block, data=dict(data, blocks=graph, connections=wires))
+    else:
+        if values["blocks"] is None:
+            result["problems"].append("blocks is empty")
+            return result
+        graph, wires, dropped, problems = check_graph(values["blocks"], values.get("connections"))
+        result["dropped"], result["problems"] = dropped, problems
+        values["blocks"] = graph
+        if values.get("connections") is not None or dropped:
+            values["connections"] = wires
+
+    after = 0
+    for column, value in values.items():
+        text = texts[column]
+        if value is None:
+            after += len(text.encode("utf-8")) if text else 0
+            continue
+        compact = canonical_json(value)
+        after += len(compact.encode("utf-8"))
+        if compact != text:
+            result["changes"][column] = compact
+    result["after"] = after
+    return result
+
+# ===== DATABASE =====
+
+def iter_row_batches(connection, table, ids=None, batch_size=BATCH_SIZE):
+    """Yield batches of rows of `table` (id, JSON columns, stamp) in id order, one keyset page per query"""
+    source = SOURCES[table]
+    columns = ["id", *source["columns"]] + ([source["stamp"]] if source["stamp"] else [])
+    where = source.get("where")
+    last_id = 0
+    while True:
+        sql = f"SELECT {', '.join(columns)} FROM {table} WHERE id > %s"
+        args = [last_id]
+        if ids:
+            sql += " AND id IN (" + ", ".join(["%s"] * len(ids)) + ")"
+            args.extend(ids)
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(sql + (f" AND {where}" if where else "") + " ORDER BY id LIMIT %s",
+                               args + [batch_size])
+            except Exception as e:
+                # Before simulator_version_history.py adds the delta columns every row is stored in full
+                if not where or getattr(e, "args", (None,))[0] != ER_BAD_FIELD_ERROR:
+                    raise
+                connection.rollback()
+                where = None
+                cursor.execute(sql + " ORDER BY id LIMIT %s", args + [batch_size])
+            rows = cursor.fetchall()
+        connection.commit()
+        if not rows:
+            return
+        last_id = rows[-1]["id"]
+        yield rows
+        if len(rows) < batch_size:
+            return
+
+def write_back(connection, table, changes):
+    """Rewrite one batch of rows in a single transaction; returns the ids written.
+
+    updated_at is assigned its own value so MySQL does not bump it: the
+    graph means the same thing, and change watermarks should not fire. It
+    also guards the write, so a row edited while the pass ran is skipped.
+    """
+    stamp = SOURCES[table]["stamp"]
+    written = []
+    connection.begin()
+    try:
+        with connection.cursor() as cursor:
+            for row_id, columns, stamp_value in changes:
+                assignments = [f"{column} = %s" for column in columns]
+                args = list(columns.values())
+                sql = f"UPDATE {table} SET {', '.join(assignments)}"
+                if stamp:
+                    sql += f", {stamp} = {stamp} WHERE id = %s AND {stamp} = %s"
+                    args += [row_id, stamp_value]
+                else:
+                    sql += " WHERE id = %s"
+                    args.append(row_id)
+                cursor.execute(sql, args)
+                if cursor.rowcount == 1:
+                    written.append(row_id)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return written
+
+def compact_table(connection, executor, table, ids=None, batch_size=BATCH_SIZE, dry_run=False):
+    """Validate and compact every row of one table; returns per-row results"""
+    source = SOURCES[table]
+    results = []
+    for rows in iter_row_batches(connection, table, ids, batch_size):
+        stamps = {row["id"]: row.get(source["stamp"]) for row in rows}
+        items = [(table, row["id"], {column: row[column] for column in source["columns"]}) for row in rows]
+        batch = list(executor.map(compact_row, items))
+        changes = [(r["id"], r["changes"], stamps[r["id"]]) for r in batch if r["changes"]]
+        written = set(write_back(connection, table, changes)) if changes and not dry_run else set()
+        for r in batch:
+            r["written"] = r["id"] in written
+            del r["changes"]
+            results.append(r)
+    return results
+
+def compact_all(connection, tables=tuple(SOURCES), workers=None, ids=None, batch_size=BATCH_SIZE, dry_run=False):
+    """Run every table through the worker pool. Returns (results, tables skipped because they don't exist yet)"""
+    results, missing = [], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for table in tables:
+            try:
+                results.extend(compact_table(connection, executor, table, ids, batch_size, dry_run))
+            except Exception as e:
+                # simulator_versions only exists once server.js has created it
+                if getattr(e, "args", (None,))[0] != ER_NO_SUCH_TABLE:
+                    raise
+                connection.rollback()
+                missing.append(table)
+    return results, missing
+
+def print_report(results, missing, dry_run=False):
+    print("\n📊 Per-row results:")
+    for r in results:
+        saved = r["before"] - r["after"]
+        if not saved and not r["dropped"] and not r["problems"]:
+            continue
+        if r["after"] == r["before"] and not r["dropped"]:
+            status = "="
+        elif dry_run or r["written"]:
+            status = "✓"
+        elif r["problems"] and r["after"] == r["before"]:
+            status = "✗"
+        else:
+            status = "✗ changed while compacting, skipped"
+        pct = 100.0 * saved / r["before"] if r["before"] else 0.0
+        dropped = f", {r['dropped']} dangling connections dropped" if r["dropped"] else ""
+        print(f"  {status} [{r['table']} {r['id']}] {r['before']:,} -> {r['after']:,} bytes "
+              f"({saved:,} saved, {pct:.1f}%){dropped}")
+        for problem in r["problems"]:
+            print(f"      ⚠️ {problem}")
+    for table in missing:
+        print(f"  ℹ️ Table {table} does not exist yet, skipped")
+
+    before = sum(r["before"] for r in results)
+    after = sum(r["after"] for r in results)
+    shrunk = sum(1 for r in results if r["after"] < r["before"])
+    invalid = sum(1 for r in results if r["problems"])
+    print(f"\n{shrunk} of {len(results)} rows shrink, {before - after:,} of {before:,} bytes saved "
+          f"({100.0 * (before - after) / before if before else 0.0:.1f}%), "
+          f"{sum(r['dropped'] for r in results)} dangling connections dropped")
+    if invalid:
+        print(f"❌ {invalid} rows have invalid graphs (see ⚠️ above)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and compact stored simulator JSON")
+    parser.add_argument("--tables", default=",".join(SOURCES), help="comma-separated tables (default: all)")
+    parser.add_argument("--ids", help="comma-separated row ids within those tables (default: every row)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="parser processes (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows read and written per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="report savings and problems, write nothing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in SOURCES]
+    if unknown:
+        print(f"❌ Unknown tables: {', '.join(unknown)} (choose from {', '.join(SOURCES)})")
+        return 1
+    ids = [int(i) for i in args.ids.split(",") if i.strip()] if args.ids else None
+    print(f"🧩 Compacting {', '.join(tables)} with {args.workers} workers{' (dry run)' if args.dry_run else ''}...")
+    started = time.perf_counter()
+    try:
+        with get_pool().connection() as connection:
+            results, missing = compact_all(connection, tables, args.workers, ids, args.batch_size, args.dry_run)
+    except Exception as e:
+        print(f"❌ Compaction failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print_report(results, missing, args.dry_run)
+    print(f"\n✅ Done in {time.perf_counter() - started:.2f}s")
+    return 1 if any(r["problems"] for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Course Bundle Loader
+Indexes on-disk course bundles by manifest and reads their content and questions only when asked
+"""
+
+import io
+import json
+import os
+import zipfile
+from collections.abc import Mapping
+
+# Bundles shipped with the repo: one directory (or .zip) per course
+DEFAULT_BUNDLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "courses")
+MANIFEST_NAME = "manifest.json"
+
+REQUIRED_MANIFEST_KEYS = ("id", "title", "content", "questions")
+
+class BundleError(Exception):
+    pass
+
+class CourseBundle(Mapping):
+    """One course on disk, usable anywhere a course payload dict is expected.
+
+    A bundle is a directory or .zip holding manifest.json, an HTML content
+    file and a JSONL question file (one question object per line). Only the
+    manifest is read up front; "content" and "questions" are read from disk
+    on every access and never cached, so a catalog of any size costs only
+    its manifests until a course is actually written.
+    """
+
+    def __init__(self, path, manifest):
+        missing = [k for k in REQUIRED_MANIFEST_KEYS if k not in manifest]
+        if missing:
+            raise BundleError(f"{path}: manifest missing {', '.join(missing)}")
+        self.path = path
+        self.manifest = manifest
+        self.is_archive = zipfile.is_zipfile(path) if os.path.isfile(path) else False
+
+    @property
+    def id(self):
+        return self.manifest["id"]
+
+    @property
+    def title(self):
+        return self.manifest["title"]
+
+    def _open(self, name):
+        if self.is_archive:
+            archive = zipfile.ZipFile(self.path)
+            try:
+                raw = archive.open(name)
+            except KeyError:
+                archive.close()
+                raise BundleError(f"{self.path}: no {name} in archive")
+            return _ClosingText(raw, archive)
+        return open(os.path.join(self.path, name), encoding="utf-8")
+
+    def read_content(self):
+        with self._open(self.manifest["content"]) as f:
+            return f.read()
+
+    def iter_questions(self):
+        """Stream questions one line at a time"""
+        with self._open(self.manifest["questions"]) as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise BundleError(f"{self.path}: bad question on line {line_number}: {e}")
+
+    def __getitem__(self, key):
+        if key == "content":
+            return self.read_content()
+        if key == "questions":
+            return list(self.iter_questions())
+        if key in ("id", "title"):
+            return self.manifest[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("id", "title", "content", "questions"))
+
+    def __len__(self):
+        return 4
+
+    def __repr__(self):
+        return f"CourseBundle(id={self.id!r}, title={self.title!r}, path={self.path!r})"
+
+class _ClosingText:
+    """Text wrapper for a zip member that also closes the archive"""
+
+    def __init__(self, raw, archive):
+        self._text = io.TextIOWrapper(raw, encoding="utf-8")
+        self._archive = archive
+
+    def __iter__(self):
+        return iter(self._text)
+
+    def read(self):
+        return self._text.read()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._text.close()
+        self._archive.close()
+
+def read_manifest(path):
+    if os.path.isdir(path):
+        with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(MANIFEST_NAME) as f:
+            return json.loads(f.read().decode("utf-8"))
+
+class CourseCatalog:
+    """Manifest index of every bundle under a directory, keyed by course id"""
+
+    def __init__(self, root=DEFAULT_BUNDLE_DIR):
+        self.root = root
+        self.bundles = {}
+        for entry in sorted(os.scandir(root), key=lambda e: e.name):
+            is_bundle_dir = entry.is_dir() and os.path.exists(os.path.join(entry.path, MANIFEST_NAME))
+            is_archive = entry.is_file() and entry.name.endswith(".zip")
+            if not (is_bundle_dir or is_archive):
+                continue
+            bundle = CourseBundle(entry.path, read_manifest(entry.path))
+            if bundle.id in self.bundles:
+                raise BundleError(f"Course id {bundle.id} is in both {self.bundles[bundle.id].path} and {entry.path}")
+            self.bundles[bundle.id] = bundle
+
+    def __len__(self):
+        return len(self.bundles)
+
+    def __iter__(self):
+        return iter(self.bundles.values())
+
+    def get(self, course_id):
+        return self.bundles.get(course_id)
+
+    def select(self, course_ids=None):
+        """Bundles for the given ids (all of them if None), in the order asked for"""
+        if course_ids is None:
+            return list(self.bundles.values())
+        missing = [i for i in course_ids if i not in self.bundles]
+        if missing:
+            raise BundleError(f"No bundle for course id(s): {', '.join(map(str, missing))}")
+        return [self.bundles[i] for i in course_ids]
+
+def pack_bundle(directory, archive_path=None):
+    """Zip a bundle directory into a single-file bundle next to it"""
+    archive_path = archive_path or directory.rstrip(os.sep) + ".zip"
+    manifest = read_manifest(directory)
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name in (MANIFEST_NAME, manifest["content"], manifest["questions"]):
+            archive.write(os.path.join(directory, name), name)
+    return archive_path
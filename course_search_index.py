@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Course Search Index
+Builds a compact on-disk inverted index over approved courses and their questions, refreshed from updated_at, and ranks queries with BM25
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+from collections import Counter
+from html.parser import HTMLParser
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+from course_state_cache import PAGE_SIZE, _timestamp, iter_changed_courses
+
+DEFAULT_INDEX_DIR = os.getenv(
+    "COURSE_SEARCH_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".search_index"),
+)
+STORE_NAME = "documents.sqlite"
+INDEX_NAME = "index.bin"
+QUESTION_BATCH = 500
+
+# Title words count this many times, so a match in the title outranks one in the body
+TITLE_WEIGHT = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# ===== TEXT =====
+
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+    you your we our can into than then there these they those what when which who how why not no do does
+""".split())
+
+# (suffix, replacement), first match wins; applied after plurals are stripped
+_SUFFIXES = (
+    ("ational", "ate"), ("ization", "ize"), ("fulness", "ful"), ("iveness", "ive"), ("ousness", "ous"),
+    ("biliti", "ble"), ("ically", "ic"), ("ation", "ate"), ("alism", "al"), ("ement", ""), ("ments", ""),
+    ("ment", ""), ("ness", ""), ("ally", "al"), ("ing", ""), ("edly", ""), ("ed", ""), ("ly", ""),
+)
+_WORD_RE = re.compile(r"[^\W_]+")
+_DOUBLE_RE = re.compile(r"([^aeioulsz])\1$")
+
+def stem(word):
+    """A light suffix-stripping stemmer: graphs/graphing/graphed -> graph, equations/equation -> equat.
+
+    Index and query go through the same function, so it only has to be
+    consistent, not linguistically exact. Stems keep at least 3 letters.
+    """
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)] + replacement
+            word = _DOUBLE_RE.sub(r"\1", word)
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+def tokenize(text):
+    """Case-folded, stemmed terms of `text`, stopwords removed"""
+    return [stem(w) for w in _WORD_RE.findall((text or "").casefold()) if w not in STOPWORDS]
+
+class _TextExtractor(HTMLParser):
+    SKIP = frozenset(("script", "style", "iframe"))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skip:
+            self._skip -= 1
+        self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+def strip_html(content):
+    """Visible text of an HTML fragment; tags become word breaks"""
+    extractor = _TextExtractor()
+    extractor.feed(content or "")
+    extractor.close()
+    return "".join(extractor.parts)
+
+def document_terms(title, *bodies):
+    counts = Counter()
+    for _ in range(TITLE_WEIGHT):
+        counts.update(tokenize(title))
+    for body in bodies:
+        counts.update(tokenize(body))
+    return counts
+
+def _options_text(options):
+    if isinstance(options, str):
+        try:
+            options = json.loads(options)
+        except json.JSONDecodeError:
+            return options
+    return " ".join(str(o) for o in options or [])
+
+# ===== DOCUMENT STORE =====
+
+STORE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS docs (
+        docno INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        ref_id INTEGER NOT NULL,
+        course_id INTEGER NOT NULL,
+        title TEXT,
+        length INTEGER NOT NULL,
+        UNIQUE (kind, ref_id)
+    );
+    CREATE INDEX IF NOT EXISTS docs_course ON docs (course_id);
+    CREATE TABLE IF NOT EXISTS postings (
+        term TEXT NOT NULL,
+        docno INTEGER NOT NULL,
+        tf INTEGER NOT NULL,
+        PRIMARY KEY (term, docno)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS postings_docno ON postings (docno);
+    CREATE TABLE IF NOT EXISTS course_sources (
+        course_id INTEGER PRIMARY KEY,
+        updated_at TEXT,
+        source_hash TEXT
+    );
+    CREATE TABLE IF NOT EXISTS watermark (
+        name TEXT PRIMARY KEY,
+        updated_at TEXT
+    );
+"""
+
+class DocumentStore:
+    """Term counts of every indexed document, kept in SQLite so a refresh only
+    re-reads courses whose updated_at moved.
+
+    Documents are one per approved course (title, description and content
+    text) and one per question of those courses (question text and
+    options; never the answer or explanation). A course's questions are
+    re-read whenever the course changes, which is why server.js bumps
+    courses.updated_at on question edits.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(STORE_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def watermark(self):
+        row = self.db.execute("SELECT updated_at FROM watermark WHERE name = 'courses'").fetchone()
+        return row["updated_at"] if row else None
+
+    def remove_course(self, course_id):
+        self.db.execute("DELETE FROM postings WHERE docno IN (SELECT docno FROM docs WHERE course_id = ?)", (course_id,))
+        self.db.execute("DELETE FROM docs WHERE course_id = ?", (course_id,))
+
+    def add_document(self, kind, ref_id, course_id, title, counts):
+        cursor = self.db.execute(
+            "INSERT INTO docs (kind, ref_id, course_id, title, length) VALUES (?, ?, ?, ?, ?)",
+            (kind, ref_id, course_id, title, sum(counts.values())))
+        self.db.executemany("INSERT INTO postings (term, docno, tf) VALUES (?, ?, ?)",
+                            [(term, cursor.lastrowid, tf) for term, tf in counts.items()])
+
+    def refresh(self, connection, page_size=PAGE_SIZE):
+        """Re-index courses changed since the watermark and drop deleted ones.
+
+        Course rows are streamed and reduced to term counts as they arrive;
+        their questions are fetched afterwards, once the unbuffered course
+        cursor is done. Returns {"courses", "questions", "removed"} counts.
+        """
+        since = self.watermark()
+        newest = since
+        stored = {r["course_id"]: (r["updated_at"], r["source_hash"])
+                  for r in self.db.execute("SELECT * FROM course_sources")}
+        changed = {}
+        for row in iter_changed_courses(connection, since,
+                                        "id, title, description, content, status, updated_at", page_size):
+            stamp = _timestamp(row["updated_at"])
+            newest = stamp if newest is None or stamp > newest else newest
+            digest = hashlib.sha256(json.dumps(
+                [row["title"], row["description"], row["content"], row["status"]]).encode("utf-8")).hexdigest()
+            if stored.get(row["id"]) == (stamp, digest):
+                continue  # re-read from the watermark's own second, unchanged
+            terms = None
+            if row["status"] == "approved":
+                terms = document_terms(row["title"], row["description"], strip_html(row["content"]))
+            changed[row["id"]] = (stamp, digest, row["title"], terms)
+
+        approved = [course_id for course_id, (_, _, _, terms) in changed.items() if terms is not None]
+        questions = {course_id: [] for course_id in approved}
+        for start in range(0, len(approved), QUESTION_BATCH):
+            ids = approved[start:start + QUESTION_BATCH]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT id, course_id, question_text, options FROM course_questions WHERE course_id IN ("
+                    + ", ".join(["%s"] * len(ids)) + ") ORDER BY course_id, order_index, id", ids)
+                for q in cursor.fetchall():
+                    questions[q["course_id"]].append(q)
+
+        live = set()
+        last_id = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT id FROM courses WHERE id > %s ORDER BY id LIMIT %s", (last_id, page_size))
+                ids = [r["id"] for r in cursor.fetchall()]
+            live.update(ids)
+            if len(ids) < page_size:
+                break
+            last_id = ids[-1]
+        removed = [course_id for course_id in stored if course_id not in live]
+        connection.commit()
+
+        stats = {"courses": 0, "questions": 0, "removed": len(removed)}
+        with self.db:
+            for course_id in removed:
+                self.remove_course(course_id)
+                self.db.execute("DELETE FROM course_sources WHERE course_id = ?", (course_id,))
+            for course_id, (stamp, digest, title, terms) in changed.items():
+                self.remove_course(course_id)
+                self.db.execute(
+                    "INSERT INTO course_sources (course_id, updated_at, source_hash) VALUES (?, ?, ?) "
+                    "ON CONFLICT(course_id) DO UPDATE SET updated_at = excluded.updated_at, "
+                    "source_hash = excluded.source_hash",
+                    (course_id, stamp, digest))
+                if terms is None:
+                    continue
+                self.add_document("course", course_id, course_id, title, terms)
+                stats["courses"] += 1
+                for q in questions[course_id]:
+                    self.add_document("question", q["id"], course_id, q["question_text"][:200],
+                                      document_terms(q["question_text"], _options_text(q["options"])))
+                    stats["questions"] += 1
+            if newest is not None:
+                self.db.execute(
+                    "INSERT INTO watermark (name, updated_at) VALUES ('courses', ?) "
+                    "ON CONFLICT(name) DO UPDATE SET updated_at = excluded.updated_at", (newest,))
+        stats["changed"] = bool(changed or removed)
+        return stats
+
+# ===== INDEX FILE =====
+# Little-endian. Header, then doc lengths (u32 per doc), the lexicon (one
+# fixed-size entry per term, sorted by term bytes), the term bytes, the
+# postings and a JSON list of [kind, ref id, course id, title] per doc.
+# A posting list is varint(docno gap), varint(tf) per doc, docnos ascending.
+
+MAGIC = b"VLSI"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIIIdQQQQQQ")
+LEXICON_ENTRY = struct.Struct("<QIIQI")  # term offset, term length, df, postings offset, postings length
+DOC_LENGTH = struct.Struct("<I")
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def decode_postings(buf, start, end):
+    """Yield (doc, tf) from a varint posting list"""
+    doc = 0
+    pos = start
+    while pos < end:
+        values = []
+        for _ in range(2):
+            value = shift = 0
+            while True:
+                byte = buf[pos]
+                pos += 1
+                value |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            values.append(value)
+        doc += values[0]
+        yield doc, values[1]
+
+def write_index(store, path):
+    """Write the compact index from the document store, atomically.
+
+    Documents get dense numbers in docno order; postings are read from
+    SQLite already sorted by (term, docno), the table's primary key.
+    """
+    dense, meta, lengths = {}, [], bytearray()
+    for row in store.db.execute("SELECT docno, kind, ref_id, course_id, title, length FROM docs ORDER BY docno"):
+        dense[row["docno"]] = len(meta)
+        meta.append([row["kind"], row["ref_id"], row["course_id"], row["title"]])
+        lengths += DOC_LENGTH.pack(row["length"])
+    n_docs = len(meta)
+    avgdl = sum(DOC_LENGTH.unpack_from(lengths, i * DOC_LENGTH.size)[0] for i in range(n_docs)) / n_docs if n_docs else 0.0
+
+    lexicon, terms, postings = bytearray(), bytearray(), bytearray()
+    current, df, start, previous = None, 0, 0, 0
+
+    def close_term():
+        encoded = current.encode("utf-8")
+        lexicon.extend(LEXICON_ENTRY.pack(len(terms), len(encoded), df, start, len(postings) - start))
+        terms.extend(encoded)
+
+    n_terms = 0
+    for term, docno, tf in store.db.execute("SELECT term, docno, tf FROM postings ORDER BY term, docno"):
+        if term != current:
+            if current is not None:
+                close_term()
+                n_terms += 1
+            current, df, start, previous = term, 0, len(postings), 0
+        doc = dense[docno]
+        encode_varint(doc - previous, postings)
+        encode_varint(tf, postings)
+        previous = doc
+        df += 1
+    if current is not None:
+        close_term()
+        n_terms += 1
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    lengths_off = HEADER.size
+    lexicon_off = lengths_off + len(lengths)
+    terms_off = lexicon_off + len(lexicon)
+    postings_off = terms_off + len(terms)
+    meta_off = postings_off + len(postings)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, n_docs, n_terms, avgdl,
+                         lengths_off, lexicon_off, terms_off, postings_off, meta_off, len(meta_bytes))
+    with open(path + ".tmp", "wb") as f:
+        for part in (header, lengths, lexicon, terms, postings, meta_bytes):
+            f.write(part)
+    os.replace(path + ".tmp", path)
+    return {"docs": n_docs, "terms": n_terms, "bytes": meta_off + len(meta_bytes), "postings_bytes": len(postings)}
+
+class SearchIndex:
+    """Read side: the index file is memory-mapped, so opening it costs one
+    header read plus the doc list, and a query only touches the lexicon
+    pages it binary-searches and the posting lists of its terms."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.n_docs, self.n_terms, self.avgdl, self.lengths_off, self.lexicon_off,
+         self.terms_off, self.postings_off, meta_off, meta_len) = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} course search index")
+        self.docs = json.loads(self.buf[meta_off:meta_off + meta_len].decode("utf-8"))
+
+    def close(self):
+        self.buf.close()
+
+    def _entry(self, i):
+        return LEXICON_ENTRY.unpack_from(self.buf, self.lexicon_off + i * LEXICON_ENTRY.size)
+
+    def lookup(self, term):
+        """(df, postings start, postings end) of `term`, or None"""
+        key = term.encode("utf-8")
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            term_off, term_len, df, post_off, post_len = self._entry(mid)
+            start = self.terms_off + term_off
+            probe = self.buf[start:start + term_len]
+            if probe == key:
+                start = self.postings_off + post_off
+                return df, start, start + post_len
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def doc_length(self, doc):
+        return DOC_LENGTH.unpack_from(self.buf, self.lengths_off + doc * DOC_LENGTH.size)[0]
+
+    def search(self, query, limit=10, kinds=None):
+        """BM25-ranked documents matching any query term"""
+        scores = {}
+        for term in set(tokenize(query)):
+            found = self.lookup(term)
+            if found is None:
+                continue
+            df, start, end = found
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            for doc, tf in decode_postings(self.buf, start, end):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_length(doc) / (self.avgdl or 1.0))
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        hits = []
+        for doc, score in ranked:
+            kind, ref_id, course_id, title = self.docs[doc]
+            if kinds and kind not in kinds:
+                continue
+            hits.append({"kind": kind, "id": ref_id, "course_id": course_id, "title": title, "score": score})
+            if len(hits) >= limit:
+                break
+        return hits
+
+def update_index(connection, index_dir=DEFAULT_INDEX_DIR, full=False):
+    """Refresh the document store from the DB and rewrite the index file if anything changed"""
+    os.makedirs(index_dir, exist_ok=True)
+    store_path = os.path.join(index_dir, STORE_NAME)
+    index_path = os.path.join(index_dir, INDEX_NAME)
+    if full and os.path.exists(store_path):
+        os.remove(store_path)
+    store = DocumentStore(store_path)
+    try:
+        stats = store.refresh(connection)
+        if stats["changed"] or not os.path.exists(index_path):
+            stats.update(write_index(store, index_path))
+            stats["written"] = True
+        else:
+            stats["written"] = False
+    finally:
+        store.close()
+    return stats
+
+def print_hits(hits, elapsed):
+    print(f"🔎 {len(hits)} results in {elapsed * 1000:.1f}ms")
+    for hit in hits:
+        where = f"course {hit['course_id']}" if hit["kind"] == "course" else f"question {hit['id']} in course {hit['course_id']}"
+        print(f"  {hit['score']:6.2f}  [{where}] {hit['title']}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the course search index")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR, help="index directory (default ./.search_index)")
+    parser.add_argument("--full", action="store_true", help="re-index every course instead of only changed ones")
+    parser.add_argument("--query", help="search the existing index instead of updating it")
+    parser.add_argument("--limit", type=int, default=10, help="results to show for --query")
+    parser.add_argument("--kind", choices=["course", "question"], help="only return this kind of document")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.query:
+        try:
+            index = SearchIndex(os.path.join(args.index_dir, INDEX_NAME))
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot open index: {e}")
+            return 1
+        started = time.perf_counter()
+        hits = index.search(args.query, args.limit, {args.kind} if args.kind else None)
+        print_hits(hits, time.perf_counter() - started)
+        index.close()
+        return 0
+
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    print(f"🗂️ Updating course search index in {args.index_dir}{' (full rebuild)' if args.full else ''}...")
+    started = time.perf_counter()
+    try:
+        with get_pool().connection() as connection:
+            stats = update_index(connection, args.index_dir, args.full)
+    except Exception as e:
+        print(f"❌ Indexing failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print(f"\n✅ {stats['courses']} courses and {stats['questions']} questions re-indexed, "
+          f"{stats['removed']} removed in {time.perf_counter() - started:.2f}s")
+    if stats["written"]:
+        print(f"  ✓ Index written: {stats['docs']:,} documents, {stats['terms']:,} terms, "
+              f"{stats['bytes'] / 1024:,.1f} KiB ({stats['postings_bytes'] / 1024:,.1f} KiB of postings)")
+    else:
+        print("  ✓ Nothing changed, index left as is")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
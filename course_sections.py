@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Course Sections
+Splits course HTML at its <h2> headings, places each quiz placeholder in its module and stores the sections as separately fetchable chunks
+"""
+
+import hashlib
+import html
+import re
+
+# Bump when the split or placement changes so --sync rewrites every course's sections once
+SECTIONS_VERSION = 2
+
+SECTIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS course_sections (
+        course_id INT NOT NULL,
+        section_index INT NOT NULL,
+        kind VARCHAR(16) NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        module_number INT NULL,
+        question_count INT NOT NULL DEFAULT 0,
+        byte_offset INT NOT NULL,
+        byte_length INT NOT NULL,
+        content_hash CHAR(64) NOT NULL,
+        html LONGTEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (course_id, section_index),
+        FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+    )
+"""
+
+_HEADING_RE = re.compile(r"<h2\b[^>]*>(.*?)</h2\s*>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+_MODULE_RE = re.compile(r"^\s*Module\s+(\d+)\b", re.IGNORECASE)
+
+def ensure_sections_table(cursor):
+    cursor.execute(SECTIONS_TABLE_SQL)
+
+def heading_text(inner_html):
+    return " ".join(html.unescape(_TAG_RE.sub("", inner_html)).split())
+
+def split_sections(content):
+    """Cut content at every <h2>: each section runs from its heading to the next.
+
+    Anything before the first heading becomes a "preamble" section. A
+    section whose heading starts with "Module <n>" is kind "module";
+    the others ("📚 Course Overview", "Summary & Key Takeaways"...) are
+    kind "section". Joining the html of the sections gives back `content`.
+    """
+    headings = list(_HEADING_RE.finditer(content))
+    first = headings[0].start() if headings else len(content)
+    sections = []
+    if content[:first].strip() or not headings:
+        sections.append({"kind": "preamble", "title": "", "module_number": None, "html": content[:first]})
+    for i, m in enumerate(headings):
+        # Whitespace before the first heading stays with it so the join is exact
+        begin = m.start() if sections else 0
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(content)
+        title = heading_text(m.group(1))
+        module = _MODULE_RE.match(title)
+        sections.append({
+            "kind": "module" if module else "section",
+            "title": title[:255],
+            "module_number": int(module.group(1)) if module else None,
+            "html": content[begin:end],
+        })
+    return sections
+
+def placeholder_html(question_id, number):
+    # Styled by .quiz-question-placeholder in styles.css
+    return (f'<div class="quiz-question-placeholder" data-question-id="{question_id}">'
+            f'<strong>❓ Quiz Question {number}:</strong> <em>Question {number} - Answer to check your knowledge</em></div>')
+
+def assign_sections(sections, questions):
+    """Index of the section each question's placeholder goes into.
+
+    A question with a "module" key goes to that module. The rest are
+    split into contiguous runs across the module sections in order, so
+    the first questions land in Module 1 and the last in the final module.
+    That guess is only trusted for a single-module course: with several
+    modules and no "module" key anywhere, or a key naming a module the
+    content lacks, a ValueError asks for the keys instead of misplacing
+    quizzes. Without any module section everything goes to the last
+    section, as before.
+    """
+    modules = [i for i, s in enumerate(sections) if s["kind"] == "module"]
+    by_number = {sections[i]["module_number"]: i for i in modules}
+    if not modules:
+        return [len(sections) - 1] * len(questions)
+    wanted = [q.get("module") if isinstance(q, dict) else None for q in questions]
+    if len(modules) > 1 and questions and all(m is None for m in wanted):
+        raise ValueError(f"the content has {len(modules)} modules but no question says which one it belongs to; "
+                         'add a "module" number to each question')
+    unknown = sorted({m for m in wanted if m is not None and m not in by_number})
+    if unknown:
+        raise ValueError(f"questions name module(s) {unknown} that the content does not have")
+    assigned = []
+    for position, module in enumerate(wanted):
+        target = by_number.get(module)
+        assigned.append(target if target is not None else modules[position * len(modules) // len(questions)])
+    return assigned
+
+def build_sections(content, question_ids, questions=None):
+    """Split `content` and append each question's placeholder to the end of its section.
+
+    `questions` (same order as question_ids) is only read for an optional
+    "module" key. Placeholders keep their course-wide numbering.
+    """
+    sections = split_sections(content)
+    targets = assign_sections(sections, questions or [{}] * len(question_ids))
+    pieces = [[s["html"]] for s in sections]
+    counts = [0] * len(sections)
+    for number, (q_id, target) in enumerate(zip(question_ids, targets), 1):
+        pieces[target].append(placeholder_html(q_id, number))
+        counts[target] += 1
+    for section, parts, count in zip(sections, pieces, counts):
+        section["html"] = "".join(parts)
+        section["question_count"] = count
+    return sections
+
+def assemble(sections):
+    """Full course HTML plus its section index (UTF-8 byte offset and length of every section)"""
+    offset = 0
+    for section in sections:
+        size = len(section["html"].encode("utf-8"))
+        section["byte_offset"] = offset
+        section["byte_length"] = size
+        section["content_hash"] = hashlib.sha256(section["html"].encode("utf-8")).hexdigest()
+        offset += size
+    return "".join(s["html"] for s in sections), sections
+
+def store_sections(cursor, course_id, sections):
+    """Write the section chunks of one course, touching only sections that changed.
+
+    Existing hashes are read first; changed or new sections go out in one
+    multi-row upsert and sections past the new end are deleted.
+    """
+    cursor.execute(
+        "SELECT section_index, content_hash, byte_offset, kind, title FROM course_sections WHERE course_id = %s",
+        (course_id,))
+    stored = {row["section_index"]: (row["content_hash"], row["byte_offset"], row["kind"], row["title"])
+              for row in cursor.fetchall()}
+
+    changed = [(i, s) for i, s in enumerate(sections)
+               if stored.get(i) != (s["content_hash"], s["byte_offset"], s["kind"], s["title"])]
+    if changed:
+        params = []
+        for i, s in changed:
+            params.extend((course_id, i, s["kind"], s["title"], s["module_number"], s.get("question_count", 0),
+                           s["byte_offset"], s["byte_length"], s["content_hash"], s["html"]))
+        cursor.execute(
+            "INSERT INTO course_sections (course_id, section_index, kind, title, module_number, question_count, "
+            "byte_offset, byte_length, content_hash, html) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(changed))
+            + """ ON DUPLICATE KEY UPDATE kind = VALUES(kind), title = VALUES(title),
+                module_number = VALUES(module_number), question_count = VALUES(question_count),
+                byte_offset = VALUES(byte_offset), byte_length = VALUES(byte_length),
+                content_hash = VALUES(content_hash), html = VALUES(html)""",
+            params,
+        )
+    removed = any(i >= len(sections) for i in stored)
+    if removed:
+        cursor.execute("DELETE FROM course_sections WHERE course_id = %s AND section_index >= %s",
+                       (course_id, len(sections)))
+    return len(changed), removed
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local Course State Cache
+Keeps a SQLite copy of every course's id, title, status, updated_at and content hash, refreshed from updated_at watermarks
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+import pymysql
+
+from minify_course_html import minified
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "COURSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".course_state.sqlite"),
+)
+PAGE_SIZE = 1000
+# Bump when authored_hash changes: caches written by an older version are re-pulled
+CACHE_VERSION = 3
+
+# Quiz placeholders that update_course appends to the authored content
+_PLACEHOLDER_RE = re.compile(r'<div class="quiz-question-placeholder"[^>]*>.*?</div>', re.DOTALL)
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS course_state (
+        id INTEGER PRIMARY KEY,
+        title TEXT,
+        status TEXT,
+        updated_at TEXT,
+        content_hash TEXT,
+        authored_hash TEXT
+    );
+    CREATE TABLE IF NOT EXISTS watermark (
+        name TEXT PRIMARY KEY,
+        updated_at TEXT,
+        last_id INTEGER
+    );
+"""
+
+def sha256(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+def authored_hash(content):
+    """Hash of the content with the generated quiz placeholders stripped,
+    so it can be compared with a course bundle's content.html (see bundle_hash)"""
+    return sha256(_PLACEHOLDER_RE.sub("", content or ""))
+
+def bundle_hash(content):
+    """Hash of a bundle's content.html as the injector stores it, minified.
+
+    Stored content is minified whether the injector or minify_course_html.py
+    wrote it last, so only the bundle side needs minifying, once per run.
+    Content injected before the injector minified reports as changed until
+    it is re-injected or minified.
+    """
+    return sha256(minified(content or ""))
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value) if value is not None else None
+
+def iter_changed_courses(connection, since, columns, page_size=PAGE_SIZE):
+    """Stream `columns` of courses with updated_at at or past `since` (all if None), oldest first"""
+    return iter_changed_rows(connection, "courses", since, columns, page_size)
+
+def iter_changed_rows(connection, table, since, columns, page_size=PAGE_SIZE):
+    """Stream `columns` of `table` rows with updated_at at or past `since` (all if None), oldest first.
+
+    Keyset pages on (updated_at, id). The first page includes the whole
+    second of `since`: later writes in that second were not seen yet, so
+    callers must treat the rows as upserts. `columns` must include id and
+    updated_at.
+    """
+    sql = (f"SELECT {columns} FROM {table} "
+           "WHERE (updated_at > %s OR (updated_at = %s AND id > %s)) "
+           "ORDER BY updated_at, id LIMIT %s")
+    last_at, last_id = since or "1970-01-01 00:00:00", 0
+    first_page = since is not None
+    while True:
+        seen = 0
+        with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+            if first_page:
+                cursor.execute(sql.replace("updated_at > %s OR", "updated_at >= %s OR"),
+                               (last_at, last_at, last_id, page_size))
+                first_page = False
+            else:
+                cursor.execute(sql, (last_at, last_at, last_id, page_size))
+            for row in cursor:
+                seen += 1
+                last_at, last_id = _timestamp(row["updated_at"]), row["id"]
+                yield row
+        if seen < page_size:
+            return
+
+class CourseStateCache:
+    """What we last saw of the courses table, plus the updated_at watermark.
+
+    refresh() only pulls rows with updated_at at or past the watermark, in
+    keyset pages on (updated_at, id). Rows sharing the watermark's second are
+    re-read and de-duplicated against the cache, since TIMESTAMP only has
+    one-second resolution. Deletions are invisible to a watermark, so they
+    are found separately by diffing the id list (detect_deletes).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(CACHE_SCHEMA)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] < CACHE_VERSION:
+            # Hashes from an older authored_hash never match: start over from a full refresh
+            self.db.execute("DELETE FROM course_state")
+            self.db.execute("DELETE FROM watermark")
+            self.db.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def watermark(self):
+        row = self.db.execute("SELECT updated_at, last_id FROM watermark WHERE name = 'courses'").fetchone()
+        return (row["updated_at"], row["last_id"]) if row else (None, 0)
+
+    def cached(self, course_id):
+        return self.db.execute("SELECT * FROM course_state WHERE id = ?", (course_id,)).fetchone()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM course_state").fetchone()[0]
+
+    def iter_changed_rows(self, connection, page_size=PAGE_SIZE):
+        """Stream courses changed since the watermark, oldest first"""
+        since, _ = self.watermark()
+        return iter_changed_courses(connection, since, "id, title, status, updated_at, content", page_size)
+
+    def refresh(self, connection, page_size=PAGE_SIZE):
+        """Pull changes since the watermark; returns {"new": [...], "modified": [...]}"""
+        changes = {"new": [], "modified": []}
+        newest = self.watermark()
+        for row in self.iter_changed_rows(connection, page_size):
+            state = {
+                "id": row["id"],
+                "title": row["title"],
+                "status": row["status"],
+                "updated_at": _timestamp(row["updated_at"]),
+                "content_hash": sha256(row["content"]),
+                "authored_hash": authored_hash(row["content"]),
+            }
+            previous = self.cached(row["id"])
+            if previous is None:
+                changes["new"].append(state)
+            elif any(previous[k] != state[k] for k in ("title", "status", "content_hash")):
+                changes["modified"].append({"before": dict(previous), "after": state})
+            self.db.execute(
+                "INSERT INTO course_state (id, title, status, updated_at, content_hash, authored_hash) "
+                "VALUES (:id, :title, :status, :updated_at, :content_hash, :authored_hash) "
+                "ON CONFLICT(id) DO UPDATE SET title = excluded.title, status = excluded.status, "
+                "updated_at = excluded.updated_at, content_hash = excluded.content_hash, "
+                "authored_hash = excluded.authored_hash",
+                state)
+            if newest[0] is None or (state["updated_at"], state["id"]) > (newest[0], newest[1] or 0):
+                newest = (state["updated_at"], state["id"])
+        if newest[0] is not None:
+            self.db.execute(
+                "INSERT INTO watermark (name, updated_at, last_id) VALUES ('courses', ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET updated_at = excluded.updated_at, last_id = excluded.last_id",
+                newest)
+        self.db.commit()
+        return changes
+
+    def detect_deletes(self, connection, page_size=PAGE_SIZE):
+        """Drop cached courses that no longer exist; only ids cross the wire"""
+        live = set()
+        last_id = 0
+        while True:
+            seen = 0
+            with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+                cursor.execute("SELECT id FROM courses WHERE id > %s ORDER BY id LIMIT %s", (last_id, page_size))
+                for row in cursor:
+                    seen += 1
+                    last_id = row["id"]
+                    live.add(row["id"])
+            if seen < page_size:
+                break
+        deleted = [dict(r) for r in self.db.execute("SELECT * FROM course_state") if r["id"] not in live]
+        self.db.executemany("DELETE FROM course_state WHERE id = ?", [(r["id"],) for r in deleted])
+        self.db.commit()
+        return deleted
+
+    def diff_bundles(self, bundles):
+        """Dry-run diff of course bundles against the cached DB state.
+
+        Returns one (course id, title, action, detail) tuple per bundle, where
+        action is 'missing' (no such course in the DB), 'update' or 'unchanged'.
+        """
+        plan = []
+        for bundle in bundles:
+            cached = self.cached(bundle["id"])
+            if cached is None:
+                plan.append((bundle["id"], bundle["title"], "missing", "course id not in database"))
+                continue
+            differences = []
+            if cached["title"] != bundle["title"]:
+                differences.append(f"title '{cached['title']}' -> '{bundle['title']}'")
+            if cached["authored_hash"] != bundle_hash(bundle["content"]):
+                differences.append("content changed")
+            action = "update" if differences else "unchanged"
+            plan.append((bundle["id"], bundle["title"], action, ", ".join(differences)))
+        return plan
+
+def print_changes(changes, deleted=None):
+    total = len(changes["new"]) + len(changes["modified"]) + len(deleted or [])
+    print(f"--- Changes since last check ({total}) ---")
+    for state in changes["new"]:
+        print(f"+ ID: {state['id']} | Title: {state['title']} | {state['status']} | {state['updated_at']}")
+    for change in changes["modified"]:
+        before, after = change["before"], change["after"]
+        fields = [k for k in ("title", "status") if before[k] != after[k]]
+        if before["content_hash"] != after["content_hash"]:
+            fields.append("content")
+        print(f"~ ID: {after['id']} | Title: {after['title']} | changed: {', '.join(fields)} | {after['updated_at']}")
+    for state in deleted or []:
+        print(f"- ID: {state['id']} | Title: {state['title']}")
+    print("------------------------")
@@ -8,33 +8,16 @@ This script connects to the Aiven.io hosted MySQL database and injects two compl
 import pymysql
 import json
 import sys
-import os
 import io
 from datetime import datetime
-from dotenv import load_dotenv
 
-# Load environment variables from .env
-load_dotenv()
+# Credentials are loaded from .env / environment variables by the shared layer
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
 
 # Fix for Windows encoding issues with emojis
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-# ===== AIVEN DATABASE CREDENTIALS =====
-# Load from environment variables for security (NEVER hardcode passwords!)
-AIVEN_CONFIG = {
-    "charset": "utf8mb4",
-    "connect_timeout": 10,
-    "cursorclass": pymysql.cursors.DictCursor,
-    "db": os.getenv("AIVEN_DB", "defaultdb"),
-    "host": os.getenv("AIVEN_HOST", "veelearndb-asterloop-483e.i.aivencloud.com"),
-    "password": os.getenv("AIVEN_PASSWORD", ""),
-    "read_timeout": 10,
-    "port": int(os.getenv("AIVEN_PORT", "26399")),
-    "user": os.getenv("AIVEN_USER", "avnadmin"),
-    "write_timeout": 10,
-}
-
 # ===== COURSE DATA =====
 ALGEBRA_COURSE = {
     "title": "Algebra Fundamentals",
@@ -73,12 +56,12 @@ QUANTUM_MECHANICS_COURSE = {
 }
 
 def connect_to_aiven():
-    """Connect to Aiven database"""
+    """Check out a pooled connection to the Aiven database"""
     try:
         print("🔗 Connecting to Aiven database...")
-        connection = pymysql.connect(**AIVEN_CONFIG)
+        pooled = get_pool().acquire()
         print("✅ Connected to Aiven database successfully!")
-        return connection
+        return pooled
     except pymysql.Error as e:
         print(f"❌ Connection failed: {e}")
         return None
@@ -96,8 +79,8 @@ def main():
         print("  Bash: export AIVEN_PASSWORD='your-password'")
         return 1
     
-    connection = connect_to_aiven()
-    if not connection:
+    pooled = connect_to_aiven()
+    if not pooled:
         return 1
     
     try:
@@ -107,7 +90,8 @@ def main():
         print(f"❌ Error: {e}")
         return 1
     finally:
-        connection.close()
+        get_pool().release(pooled)
+        close_pool()
     
     return 0
 
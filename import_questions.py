@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bulk Question Bank Importer
+Streams CSV/JSONL question files, validates rows in a process pool and writes them in batched transactions
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+from ENHANCED_COURSES_WITH_CONTENT import (QUESTION_BATCH_SIZE, QUESTION_COLUMNS, QUESTION_ROW_PLACEHOLDER,
+                                           question_row, shuffle_question_options)
+
+# Mirrors the course_questions.question_type ENUM in server.js
+QUESTION_TYPES = ("multiple_choice", "true_false", "short_answer")
+TRUE_FALSE_OPTIONS = ["True", "False"]
+MAX_POINTS = 2 ** 31 - 1
+
+VALIDATION_CHUNK_SIZE = 500
+
+# ===== READING =====
+
+def parse_options(value):
+    """Options may be a JSON array or a '|'-separated string (handy in CSV)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, list):
+        return value
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [o.strip() for o in value.split("|")]
+
+def read_jsonl_rows(path):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {"_error": f"invalid JSON: {e}"}
+
+def read_csv_rows(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+def read_rows(path):
+    """Yield (line number, raw row dict) from a .jsonl or .csv file, one row at a time"""
+    return read_csv_rows(path) if path.lower().endswith(".csv") else read_jsonl_rows(path)
+
+# ===== VALIDATION (runs in worker processes) =====
+
+def _as_int(value, field, errors):
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        errors.append(f"{field} must be an integer")
+        return None
+    if isinstance(value, float) and value != number:
+        errors.append(f"{field} must be an integer")
+    return number
+
+def validate_row(line_number, raw, default_course_id=None):
+    """Check one row against the course_questions schema.
+
+    Returns (line_number, question or None, errors). Pure and picklable so it
+    can run in a process pool.
+    """
+    if "_error" in raw:
+        return line_number, None, [raw["_error"]]
+    errors = []
+
+    course_id = _as_int(raw.get("course_id"), "course_id", errors)
+    if course_id is None:
+        course_id = default_course_id
+    if course_id is None:
+        errors.append("course_id is required (column or --course-id)")
+
+    text = (raw.get("question_text") or "").strip()
+    if not text:
+        errors.append("question_text is required")
+
+    question_type = (raw.get("question_type") or "multiple_choice").strip()
+    if question_type not in QUESTION_TYPES:
+        errors.append(f"question_type must be one of {', '.join(QUESTION_TYPES)}")
+
+    try:
+        options = parse_options(raw.get("options"))
+    except (json.JSONDecodeError, AttributeError) as e:
+        options = None
+        errors.append(f"options is not a JSON array or '|' list: {e}")
+    if options is not None and not all(isinstance(o, str) and o.strip() for o in options):
+        errors.append("options must be non-empty strings")
+    if question_type == "true_false" and not options:
+        options = list(TRUE_FALSE_OPTIONS)
+    if question_type == "multiple_choice" and (not options or len(options) < 2):
+        errors.append("multiple_choice needs at least two options")
+    if options and len(set(options)) != len(options):
+        errors.append("options contain duplicates")
+
+    correct = raw.get("correct_answer")
+    correct = correct.strip() if isinstance(correct, str) else correct
+    if correct is None or correct == "":
+        errors.append("correct_answer is required")
+    elif question_type in ("multiple_choice", "true_false") and options and correct not in options:
+        errors.append("correct_answer is not one of the options")
+
+    points = _as_int(raw.get("points"), "points", errors)
+    if points is None:
+        points = 1
+    if not 0 <= points <= MAX_POINTS:
+        errors.append("points must be between 0 and 2^31-1")
+
+    order_index = _as_int(raw.get("order_index"), "order_index", errors)
+
+    if errors:
+        return line_number, None, errors
+    return line_number, {
+        "course_id": course_id,
+        "question_text": text,
+        "question_type": question_type,
+        "options": options or [],
+        "correct_answer": str(correct),
+        "explanation": (raw.get("explanation") or "").strip() or None,
+        "points": points,
+        "order_index": order_index,
+    }, []
+
+def validate_chunk(chunk, default_course_id=None):
+    return [validate_row(line_number, raw, default_course_id) for line_number, raw in chunk]
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def validate_stream(rows, workers=None, default_course_id=None, chunk_size=VALIDATION_CHUNK_SIZE):
+    """Validate rows in a process pool, yielding results in file order.
+
+    At most 2 * workers chunks are in flight, so memory stays bounded no
+    matter how large the input file is (Executor.map would read it all).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunked(rows, chunk_size):
+            yield from validate_chunk(chunk, default_course_id)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk in chunked(rows, chunk_size):
+            in_flight.append(executor.submit(validate_chunk, chunk, default_course_id))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+# ===== WRITING =====
+
+def insert_question_rows(cursor, questions):
+    """One multi-row INSERT for questions that may belong to different courses.
+
+    The courses' updated_at is bumped too, inside the caller's transaction,
+    so updated_at-driven jobs (course cache, search index) see the new questions.
+    """
+    params = []
+    for q in questions:
+        params.extend(question_row(q["course_id"], q))
+    cursor.execute(
+        f"INSERT INTO course_questions {QUESTION_COLUMNS} VALUES "
+        + ", ".join([QUESTION_ROW_PLACEHOLDER] * len(questions)),
+        params,
+    )
+    course_ids = sorted({q["course_id"] for q in questions})
+    cursor.execute(
+        "UPDATE courses SET updated_at = CURRENT_TIMESTAMP WHERE id IN (" + ", ".join(["%s"] * len(course_ids)) + ")",
+        course_ids,
+    )
+
+class QuestionImporter:
+    """Consumes validated rows and writes them in batched transactions.
+
+    Only the current batch, the known course ids and each course's used
+    order_index values are held in memory. Rows without an order_index are
+    numbered after the course's existing questions; a row whose order_index
+    is already taken is rejected, since sync_course keys questions on it and
+    would delete the duplicate. A failing batch is retried row by row so one
+    bad row is reported instead of sinking its neighbours.
+    """
+
+    def __init__(self, pool, batch_size=QUESTION_BATCH_SIZE, shuffle=False, dry_run=False, errors_out=None):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.dry_run = dry_run
+        self.errors_out = errors_out
+        self.batch = []
+        self.course_exists = {}
+        self.used_order_indexes = {}
+        self.next_order_index = {}
+        self.read = self.valid = self.invalid = self.inserted = 0
+
+    def error(self, line_number, errors):
+        self.invalid += 1
+        if self.errors_out:
+            self.errors_out.write(json.dumps({"line": line_number, "errors": errors}, ensure_ascii=False) + "\n")
+
+    def check_course(self, course_id):
+        if course_id not in self.course_exists:
+            used = set()
+            if self.dry_run and self.pool is None:
+                self.course_exists[course_id] = True
+            else:
+                with self.pool.cursor() as cursor:
+                    cursor.execute("SELECT id FROM courses WHERE id = %s", (course_id,))
+                    self.course_exists[course_id] = cursor.fetchone() is not None
+                    cursor.execute("SELECT order_index FROM course_questions WHERE course_id = %s", (course_id,))
+                    used = {row["order_index"] for row in cursor.fetchall()}
+            self.used_order_indexes[course_id] = used
+            self.next_order_index[course_id] = max(used, default=0) + 1
+        return self.course_exists[course_id]
+
+    def add(self, line_number, question, errors):
+        self.read += 1
+        if errors:
+            self.error(line_number, errors)
+            return
+        if not self.check_course(question["course_id"]):
+            self.error(line_number, [f"course {question['course_id']} does not exist"])
+            return
+        course_id = question["course_id"]
+        used = self.used_order_indexes[course_id]
+        if question["order_index"] is None:
+            question["order_index"] = self.next_order_index[course_id]
+        elif question["order_index"] in used:
+            self.error(line_number, [f"order_index {question['order_index']} is already used in course {course_id}"])
+            return
+        used.add(question["order_index"])
+        self.next_order_index[course_id] = max(self.next_order_index[course_id], question["order_index"] + 1)
+        if self.shuffle:
+            question = shuffle_question_options(question)
+        self.valid += 1
+        self.batch.append((line_number, question))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self.batch = self.batch, []
+        if not batch or self.dry_run:
+            return
+        try:
+            with self.pool.transaction() as cursor:
+                insert_question_rows(cursor, [q for _, q in batch])
+            self.inserted += len(batch)
+        except Exception:
+            for line_number, question in batch:
+                try:
+                    with self.pool.transaction() as cursor:
+                        insert_question_rows(cursor, [question])
+                    self.inserted += 1
+                except Exception as e:
+                    self.valid -= 1
+                    self.error(line_number, [f"insert failed: {e}"])
+
+def import_file(path, pool, workers=None, batch_size=QUESTION_BATCH_SIZE, default_course_id=None,
+                shuffle=False, dry_run=False, errors_out=None, progress_every=10000):
+    importer = QuestionImporter(pool, batch_size, shuffle, dry_run, errors_out)
+    rows = read_rows(path)
+    started = time.perf_counter()
+    for line_number, question, errors in validate_stream(rows, workers, default_course_id):
+        importer.add(line_number, question, errors)
+        if progress_every and importer.read % progress_every == 0:
+            elapsed = time.perf_counter() - started
+            print(f"  ... {importer.read:,} rows ({importer.read / elapsed:,.0f} rows/sec)")
+    importer.flush()
+    return importer, time.perf_counter() - started
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import a CSV/JSONL question bank into course_questions")
+    parser.add_argument("path", help="question file (.jsonl or .csv)")
+    parser.add_argument("--course-id", type=int, help="course for rows without a course_id column")
+    parser.add_argument("--workers", type=int, default=None, help="validation processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=QUESTION_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument("--shuffle", action="store_true", help="shuffle the stored option order (students already get their own order, see quiz_variants.py)")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    parser.add_argument("--errors", help="write per-row errors as JSONL to this file (default stderr)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.dry_run and not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    errors_out = open(args.errors, "w", encoding="utf-8") if args.errors else sys.stderr
+    print(f"📥 Importing {args.path}{' (dry run)' if args.dry_run else ''}...")
+    try:
+        pool = get_pool() if AIVEN_CONFIG["password"] else None
+        importer, elapsed = import_file(args.path, pool, args.workers, args.batch_size, args.course_id,
+                                        args.shuffle, args.dry_run, errors_out)
+    except Exception as e:
+        print(f"❌ Import failed: {e}")
+        return 1
+    finally:
+        if args.errors:
+            errors_out.close()
+        close_pool()
+
+    rate = importer.read / elapsed if elapsed > 0 else 0.0
+    print(f"\n✅ Read {importer.read:,} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    print(f"  ✓ Valid: {importer.valid:,}  Inserted: {importer.inserted:,}")
+    print(f"  ✗ Rejected: {importer.invalid:,}" + (f" (details in {args.errors})" if args.errors else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
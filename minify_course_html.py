@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Course HTML Minifier
+Normalizes stored courses.content in parallel: collapses whitespace, swaps known inline styles for classes and writes back only courses that shrank
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+from course_sections import assemble, ensure_sections_table, split_sections, store_sections
+
+BATCH_SIZE = 50
+
+def normalize_style(style):
+    """Canonical form of a style attribute: lower-case properties, single spaces, no trailing ';'"""
+    declarations = []
+    for declaration in style.split(";"):
+        prop, sep, value = declaration.partition(":")
+        if sep and prop.strip():
+            declarations.append(f"{prop.strip().lower()}: {' '.join(value.split())}")
+    return "; ".join(declarations)
+
+# Inline styles repeated across course HTML and the class in styles.css that replaces them.
+# Add a rule to styles.css before adding an entry here.
+STYLE_CLASSES = {normalize_style(style): cls for style, cls in (
+    # Placeholders written by ENHANCED_COURSES_WITH_CONTENT.py before they became class-only
+    ("background: #e0e7ff; border: 2px solid #667eea; padding: 1.5em; margin: 1.5em 0; "
+     "border-radius: 8px; user-select: none;", "quiz-question-placeholder"),
+    # PhET iframes in the course bundles
+    ("border: 1px solid #ccc; margin: 20px 0;", "course-sim-frame"),
+)}
+
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"))
+# Whitespace inside these is significant and is left as is
+PRESERVE_ELEMENTS = frozenset(("pre", "textarea", "script", "style"))
+# Whitespace-only text between two of these never renders, so it is dropped
+BLOCK_ELEMENTS = frozenset((
+    "address", "article", "aside", "blockquote", "body", "dd", "details", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "head", "header", "hr",
+    "html", "li", "link", "main", "meta", "nav", "ol", "p", "pre", "script", "section", "style", "summary",
+    "table", "tbody", "td", "tfoot", "th", "thead", "title", "tr", "ul"))
+
+# Only ASCII whitespace collapses; &nbsp; (U+00A0) is content
+_WHITESPACE_RE = re.compile(r"[ \t\n\r\f]+")
+_WHITESPACE = " \t\n\r\f"
+
+def collapse_whitespace(text):
+    return _WHITESPACE_RE.sub(lambda m: "\n" if "\n" in m.group() else " ", text)
+
+def _quote(value):
+    return value.replace("&", "&amp;").replace('"', "&quot;")
+
+class HTMLMinifier(HTMLParser):
+    """Re-emits the token stream of an HTML document with insignificant whitespace removed.
+
+    Entities are passed through untouched (convert_charrefs=False), comments
+    are dropped, and a style attribute found in STYLE_CLASSES is replaced
+    by its class. Whitespace runs collapse to one character (a newline if
+    the run had one, so lines stay readable); whitespace-only text between
+    two block-level tags is dropped.
+    """
+
+    def __init__(self, style_classes=STYLE_CLASSES):
+        super().__init__(convert_charrefs=False)
+        self.style_classes = style_classes
+        self.out = []
+        self.styles = Counter()
+        self._preserve = 0
+        self._pending = None
+        self._last_tag = None
+
+    def _emit_pending(self, next_tag):
+        pending, self._pending = self._pending, None
+        if pending is not None and not (self._last_tag in BLOCK_ELEMENTS and next_tag in BLOCK_ELEMENTS):
+            self.out.append(pending)
+
+    def _tag(self, tag, markup):
+        self._emit_pending(tag)
+        self.out.append(markup)
+        self._last_tag = tag
+
+    def _attrs(self, attrs):
+        parts, classes, replaced = [], None, None
+        for name, value in attrs:
+            if name == "style" and value is not None:
+                style = normalize_style(value)
+                replaced = self.style_classes.get(style)
+                if replaced or not style:
+                    continue
+                self.styles[style] += 1
+                value = style
+            if name == "class" and value is not None:
+                classes = len(parts)
+            parts.append([name, value])
+        if replaced:
+            if classes is None:
+                parts.append(["class", replaced])
+            elif replaced not in (parts[classes][1] or "").split():
+                parts[classes][1] = f"{parts[classes][1]} {replaced}".strip()
+        return "".join(f" {name}" if value is None else f' {name}="{_quote(value)}"' for name, value in parts)
+
+    def handle_starttag(self, tag, attrs):
+        self._tag(tag, f"<{tag}{self._attrs(attrs)}>")
+        if tag in PRESERVE_ELEMENTS:
+            self._preserve += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._tag(tag, f"<{tag}{self._attrs(attrs)}>" if tag in VOID_ELEMENTS else f"<{tag}{self._attrs(attrs)}/>")
+
+    def handle_endtag(self, tag):
+        if tag in PRESERVE_ELEMENTS and self._preserve:
+            self._preserve -= 1
+        self._tag(tag, f"</{tag}>")
+
+    def handle_data(self, data):
+        if self._preserve:
+            self._emit_pending(None)
+            self.out.append(data)
+            return
+        if self._pending is not None:
+            # Text split across handle_data calls
+            data, self._pending = self._pending + data, None
+        text = collapse_whitespace(data)
+        if text.strip(_WHITESPACE):
+            self.out.append(text)
+        else:
+            self._pending = text
+
+    def handle_entityref(self, name):
+        self._emit_pending(None)
+        self.out.append(f"&{name};")
+
+    def handle_charref(self, name):
+        self._emit_pending(None)
+        self.out.append(f"&#{name};")
+
+    def handle_comment(self, data):
+        if data.startswith("[if") or data.endswith("<![endif]"):
+            self._emit_pending(None)
+            self.out.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self._tag(None, f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self._tag(None, f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self._tag(None, f"<![{data}]>")
+
+    def result(self):
+        self.close()
+        self._pending = None
+        return "".join(self.out).strip(_WHITESPACE)
+
+def minify_html(content, style_classes=STYLE_CLASSES):
+    """Minified content plus a Counter of the inline styles it still has"""
+    minifier = HTMLMinifier(style_classes)
+    minifier.feed(content)
+    return minifier.result(), minifier.styles
+
+@lru_cache(maxsize=64)
+def minified(content):
+    """minify_html(content)[0], memoized so the injector and the dry-run diff
+    minify each bundle's content once per run, not on every write or diff"""
+    return minify_html(content)[0]
+
+def minify_course(item):
+    """Worker entry point: (course id, content) -> (course id, minified content, remaining styles)"""
+    course_id, content = item
+    minified, styles = minify_html(content or "")
+    return course_id, minified, styles
+
+# ===== DATABASE =====
+
+def iter_course_batches(connection, course_ids=None, batch_size=BATCH_SIZE):
+    """Yield batches of (id, content, updated_at) in id order, one keyset page per query"""
+    last_id = 0
+    while True:
+        sql = "SELECT id, content, updated_at FROM courses WHERE id > %s"
+        args = [last_id]
+        if course_ids:
+            sql += " AND id IN (" + ", ".join(["%s"] * len(course_ids)) + ")"
+            args.extend(course_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(sql + " ORDER BY id LIMIT %s", args + [batch_size])
+            rows = cursor.fetchall()
+        connection.commit()
+        if not rows:
+            return
+        last_id = rows[-1]["id"]
+        yield rows
+        if len(rows) < batch_size:
+            return
+
+def sections_for(content):
+    sections = split_sections(content)
+    for section in sections:
+        section["question_count"] = section["html"].count('class="quiz-question-placeholder')
+    return assemble(sections)[1]
+
+def write_back(connection, changes):
+    """Write one batch of minified courses in a single transaction.
+
+    A course is only overwritten if updated_at still matches what was read,
+    so an edit saved while the pass ran is never clobbered. Courses that
+    have stored sections get them re-cut from the new content.
+    Returns the ids actually written.
+    """
+    written = []
+    connection.begin()
+    try:
+        with connection.cursor() as cursor:
+            for course_id, minified, updated_at in changes:
+                cursor.execute("UPDATE courses SET content = %s WHERE id = %s AND updated_at = %s",
+                               (minified, course_id, updated_at))
+                if cursor.rowcount != 1:
+                    continue
+                written.append(course_id)
+                cursor.execute("SELECT 1 AS found FROM course_sections WHERE course_id = %s LIMIT 1", (course_id,))
+                if cursor.fetchone():
+                    store_sections(cursor, course_id, sections_for(minified))
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return written
+
+def minify_courses(connection, workers=None, course_ids=None, batch_size=BATCH_SIZE, dry_run=False):
+    """Minify every course (or `course_ids`), parsing on a pool of worker processes.
+
+    Returns per-course results and a Counter of inline styles left in the
+    minified HTML, which are the candidates for the next STYLE_CLASSES entry.
+    """
+    with connection.cursor() as cursor:
+        # DDL commits implicitly, so do it before any write transaction
+        ensure_sections_table(cursor)
+    connection.commit()
+
+    results, styles = [], Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in iter_course_batches(connection, course_ids, batch_size):
+            stamps = {row["id"]: row["updated_at"] for row in rows}
+            before = {row["id"]: len((row["content"] or "").encode("utf-8")) for row in rows}
+            changes = []
+            for course_id, minified, remaining in executor.map(
+                    minify_course, [(row["id"], row["content"]) for row in rows]):
+                styles.update(remaining)
+                after = len(minified.encode("utf-8"))
+                result = {"course_id": course_id, "before": before[course_id], "after": after, "written": False}
+                if after < before[course_id]:
+                    changes.append((course_id, minified, stamps[course_id]))
+                results.append(result)
+            if changes and not dry_run:
+                written = set(write_back(connection, changes))
+                for result in results[-len(rows):]:
+                    result["written"] = result["course_id"] in written
+    return results, styles
+
+def print_report(results, styles, dry_run=False):
+    print("\n📊 Per-course results:")
+    for r in results:
+        saved = r["before"] - r["after"]
+        if saved <= 0:
+            status = "="
+        elif dry_run or r["written"]:
+            status = "✓"
+        else:
+            status = "✗ changed while minifying, skipped"
+        pct = 100.0 * saved / r["before"] if r["before"] else 0.0
+        print(f"  {status} [{r['course_id']}] {r['before']:,} -> {r['after']:,} bytes ({saved:,} saved, {pct:.1f}%)")
+    before = sum(r["before"] for r in results)
+    after = sum(r["after"] for r in results)
+    changed = sum(1 for r in results if r["after"] < r["before"])
+    print(f"\n{changed} of {len(results)} courses shrink, {before - after:,} of {before:,} bytes saved "
+          f"({100.0 * (before - after) / before if before else 0.0:.1f}%)")
+    repeated = [(style, n) for style, n in styles.most_common(5) if n > 1]
+    if repeated:
+        print("\nℹ️ Most repeated inline styles left (candidates for a class in styles.css):")
+        for style, n in repeated:
+            print(f"  {n:>5}x {style}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Minify stored course HTML")
+    parser.add_argument("--course-ids", help="comma-separated course ids (default: every course)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="parser processes (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="courses read and written per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="report the savings, write nothing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    course_ids = [int(i) for i in args.course_ids.split(",") if i.strip()] if args.course_ids else None
+    print(f"🧹 Minifying course HTML with {args.workers} workers{' (dry run)' if args.dry_run else ''}...")
+    started = time.perf_counter()
+    try:
+        with get_pool().connection() as connection:
+            results, styles = minify_courses(connection, args.workers, course_ids, args.batch_size, args.dry_run)
+    except Exception as e:
+        print(f"❌ Minify failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print_report(results, styles, args.dry_run)
+    print(f"\n✅ Done in {time.perf_counter() - started:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
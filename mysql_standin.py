@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-Process MySQL Stand-In for Benchmarks and Dry Runs
+A SQLite-backed connection with the pymysql cursor API, optional per-round-trip latency and round-trip counting
+"""
+
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Core tables, copied from initializeDatabase() in veelearn-backend/server.js (with its column migrations applied)
+SERVER_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        role ENUM('superadmin', 'admin', 'teacher', 'user') DEFAULT 'user',
+        is_admin_approved BOOLEAN DEFAULT FALSE,
+        shells INT DEFAULT 0,
+        total_volunteer_hours FLOAT DEFAULT 0,
+        is_verified_creator BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_email (email),
+        INDEX idx_role (role)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS courses (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        content LONGTEXT,
+        blocks LONGTEXT,
+        creator_id INT,
+        status ENUM('pending', 'approved', 'rejected', 'draft') DEFAULT 'pending',
+        is_paid BOOLEAN DEFAULT FALSE,
+        shells_cost INT DEFAULT 50,
+        feedback TEXT,
+        creation_time INT DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (creator_id) REFERENCES users(id) ON DELETE CASCADE,
+        INDEX idx_status (status),
+        INDEX idx_creator (creator_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS course_questions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        course_id INT NOT NULL,
+        question_text TEXT NOT NULL,
+        question_type ENUM('multiple_choice', 'true_false', 'short_answer') DEFAULT 'multiple_choice',
+        options JSON,
+        correct_answer TEXT NOT NULL,
+        explanation TEXT,
+        points INT DEFAULT 1,
+        order_index INT DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+        INDEX idx_course (course_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_quiz_attempts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        question_id INT NOT NULL,
+        user_answer TEXT,
+        is_correct BOOLEAN,
+        attempted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (question_id) REFERENCES course_questions(id) ON DELETE CASCADE,
+        INDEX idx_user_question (user_id, question_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS certificates (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        certificate_type ENUM('volunteer_hours', 'course_milestone', 'creator_verified') DEFAULT 'volunteer_hours',
+        hours_certified FLOAT DEFAULT 0,
+        courses_count INT DEFAULT 0,
+        verification_code VARCHAR(64) UNIQUE,
+        issued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        INDEX idx_verification (verification_code)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS simulators (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        creator_id INT NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        version VARCHAR(20) DEFAULT '1.0.0',
+        blocks LONGTEXT NOT NULL,
+        connections LONGTEXT NOT NULL,
+        preview_image LONGTEXT,
+        tags VARCHAR(500),
+        downloads INT DEFAULT 0,
+        rating DECIMAL(3,2) DEFAULT 0,
+        is_public BOOLEAN DEFAULT FALSE,
+        is_featured BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (creator_id) REFERENCES users(id) ON DELETE CASCADE,
+        INDEX idx_public (is_public),
+        INDEX idx_featured (is_featured),
+        INDEX idx_rating (rating)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS simulator_ratings (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        simulator_id INT NOT NULL,
+        user_id INT NOT NULL,
+        rating INT CHECK (rating >= 1 AND rating <= 5),
+        review TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (simulator_id) REFERENCES simulators(id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        UNIQUE KEY unique_rating (simulator_id, user_id),
+        INDEX idx_simulator (simulator_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS simulator_downloads (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        simulator_id INT NOT NULL,
+        user_id INT NOT NULL,
+        course_id INT,
+        downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (simulator_id) REFERENCES simulators(id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE SET NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS course_simulator_usage (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        course_id INT NOT NULL,
+        simulator_id INT NOT NULL,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+        FOREIGN KEY (simulator_id) REFERENCES simulators(id) ON DELETE CASCADE,
+        UNIQUE KEY unique_course_sim (course_id, simulator_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS simulator_interactive_params (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        course_id INT NOT NULL,
+        simulator_block_id BIGINT NOT NULL,
+        block_id INT NOT NULL,
+        param_name VARCHAR(100) NOT NULL,
+        param_label VARCHAR(255),
+        min_value DECIMAL(10,2) DEFAULT 0,
+        max_value DECIMAL(10,2) DEFAULT 100,
+        step_value DECIMAL(10,2) DEFAULT 1,
+        default_value DECIMAL(10,2),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+        UNIQUE KEY unique_param (course_id, simulator_block_id, block_id, param_name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS simulator_versions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        simulator_id INT NOT NULL,
+        version_number INT DEFAULT 1,
+        blocks LONGTEXT NOT NULL,
+        connections LONGTEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        storage VARCHAR(8) NOT NULL DEFAULT 'full',
+        base_version INT NULL,
+        delta LONGTEXT NULL,
+        FOREIGN KEY (simulator_id) REFERENCES simulators(id) ON DELETE CASCADE,
+        INDEX idx_simulator (simulator_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS simulator_previews (
+        hash CHAR(64) PRIMARY KEY,
+        mime_type VARCHAR(32) NOT NULL,
+        width INT NULL,
+        height INT NULL,
+        byte_size INT NOT NULL,
+        data MEDIUMBLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+_INDEX_LINE_RE = re.compile(r",\s*(?:UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)", re.IGNORECASE)
+_UNIQUE_KEY_RE = re.compile(r"UNIQUE\s+KEY\s+\w+\s*\(", re.IGNORECASE)
+_AUTO_PK_RE = re.compile(r"\b(?:BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", re.IGNORECASE)
+_ENUM_RE = re.compile(r"\bENUM\s*\([^)]*\)", re.IGNORECASE)
+_ON_UPDATE_RE = re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP", re.IGNORECASE)
+_ON_UPDATE_COLUMN_RE = re.compile(r"(\w+)\s+TIMESTAMP\b[^,]*ON\s+UPDATE\s+CURRENT_TIMESTAMP", re.IGNORECASE)
+_TABLE_OPTIONS_RE = re.compile(r"\)\s*(?:ENGINE|DEFAULT\s+CHARSET|ROW_FORMAT)\b[^;]*$", re.IGNORECASE)
+_CREATE_TABLE_RE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+_UPSERT_RE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_VALUES_FN_RE = re.compile(r"\bVALUES\s*\(\s*(\w+)\s*\)", re.IGNORECASE)
+_INSERT_IGNORE_RE = re.compile(r"^\s*INSERT\s+IGNORE\b", re.IGNORECASE)
+_HINT_RE = re.compile(r"/\*\+.*?\*/")
+_FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\s*$", re.IGNORECASE)
+_SYSVAR_RE = re.compile(r"@@auto_increment_increment", re.IGNORECASE)
+_NOW_RE = re.compile(r"\bNOW\(\)", re.IGNORECASE)
+_LEAST_RE = re.compile(r"\bLEAST\(", re.IGNORECASE)
+_GREATEST_RE = re.compile(r"\bGREATEST\(", re.IGNORECASE)
+
+def translate_ddl(sql):
+    """Rewrite a MySQL CREATE TABLE into SQLite, returning [create, *create index]"""
+    table = _CREATE_TABLE_RE.search(sql).group(1)
+    indexes = []
+
+    def keep_index(match):
+        if _UNIQUE_KEY_RE.match(match.group(0).lstrip(", \n")):
+            return f", UNIQUE ({match.group(2)})"
+        indexes.append(f"CREATE INDEX IF NOT EXISTS {table}_{match.group(1)} ON {table} ({match.group(2)})")
+        return ""
+
+    for column in _ON_UPDATE_COLUMN_RE.findall(sql):
+        # SQLite has no ON UPDATE CURRENT_TIMESTAMP; a trigger bumps the column unless the UPDATE set it
+        indexes.append(f"CREATE TRIGGER IF NOT EXISTS {table}_touch_{column} AFTER UPDATE ON {table} "
+                       f"FOR EACH ROW WHEN NEW.{column} IS OLD.{column} BEGIN "
+                       f"UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END")
+    sql = _INDEX_LINE_RE.sub(keep_index, sql)
+    sql = _AUTO_PK_RE.sub("INTEGER PRIMARY KEY AUTOINCREMENT", sql)
+    sql = _ENUM_RE.sub("TEXT", sql)
+    sql = _ON_UPDATE_RE.sub("", sql)
+    sql = _TABLE_OPTIONS_RE.sub(")", sql.strip())
+    return [sql] + indexes
+
+def translate(sql):
+    """Rewrite the MySQL dialect the admin scripts use into SQLite"""
+    sql = _HINT_RE.sub("", sql)
+    sql = _FOR_UPDATE_RE.sub("", sql)
+    sql = _SYSVAR_RE.sub("1", sql)
+    sql = _NOW_RE.sub("CURRENT_TIMESTAMP", sql)
+    sql = _LEAST_RE.sub("MIN(", sql)
+    sql = _GREATEST_RE.sub("MAX(", sql)
+    sql = _INSERT_IGNORE_RE.sub("INSERT OR IGNORE", sql)
+    if _UPSERT_RE.search(sql):
+        head, tail = _UPSERT_RE.split(sql, maxsplit=1)
+        sql = head + "ON CONFLICT DO UPDATE SET " + _VALUES_FN_RE.sub(r"excluded.\1", tail)
+    return sql.replace("%s", "?").replace("%%", "%")
+
+class StandInCursor:
+    """pymysql-style cursor over SQLite; rows are dicts like DictCursor"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection._db.cursor()
+        self.lastrowid = None
+        self.rowcount = -1
+        self.description = None
+
+    def _run(self, sql, args):
+        self.connection._round_trip()
+        stripped = sql.lstrip()
+        if _CREATE_TABLE_RE.match(stripped):
+            for statement in translate_ddl(stripped):
+                self._cursor.execute(statement)
+            self.rowcount = 0
+            return 0
+        params = tuple(args) if args is not None else ()
+        with self.connection._lock:
+            self._cursor.execute(translate(sql), params)
+        self.rowcount = self._cursor.rowcount
+        self.description = self._cursor.description
+        if stripped[:6].upper() == "INSERT" and self._cursor.lastrowid:
+            # MySQL reports the FIRST id of a multi-row insert, SQLite the last
+            first = self._cursor.lastrowid - max(self.rowcount, 1) + 1
+            self.lastrowid = first if not _UPSERT_RE.search(sql) else self._cursor.lastrowid
+        return self.rowcount
+
+    def execute(self, sql, args=None):
+        return self._run(sql, args)
+
+    def executemany(self, sql, args):
+        total = 0
+        for a in args:
+            total += max(self._run(sql, a), 0)
+        self.rowcount = total
+        return total
+
+    def mogrify(self, sql, args=None):
+        if not args:
+            return sql
+        return sql % tuple(repr(a) for a in args)
+
+    def _to_dict(self, row):
+        if row is None:
+            return None
+        return {d[0]: v for d, v in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._to_dict(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        return [self._to_dict(r) for r in self._cursor.fetchmany(size or self._cursor.arraysize)]
+
+    def fetchall(self):
+        return [self._to_dict(r) for r in self._cursor.fetchall()]
+
+    def __iter__(self):
+        while True:
+            row = self._cursor.fetchone()
+            if row is None:
+                return
+            yield self._to_dict(row)
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class StandInConnection:
+    """pymysql-style connection backed by SQLite.
+
+    latency (seconds) is slept on every round trip (statement, commit,
+    rollback, ping) to mimic the WAN link to Aiven; round_trips counts them.
+    Thread-safe enough for the worker-pool paths: statements are serialised.
+    """
+
+    def __init__(self, path=":memory:", latency=0.0, schema=True, begin="BEGIN"):
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._lock = threading.RLock()
+        self.latency = latency
+        self.round_trips = 0
+        self._begin = begin
+        self._in_transaction = False
+        if schema:
+            for ddl in SERVER_SCHEMA:
+                for statement in translate_ddl(ddl):
+                    self._db.execute(statement)
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def cursor(self, cursorclass=None):
+        return StandInCursor(self)
+
+    def begin(self):
+        self._round_trip()
+        if not self._in_transaction:
+            self._db.execute(self._begin)
+            self._in_transaction = True
+
+    def commit(self):
+        self._round_trip()
+        if self._in_transaction:
+            self._db.execute("COMMIT")
+            self._in_transaction = False
+
+    def rollback(self):
+        self._round_trip()
+        if self._in_transaction:
+            self._db.execute("ROLLBACK")
+            self._in_transaction = False
+
+    def ping(self, reconnect=False):
+        self._round_trip()
+
+    def close(self):
+        self._db.close()
+
+class StandInPool:
+    """Just enough of aiven_db.ConnectionPool for the injector to run on the stand-in.
+
+    Every checkout gets its own sqlite3 connection to one shared database
+    file, so transactions from different worker threads are isolated as
+    they are on MySQL instead of interleaving on a single connection.
+    SQLite allows one writer at a time: transactions start with BEGIN
+    IMMEDIATE and queue behind each other, much like row-lock waits on one
+    hot table, while the simulated latency of each connection overlaps.
+    """
+
+    def __init__(self, path=None, latency=0.0, max_size=4):
+        self._tmpdir = None
+        if path is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="standin-")
+            path = os.path.join(self._tmpdir, "standin.sqlite")
+        self.path = path
+        self.latency = latency
+        self.max_size = max_size
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        first = self._connect(schema=True)
+        first._db.execute("PRAGMA journal_mode = WAL")
+        self._idle.put(first)
+
+    def _connect(self, schema=False):
+        connection = StandInConnection(self.path, self.latency, schema=schema, begin="BEGIN IMMEDIATE")
+        self._connections.append(connection)
+        return connection
+
+    @property
+    def round_trips(self):
+        return sum(c.round_trips for c in self._connections)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No stand-in connection free after {timeout}s")
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+            try:
+                yield connection
+            finally:
+                self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, timeout=None):
+        with self.connection(timeout) as connection:
+            with connection.cursor() as cursor:
+                yield cursor
+
+    @contextmanager
+    def transaction(self, timeout=None):
+        with self.connection(timeout) as connection:
+            connection.begin()
+            cursor = connection.cursor()
+            try:
+                yield cursor
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def run_in_transaction(self, fn, *args, timeout=None, **kwargs):
+        with self.transaction(timeout) as cursor:
+            return fn(cursor, *args, **kwargs)
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Physics
+NumPy port of block-physics-engine.js for many bodies at once: structure-of-arrays integration, uniform-grid collisions and offline trajectory precompute
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+from simulator_evaluator import TEMPLATES, parse_json_list
+
+# Simulator canvas in block-simulator.html / simulator-view.html
+CANVAS_BOUNDS = (0.0, 0.0, 800.0, 600.0)
+FRAME_DT = 0.016
+DEFAULT_TRAJECTORY_DIR = os.getenv(
+    "SIMULATOR_TRAJECTORY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".trajectory_cache"),
+)
+# Simulators spawning fewer bodies than this run fine in the browser
+HEAVY_BODY_COUNT = int(os.getenv("HEAVY_SIMULATOR_BODIES", "500"))
+PARTICLE_RADIUS = 2.0
+# Bump when the integrator changes so cached trajectories are recomputed once
+PHYSICS_VERSION = 1
+
+class Bodies:
+    """Circles as a structure of arrays: one contiguous float64 array per field, indexed by body"""
+
+    FIELDS = ("x", "y", "vx", "vy", "mass", "radius")
+
+    def __init__(self, count):
+        for field in self.FIELDS:
+            setattr(self, field, np.zeros(count))
+        self.mass.fill(1.0)
+
+    @classmethod
+    def from_arrays(cls, **fields):
+        count = len(next(iter(fields.values())))
+        bodies = cls(count)
+        for field, values in fields.items():
+            getattr(bodies, field)[:] = values
+        return bodies
+
+    def __len__(self):
+        return len(self.x)
+
+    def kinetic_energy(self):
+        """Sum of PhysicsUtils.kineticEnergy over every body"""
+        return float(0.5 * np.dot(self.mass, self.vx * self.vx + self.vy * self.vy))
+
+    def momentum(self):
+        return float(np.dot(self.mass, self.vx)), float(np.dot(self.mass, self.vy))
+
+# ===== COLLISIONS =====
+
+_EMPTY_PAIRS = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+# The cell itself plus half its neighbours: every adjacent pair of cells is visited once
+_HALF_NEIGHBOURHOOD = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+def broadphase_pairs(x, y, radius, cell_size=None):
+    """Candidate pairs (i, j) from a uniform grid, each pair once.
+
+    Cells are 2 * max radius wide, so any two touching circles sit in the
+    same or adjacent cells. Bodies are sorted by cell key once; the bodies
+    of a neighbour cell are a contiguous run found with searchsorted, and
+    the runs are expanded into pair arrays without a Python loop over
+    bodies.
+    """
+    n = len(x)
+    if n < 2:
+        return _EMPTY_PAIRS
+    cell = cell_size or max(2.0 * float(radius.max()), 1e-9)
+    cx = np.floor(x / cell).astype(np.int64)
+    cy = np.floor(y / cell).astype(np.int64)
+    cx -= cx.min()
+    cy -= cy.min() - 1  # keep row - 1 >= 0 so neighbour keys never wrap
+    width = int(cy.max()) + 2
+    keys = cx * width + cy
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    positions = np.arange(n)
+
+    firsts, seconds = [], []
+    for dx, dy in _HALF_NEIGHBOURHOOD:
+        target = sorted_keys + (dx * width + dy)
+        end = np.searchsorted(sorted_keys, target, side="right")
+        # In its own cell a body only pairs with the ones sorted after it
+        start = positions + 1 if (dx, dy) == (0, 0) else np.searchsorted(sorted_keys, target, side="left")
+        counts = np.maximum(end - start, 0)
+        total = int(counts.sum())
+        if not total:
+            continue
+        first = np.repeat(positions, counts)
+        run_start = np.repeat(start - (np.cumsum(counts) - counts), counts)
+        firsts.append(order[first])
+        seconds.append(order[run_start + np.arange(total)])
+    if not firsts:
+        return _EMPTY_PAIRS
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+def brute_force_pairs(x, y, radius):
+    """Every touching pair by comparing all n^2 / 2 pairs, like the browser does; for checking the grid"""
+    i, j = np.triu_indices(len(x), k=1)
+    dx, dy = x[j] - x[i], y[j] - y[i]
+    touching = dx * dx + dy * dy < (radius[i] + radius[j]) ** 2
+    return i[touching], j[touching]
+
+def contacts(bodies, pairs=None):
+    """Narrow phase of Collision.circleCircle over candidate pairs: touching (i, j, nx, ny, overlap)"""
+    i, j = pairs if pairs is not None else broadphase_pairs(bodies.x, bodies.y, bodies.radius)
+    dx = bodies.x[j] - bodies.x[i]
+    dy = bodies.y[j] - bodies.y[i]
+    reach = bodies.radius[i] + bodies.radius[j]
+    dist2 = dx * dx + dy * dy
+    touching = dist2 < reach * reach
+    i, j, dx, dy, reach = i[touching], j[touching], dx[touching], dy[touching], reach[touching]
+    dist = np.sqrt(dist2[touching])
+    # Coincident centres get the (1, 0) normal, as circleCircle does
+    safe = np.where(dist > 0, dist, 1.0)
+    nx = np.where(dist > 0, dx / safe, 1.0)
+    ny = np.where(dist > 0, dy / safe, 0.0)
+    return i, j, nx, ny, reach - dist
+
+# ===== INTEGRATOR =====
+
+class BatchIntegrator:
+    """Steps every body at once, in place.
+
+    Per step: gravity (Physics.gravity, +y is down on the canvas) and
+    quadratic drag (Physics.drag) give the acceleration; semi-implicit
+    Euler (Physics.semiImplicitEuler) updates velocity then position;
+    Physics.applyDamping scales the velocity; then overlapping circles are
+    separated along the contact normal and exchange an impulse with the
+    given restitution, which is PhysicsUtils.inelasticCollision applied to
+    the normal component. Contacts found in one step are resolved
+    together rather than one pair after another. Bodies bounce off
+    `bounds` (x0, y0, x1, y1) when set.
+    """
+
+    def __init__(self, bodies, gravity=9.8, damping=0.0, drag=0.0, area=1.0, restitution=0.8,
+                 bounds=CANVAS_BOUNDS, collisions=True):
+        self.bodies = bodies
+        self.gravity = gravity
+        self.damping = damping
+        self.drag = drag
+        self.area = area
+        self.restitution = restitution
+        self.bounds = bounds
+        self.collisions = collisions
+        self.contact_count = 0
+        self.pair_count = 0
+        n = len(bodies)
+        # Scratch buffers reused every step instead of allocating temporaries
+        self._ax = np.empty(n)
+        self._ay = np.empty(n)
+        self._tmp = np.empty(n)
+
+    def step(self, dt):
+        b, ax, ay, tmp = self.bodies, self._ax, self._ay, self._tmp
+        ax.fill(0.0)
+        ay.fill(self.gravity)
+        if self.drag:
+            # |F| = 0.5 * Cd * A * speed^2 against the velocity, so a = -k * speed * v / m
+            np.hypot(b.vx, b.vy, out=tmp)
+            tmp *= 0.5 * self.drag * self.area
+            tmp /= b.mass
+            ax -= tmp * b.vx
+            ay -= tmp * b.vy
+        b.vx += ax * dt
+        b.vy += ay * dt
+        if self.damping:
+            factor = (1.0 - self.damping) ** dt
+            b.vx *= factor
+            b.vy *= factor
+        b.x += b.vx * dt
+        b.y += b.vy * dt
+        if self.collisions:
+            self._resolve_contacts()
+        if self.bounds is not None:
+            self._bounce()
+
+    def _resolve_contacts(self):
+        b = self.bodies
+        pairs = broadphase_pairs(b.x, b.y, b.radius)
+        i, j, nx, ny, overlap = contacts(b, pairs)
+        self.pair_count = len(pairs[0])
+        self.contact_count = len(i)
+        if not len(i):
+            return
+        n = len(b)
+        inv_i, inv_j = 1.0 / b.mass[i], 1.0 / b.mass[j]
+        inv_sum = inv_i + inv_j
+
+        # Push apart by the overlap, the lighter body moving more
+        share_i, share_j = overlap * inv_i / inv_sum, overlap * inv_j / inv_sum
+        b.x -= np.bincount(i, share_i * nx, n) - np.bincount(j, share_j * nx, n)
+        b.y -= np.bincount(i, share_i * ny, n) - np.bincount(j, share_j * ny, n)
+
+        # Impulse along the normal, only for pairs still moving towards each other
+        closing = (b.vx[j] - b.vx[i]) * nx + (b.vy[j] - b.vy[i]) * ny
+        impulse = np.where(closing < 0, -(1.0 + self.restitution) * closing / inv_sum, 0.0)
+        b.vx -= np.bincount(i, impulse * inv_i * nx, n) - np.bincount(j, impulse * inv_j * nx, n)
+        b.vy -= np.bincount(i, impulse * inv_i * ny, n) - np.bincount(j, impulse * inv_j * ny, n)
+
+    def _bounce(self):
+        b = self.bodies
+        x0, y0, x1, y1 = self.bounds
+        for pos, vel, low, high in ((b.x, b.vx, x0, x1), (b.y, b.vy, y0, y1)):
+            below = pos - b.radius < low
+            above = pos + b.radius > high
+            pos[below] = low + b.radius[below]
+            pos[above] = high - b.radius[above]
+            vel[below] = np.abs(vel[below]) * self.restitution
+            vel[above] = -np.abs(vel[above]) * self.restitution
+
+    def run(self, steps, dt=FRAME_DT, record_every=1):
+        """Advance `steps` steps; returns the recorded frames as a (frames, bodies, 2) float32 array"""
+        frames = np.empty((steps // record_every + 1, len(self.bodies), 2), dtype=np.float32)
+        frames[0, :, 0], frames[0, :, 1] = self.bodies.x, self.bodies.y
+        for s in range(1, steps + 1):
+            self.step(dt)
+            if s % record_every == 0:
+                frames[s // record_every, :, 0] = self.bodies.x
+                frames[s // record_every, :, 1] = self.bodies.y
+        return frames
+
+# ===== OFFLINE TRAJECTORIES =====
+
+def block_inputs(block):
+    """A block's saved inputs over its template defaults, numbers as floats"""
+    template = TEMPLATES[block["type"]]
+    saved = block.get("inputs") if isinstance(block.get("inputs"), dict) else {}
+    values = {}
+    for name, default in template["inputs"]:
+        value = saved.get(name)
+        value = default if value is None else value
+        if not isinstance(default, str):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = float(default)
+        values[name] = value
+    return values
+
+def scene_from_blocks(simulator_id, blocks):
+    """The bodies a simulator spawns: one emitter per particle-system block.
+
+    Particles start at the emitter with speed `speed` in a random
+    direction, like the block does with Math.random(); the directions are
+    seeded by simulator id so a trajectory is reproducible. Gravity comes
+    from the first gravity or gravity-simulation block, else 9.8.
+    """
+    emitters, gravity = [], 9.8
+    for block in parse_json_list(blocks):
+        if not isinstance(block, dict):
+            continue
+        if block.get("type") == "particle-system":
+            emitters.append(block_inputs(block))
+        elif block.get("type") in ("gravity", "gravity-simulation") and gravity == 9.8:
+            gravity = block_inputs(block)["g"]
+    counts = [max(int(e["count"]), 0) if math.isfinite(e["count"]) else 0 for e in emitters]
+    if not sum(counts):
+        return None, gravity
+    rng = np.random.default_rng(zlib.crc32(f"simulator-{simulator_id}".encode("utf-8")))
+    angle = rng.random(sum(counts)) * 2 * math.pi
+    speed = np.repeat([e["speed"] for e in emitters], counts)
+    bodies = Bodies.from_arrays(
+        x=np.repeat([e["x"] for e in emitters], counts), y=np.repeat([e["y"] for e in emitters], counts),
+        vx=np.cos(angle) * speed, vy=np.sin(angle) * speed,
+        radius=np.full(sum(counts), PARTICLE_RADIUS),
+    )
+    # Emitters spawn every particle on one point; jitter below a radius so contacts have a normal
+    bodies.x += rng.uniform(-0.5, 0.5, len(bodies)) * PARTICLE_RADIUS
+    bodies.y += rng.uniform(-0.5, 0.5, len(bodies)) * PARTICLE_RADIUS
+    return bodies, gravity
+
+def trajectory_digest(blocks, steps, record_every):
+    payload = json.dumps({"version": PHYSICS_VERSION, "blocks": parse_json_list(blocks), "steps": steps,
+                          "record_every": record_every}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def precompute_trajectories(connection, out_dir=DEFAULT_TRAJECTORY_DIR, min_bodies=HEAVY_BODY_COUNT,
+                            steps=600, record_every=2, simulator_ids=None, force=False):
+    """Simulate every simulator spawning at least `min_bodies` bodies and cache its trajectory.
+
+    Simulators are read in id order a page at a time; a trajectory is
+    rewritten only when the blocks (or these settings) changed. Files are
+    simulator_<id>.npz with the (frames, bodies, 2) float32 positions.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    stats = {"scanned": 0, "heavy": 0, "computed": 0, "cached": 0, "bodies": 0, "frames": 0, "bytes": 0}
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            sql = "SELECT id, blocks FROM simulators WHERE id > %s"
+            params = [last_id]
+            if simulator_ids:
+                sql += " AND id IN (" + ", ".join(["%s"] * len(simulator_ids)) + ")"
+                params.extend(simulator_ids)
+            cursor.execute(sql + " ORDER BY id LIMIT 500", params)
+            rows = cursor.fetchall()
+        connection.commit()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        for row in rows:
+            stats["scanned"] += 1
+            bodies, gravity = scene_from_blocks(row["id"], row["blocks"])
+            if bodies is None or len(bodies) < min_bodies:
+                continue
+            stats["heavy"] += 1
+            path = os.path.join(out_dir, f"simulator_{row['id']}.npz")
+            digest = trajectory_digest(row["blocks"], steps, record_every)
+            if not force and os.path.exists(path):
+                with np.load(path) as cached:
+                    if str(cached["digest"]) == digest:
+                        stats["cached"] += 1
+                        continue
+            frames = BatchIntegrator(bodies, gravity=gravity).run(steps, FRAME_DT, record_every)
+            tmp = path + ".tmp.npz"
+            np.savez_compressed(tmp, positions=frames, radius=bodies.radius.astype(np.float32),
+                                dt=np.float32(FRAME_DT * record_every), digest=np.array(digest))
+            os.replace(tmp, path)
+            stats["computed"] += 1
+            stats["bodies"] += len(bodies)
+            stats["frames"] += len(frames)
+            stats["bytes"] += os.path.getsize(path)
+    return stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute trajectories of particle-heavy simulators")
+    parser.add_argument("--simulator-ids", help="comma-separated simulator ids (default: every simulator)")
+    parser.add_argument("--out-dir", default=DEFAULT_TRAJECTORY_DIR, help="trajectory directory (default ./.trajectory_cache)")
+    parser.add_argument("--min-bodies", type=int, default=HEAVY_BODY_COUNT,
+                        help="only precompute simulators spawning at least this many bodies")
+    parser.add_argument("--steps", type=int, default=600, help="steps of 16ms to simulate (default 600 = 9.6s)")
+    parser.add_argument("--record-every", type=int, default=2, help="keep every Nth step")
+    parser.add_argument("--force", action="store_true", help="recompute trajectories even when nothing changed")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    simulator_ids = [int(s) for s in args.simulator_ids.split(",")] if args.simulator_ids else None
+    print(f"🪐 Precomputing trajectories for simulators with {args.min_bodies}+ bodies...")
+    started = time.perf_counter()
+    try:
+        with get_pool().connection() as connection:
+            stats = precompute_trajectories(connection, args.out_dir, args.min_bodies, args.steps,
+                                            args.record_every, simulator_ids, args.force)
+    except Exception as e:
+        print(f"❌ Precompute failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print(f"\n✅ {stats['scanned']} simulators scanned, {stats['heavy']} heavy: {stats['computed']} computed, "
+          f"{stats['cached']} unchanged in {time.perf_counter() - started:.2f}s")
+    if stats["computed"]:
+        print(f"  ✓ {stats['bodies']:,} bodies x {stats['frames']:,} frames, "
+              f"{stats['bytes'] / 1024:,.1f} KiB written to {args.out_dir}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Query Instrumentation for the Aiven Admin Scripts
+Wraps cursors to record per-statement latency, rows and bytes, then prints a profile or JSON trace
+"""
+
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+SLOW_QUERY_COUNT = 10
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_ROW_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_SPACE_RE = re.compile(r"\s+")
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape so identical queries group together.
+
+    Literals and %s placeholders become ?, and multi-row VALUES lists
+    collapse to a single '(?, ...) x N' so batches of different sizes match.
+    """
+    shape = _STRING_RE.sub("?", sql)
+    shape = shape.replace("%s", "?")
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _SPACE_RE.sub(" ", shape).strip()
+    return _ROW_LIST_RE.sub("(...) x N", shape)
+
+def statement_kind(sql):
+    words = sql.lstrip().split(None, 1)
+    return words[0].upper() if words else "?"
+
+class QueryProfiler:
+    """Collects one record per round trip; safe to share between worker threads"""
+
+    def __init__(self):
+        self.records = []
+        self.connects = []
+        self.phases = defaultdict(float)
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def phase(self, name):
+        """Attribute statements run inside this block to a named phase"""
+        previous = getattr(self._local, "phase", None)
+        self._local.phase = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._local.phase = previous
+            with self._lock:
+                self.phases[name] += elapsed
+
+    def record_connect(self, seconds):
+        with self._lock:
+            self.connects.append(seconds)
+            self.phases["connect"] += seconds
+
+    def record(self, sql, seconds, rows, bytes_sent):
+        entry = {
+            "sql": normalize_sql(sql),
+            "kind": statement_kind(sql),
+            "phase": getattr(self._local, "phase", None),
+            "seconds": seconds,
+            "rows": rows,
+            "bytes_sent": bytes_sent,
+            "at": time.perf_counter() - self.started,
+        }
+        with self._lock:
+            self.records.append(entry)
+        return entry
+
+    def wrap_cursor(self, cursor):
+        return InstrumentedCursor(cursor, self)
+
+    def wrap_connection(self, connection):
+        return InstrumentedConnection(connection, self)
+
+    # ----- Reporting -----
+
+    def histogram(self):
+        counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for r in self.records:
+            ms = r["seconds"] * 1000
+            for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+                if ms < bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def summary(self):
+        by_sql = defaultdict(lambda: {"count": 0, "seconds": 0.0, "rows": 0, "bytes_sent": 0})
+        by_kind = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+        for r in self.records:
+            s = by_sql[r["sql"]]
+            s["count"] += 1
+            s["seconds"] += r["seconds"]
+            s["rows"] += r["rows"] if r["rows"] and r["rows"] > 0 else 0
+            s["bytes_sent"] += r["bytes_sent"]
+            k = by_kind[r["kind"]]
+            k["count"] += 1
+            k["seconds"] += r["seconds"]
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "round_trips": len(self.records) + len(self.connects),
+            "connects": len(self.connects),
+            "connect_seconds": sum(self.connects),
+            "query_seconds": sum(r["seconds"] for r in self.records),
+            "bytes_sent": sum(r["bytes_sent"] for r in self.records),
+            "phases": dict(self.phases),
+            "by_kind": dict(by_kind),
+            "by_sql": dict(by_sql),
+            "histogram_ms": {"buckets": HISTOGRAM_BUCKETS_MS, "counts": self.histogram()},
+        }
+
+    def slow_queries(self, limit=SLOW_QUERY_COUNT):
+        return sorted(self.records, key=lambda r: r["seconds"], reverse=True)[:limit]
+
+    def print_report(self, limit=SLOW_QUERY_COUNT, file=None):
+        """Print the profile; pass file=sys.stderr to keep stdout clean for exports"""
+        s = self.summary()
+        print("\n" + "=" * 70, file=file)
+        print("⏱️ QUERY PROFILE", file=file)
+        print("=" * 70, file=file)
+        print(f"Wall clock: {s['wall_seconds']:.3f}s | Round trips: {s['round_trips']} "
+              f"({s['connects']} connects) | Bytes sent: {s['bytes_sent']:,}", file=file)
+        print(f"Connect: {s['connect_seconds']:.3f}s | Statements: {s['query_seconds']:.3f}s", file=file)
+
+        print("\n📂 Phases:", file=file)
+        for name, seconds in sorted(s["phases"].items(), key=lambda item: -item[1]):
+            print(f"  {name:<30} {seconds:8.3f}s", file=file)
+        print("\n🔤 By statement kind:", file=file)
+        for kind, k in sorted(s["by_kind"].items(), key=lambda item: -item[1]["seconds"]):
+            print(f"  {kind:<10} {k['count']:6} calls {k['seconds']:8.3f}s", file=file)
+
+        print("\n📊 Latency histogram:", file=file)
+        counts = s["histogram_ms"]["counts"]
+        peak = max(counts) or 1
+        labels = [f"<{b}ms" for b in HISTOGRAM_BUCKETS_MS] + [f">={HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        for label, count in zip(labels, counts):
+            print(f"  {label:>9} {count:6} {'█' * round(40 * count / peak)}", file=file)
+
+        print(f"\n🐢 Slowest {limit} statements:", file=file)
+        for r in self.slow_queries(limit):
+            print(f"  {r['seconds'] * 1000:9.1f}ms rows={r['rows']} {r['sql'][:100]}", file=file)
+
+    def write_trace(self, path):
+        """Dump the summary and every statement record as JSON for diffing runs"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"summary": self.summary(), "statements": self.records}, f, indent=2)
+
+class InstrumentedCursor:
+    """Cursor proxy that records every execute() with its profiler"""
+
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._last = None
+
+    def _bytes_sent(self, sql, args):
+        mogrify = getattr(self._cursor, "mogrify", None)
+        if mogrify is not None:
+            try:
+                return len(mogrify(sql, args).encode("utf-8"))
+            except Exception:
+                pass
+        return len(sql.encode("utf-8")) + (len(repr(args).encode("utf-8")) if args else 0)
+
+    def execute(self, sql, args=None):
+        bytes_sent = self._bytes_sent(sql, args)
+        started = time.perf_counter()
+        result = self._cursor.execute(sql, args)
+        elapsed = time.perf_counter() - started
+        self._last = self._profiler.record(sql, elapsed, self._cursor.rowcount, bytes_sent)
+        return result
+
+    def executemany(self, sql, args):
+        args = list(args)
+        bytes_sent = sum(self._bytes_sent(sql, a) for a in args)
+        started = time.perf_counter()
+        result = self._cursor.executemany(sql, args)
+        elapsed = time.perf_counter() - started
+        self._last = self._profiler.record(sql, elapsed, self._cursor.rowcount, bytes_sent)
+        return result
+
+    def __iter__(self):
+        # Unbuffered cursors only know their row count once drained
+        fetched = 0
+        for row in self._cursor:
+            fetched += 1
+            yield row
+        if self._last is not None:
+            self._last["rows"] = fetched
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are instrumented"""
+
+    def __init__(self, connection, profiler):
+        self._connection = connection
+        self._profiler = profiler
+
+    def cursor(self, *args):
+        return InstrumentedCursor(self._connection.cursor(*args), self._profiler)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Quiz Attempt Archival
+Folds user_quiz_attempts older than the retention window into per-(user, question) rollups, archives the raw rows and deletes them
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+from quiz_item_analysis import JOB_NAME as ITEM_ANALYSIS_JOB
+
+RETENTION_DAYS = int(os.getenv("ATTEMPT_RETENTION_DAYS", "180"))
+BATCH_SIZE = 5000
+DEFAULT_ARCHIVE_DIR = os.getenv(
+    "ATTEMPT_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive", "user_quiz_attempts"),
+)
+
+ROLLUP_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS user_quiz_attempt_rollups (
+        user_id INT NOT NULL,
+        question_id INT NOT NULL,
+        first_attempt_at TIMESTAMP NULL,
+        last_attempt_at TIMESTAMP NULL,
+        attempts INT NOT NULL,
+        correct_attempts INT NOT NULL,
+        best_is_correct BOOLEAN NOT NULL,
+        PRIMARY KEY (user_id, question_id),
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (question_id) REFERENCES course_questions(id) ON DELETE CASCADE
+    )
+"""
+
+ARCHIVE_COLUMNS = ("id", "user_id", "question_id", "user_answer", "is_correct", "attempted_at")
+
+def item_analysis_watermark(cursor):
+    """Last attempt id folded in by quiz_item_analysis.py, or None if it has never run"""
+    try:
+        cursor.execute("SELECT last_id FROM analytics_watermarks WHERE job = %s", (ITEM_ANALYSIS_JOB,))
+    except Exception:
+        return None
+    row = cursor.fetchone()
+    return row["last_id"] if row else None
+
+def fetch_batch(cursor, cutoff, after_id, max_id, batch_size):
+    sql = ("SELECT id, user_id, question_id, user_answer, is_correct, attempted_at FROM user_quiz_attempts "
+           "WHERE id > %s AND attempted_at < %s")
+    args = [after_id, cutoff]
+    if max_id is not None:
+        sql += " AND id <= %s"
+        args.append(max_id)
+    cursor.execute(sql + " ORDER BY id LIMIT %s", args + [batch_size])
+    return cursor.fetchall()
+
+def _iso(value):
+    return value.isoformat(sep=" ") if isinstance(value, datetime) else value
+
+def write_archive(archive_dir, rows):
+    """Write one batch as gzip JSONL; the file name is its id range.
+
+    The file is written under a temporary name, fsynced and renamed, so a
+    partial file never appears. It is written before the rows are deleted:
+    if the job dies in between, the rerun archives the same rows again
+    (every record carries its attempt id, so readers can de-duplicate).
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"attempts-{rows[0]['id']:012d}-{rows[-1]['id']:012d}.jsonl.gz")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as f:
+            for row in rows:
+                record = {c: _iso(row[c]) for c in ARCHIVE_COLUMNS}
+                record["is_correct"] = bool(record["is_correct"]) if record["is_correct"] is not None else None
+                f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    return path, os.path.getsize(path)
+
+def rollup_rows(rows):
+    """Reduce a batch to one (user, question) row: first/last attempt, counts and best result"""
+    rollups = {}
+    for row in rows:
+        key = (row["user_id"], row["question_id"])
+        correct = 1 if row["is_correct"] else 0
+        r = rollups.get(key)
+        if r is None:
+            rollups[key] = [row["attempted_at"], row["attempted_at"], 1, correct, correct]
+        else:
+            r[0] = min(r[0], row["attempted_at"])
+            r[1] = max(r[1], row["attempted_at"])
+            r[2] += 1
+            r[3] += correct
+            r[4] = max(r[4], correct)
+    return [(user, question, *values) for (user, question), values in rollups.items()]
+
+def upsert_rollups(cursor, rollups):
+    cursor.execute(
+        "INSERT INTO user_quiz_attempt_rollups "
+        "(user_id, question_id, first_attempt_at, last_attempt_at, attempts, correct_attempts, best_is_correct) VALUES "
+        + ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rollups))
+        + " ON DUPLICATE KEY UPDATE first_attempt_at = LEAST(first_attempt_at, VALUES(first_attempt_at)), "
+          "last_attempt_at = GREATEST(last_attempt_at, VALUES(last_attempt_at)), "
+          "attempts = attempts + VALUES(attempts), correct_attempts = correct_attempts + VALUES(correct_attempts), "
+          "best_is_correct = GREATEST(best_is_correct, VALUES(best_is_correct))",
+        [value for row in rollups for value in row],
+    )
+
+def archive_attempts(connection, cutoff, archive_dir=DEFAULT_ARCHIVE_DIR, batch_size=BATCH_SIZE,
+                     max_rows=None, pause=0.0, dry_run=False):
+    """Archive and delete attempts older than `cutoff`, one bounded batch per transaction.
+
+    Each batch is archived to disk, then its rollups are merged and exactly
+    its ids are deleted in a single transaction, so rollups are counted
+    once even if the job is killed and rerun. There is no separate progress
+    state: whatever is still in the table past the cutoff is the work left.
+    Attempts not yet folded in by quiz_item_analysis.py are left alone.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(ROLLUP_TABLE_SQL)
+        max_id = item_analysis_watermark(cursor)
+    connection.commit()
+
+    stats = {"rows": 0, "batches": 0, "bytes": 0, "rollups": 0, "analysis_watermark": max_id}
+    started = time.perf_counter()
+    after_id = 0
+    while max_rows is None or stats["rows"] < max_rows:
+        limit = batch_size if max_rows is None else min(batch_size, max_rows - stats["rows"])
+        with connection.cursor() as cursor:
+            rows = fetch_batch(cursor, cutoff, after_id, max_id, limit)
+        connection.commit()
+        if not rows:
+            break
+        after_id = rows[-1]["id"]
+        rollups = rollup_rows(rows)
+
+        if not dry_run:
+            _, size = write_archive(archive_dir, rows)
+            stats["bytes"] += size
+            connection.begin()
+            try:
+                with connection.cursor() as cursor:
+                    upsert_rollups(cursor, rollups)
+                    ids = [row["id"] for row in rows]
+                    cursor.execute(
+                        "DELETE FROM user_quiz_attempts WHERE id IN (" + ", ".join(["%s"] * len(ids)) + ")", ids)
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+        stats["rows"] += len(rows)
+        stats["rollups"] += len(rollups)
+        stats["batches"] += 1
+        elapsed = time.perf_counter() - started
+        print(f"  ... {stats['rows']:,} attempts through id {after_id} "
+              f"({stats['rows'] / elapsed if elapsed > 0 else 0:,.0f} rows/sec)")
+        if pause:
+            time.sleep(pause)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Roll up, archive and delete old user_quiz_attempts")
+    parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS,
+                        help=f"keep raw attempts newer than this (default {RETENTION_DAYS})")
+    parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR, help="where the gzip JSONL files go")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="attempts deleted per transaction")
+    parser.add_argument("--max-rows", type=int, help="stop after this many attempts (resume on the next run)")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be archived, change nothing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    cutoff = datetime.now() - timedelta(days=args.retention_days)
+    print(f"🗄️ Archiving quiz attempts before {cutoff:%Y-%m-%d %H:%M}{' (dry run)' if args.dry_run else ''}...")
+    try:
+        with get_pool().connection() as connection:
+            stats = archive_attempts(connection, cutoff, args.archive_dir, args.batch_size,
+                                     args.max_rows, args.pause, args.dry_run)
+    except Exception as e:
+        print(f"❌ Archival failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    print(f"\n✅ {stats['rows']:,} attempts in {stats['batches']} batches, {stats['seconds']:.2f}s ({rate:,.0f} rows/sec)")
+    print(f"  ✓ {stats['rollups']:,} rollup rows merged, {stats['bytes'] / 1024:,.1f} KiB archived to {args.archive_dir}")
+    if stats["analysis_watermark"] is not None:
+        print(f"  ℹ️ Only attempts up to id {stats['analysis_watermark']} (already in the item analysis) were eligible")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Quiz Item Analysis
+Nightly job that folds new user_quiz_attempts into per-question difficulty, discrimination and distractor stats
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pymysql
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+
+JOB_NAME = "quiz_item_analysis"
+CHUNK_SIZE = 50000
+WRITE_BATCH_SIZE = 1000
+SCORE_BINS = 10
+# Free-text wrong answers kept per question (multiple choice never gets near this)
+MAX_DISTRACTORS = 25
+ER_NO_SUCH_TABLE = 1146
+
+ANALYSIS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS analytics_watermarks (
+        job VARCHAR(64) PRIMARY KEY,
+        last_id BIGINT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_user_item_stats (
+        user_id INT NOT NULL,
+        question_id INT NOT NULL,
+        course_id INT NOT NULL,
+        attempts INT NOT NULL,
+        correct INT NOT NULL,
+        PRIMARY KEY (user_id, question_id),
+        FOREIGN KEY (question_id) REFERENCES course_questions(id) ON DELETE CASCADE,
+        INDEX idx_course (course_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_item_analysis (
+        question_id INT PRIMARY KEY,
+        course_id INT NOT NULL,
+        attempts INT NOT NULL,
+        correct INT NOT NULL,
+        p_value DOUBLE,
+        discrimination DOUBLE NULL,
+        distractors JSON,
+        analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (question_id) REFERENCES course_questions(id) ON DELETE CASCADE,
+        INDEX idx_course (course_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_course_score_distribution (
+        course_id INT PRIMARY KEY,
+        users INT NOT NULL,
+        mean_score DOUBLE,
+        std_score DOUBLE,
+        median_score DOUBLE,
+        histogram JSON,
+        analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+    )
+    """,
+]
+
+def ensure_tables(cursor):
+    for ddl in ANALYSIS_TABLES:
+        cursor.execute(ddl)
+
+def get_watermark(cursor, job=JOB_NAME):
+    cursor.execute("SELECT last_id FROM analytics_watermarks WHERE job = %s", (job,))
+    row = cursor.fetchone()
+    return row["last_id"] if row else 0
+
+def set_watermark(cursor, last_id, job=JOB_NAME):
+    cursor.execute(
+        "INSERT INTO analytics_watermarks (job, last_id) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE last_id = VALUES(last_id)",
+        (job, last_id),
+    )
+
+def archived_attempts(cursor):
+    """Attempts quiz_attempt_archive.py has folded into rollups and deleted (0 if it never ran)"""
+    try:
+        cursor.execute("SELECT COALESCE(SUM(attempts), 0) AS total FROM user_quiz_attempt_rollups")
+    except Exception as e:
+        # The rollup table only exists once quiz_attempt_archive.py has run
+        if getattr(e, "args", (None,))[0] != ER_NO_SUCH_TABLE:
+            raise
+        return 0
+    return int(cursor.fetchone()["total"])
+
+def normalize_answer(answer):
+    # server.js grades with trim().toLowerCase(), so group answers the same way
+    return (answer or "").strip().lower()
+
+# ===== READING =====
+
+def iter_attempt_chunks(connection, after_id=0, chunk_size=CHUNK_SIZE):
+    """Yield attempts newer than after_id as NumPy column arrays, one keyset page at a time.
+
+    Each chunk is a dict of arrays (id, user_id, question_id, course_id,
+    is_correct) plus the raw user_answer list for wrong answers only, which
+    is all the distractor count needs.
+    """
+    sql = ("SELECT a.id, a.user_id, a.question_id, q.course_id, a.is_correct, "
+           "CASE WHEN a.is_correct THEN NULL ELSE a.user_answer END AS user_answer "
+           "FROM user_quiz_attempts a JOIN course_questions q ON q.id = a.question_id "
+           "WHERE a.id > %s ORDER BY a.id LIMIT %s")
+    last_id = after_id
+    while True:
+        ids, users, questions, courses, correct, answers = [], [], [], [], [], []
+        with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+            cursor.execute(sql, (last_id, chunk_size))
+            for row in cursor:
+                ids.append(row["id"])
+                users.append(row["user_id"])
+                questions.append(row["question_id"])
+                courses.append(row["course_id"])
+                correct.append(bool(row["is_correct"]))
+                answers.append(row["user_answer"])
+        if ids:
+            last_id = ids[-1]
+            yield {
+                "id": np.asarray(ids, dtype=np.int64),
+                "user_id": np.asarray(users, dtype=np.int64),
+                "question_id": np.asarray(questions, dtype=np.int64),
+                "course_id": np.asarray(courses, dtype=np.int64),
+                "is_correct": np.asarray(correct, dtype=bool),
+                "user_answer": answers,
+            }
+        if len(ids) < chunk_size:
+            return
+
+# ===== AGGREGATION =====
+
+class AttemptAccumulator:
+    """Folds attempt chunks into per-(user, question) counts and wrong-answer tallies.
+
+    Only the new attempts' distinct (user, question) pairs are held, not the
+    attempts themselves, so memory tracks the size of the delta rather than
+    the size of the table.
+    """
+
+    def __init__(self):
+        self.pairs = {}
+        self.question_course = {}
+        self.distractors = Counter()
+        self.attempts = 0
+        self.last_id = 0
+
+    def add(self, chunk):
+        users, questions, correct = chunk["user_id"], chunk["question_id"], chunk["is_correct"]
+        self.attempts += len(users)
+        self.last_id = int(chunk["id"][-1])
+
+        keys = np.stack([users, questions], axis=1)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        attempts = np.bincount(inverse, minlength=len(unique_keys))
+        correct_counts = np.bincount(inverse, weights=correct, minlength=len(unique_keys)).astype(np.int64)
+        for (user, question), a, c in zip(unique_keys.tolist(), attempts.tolist(), correct_counts.tolist()):
+            totals = self.pairs.setdefault((user, question), [0, 0])
+            totals[0] += a
+            totals[1] += c
+
+        unique_questions, first = np.unique(questions, return_index=True)
+        self.question_course.update(zip(unique_questions.tolist(), chunk["course_id"][first].tolist()))
+
+        for i in np.flatnonzero(~correct).tolist():
+            answer = normalize_answer(chunk["user_answer"][i])
+            if answer:
+                self.distractors[(int(questions[i]), answer)] += 1
+
+    def courses(self):
+        return sorted(set(self.question_course.values()))
+
+def item_statistics(user_idx, item_idx, attempts, correct, n_items):
+    """Difficulty and corrected point-biserial discrimination for every item of a course.
+
+    Inputs are parallel arrays with one entry per (user, item) pair. A user's
+    course score is their proportion correct over all attempts in the course;
+    for each item it is taken over the *other* items (the rest score) so an
+    item is not correlated with itself. Attempts are the unit: a pair with 3
+    attempts, 1 correct, contributes one correct and two wrong observations
+    at that user's rest score.
+    """
+    user_attempts = np.bincount(user_idx, weights=attempts)
+    user_correct = np.bincount(user_idx, weights=correct)
+
+    item_attempts = np.bincount(item_idx, weights=attempts, minlength=n_items)
+    item_correct = np.bincount(item_idx, weights=correct, minlength=n_items)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p_value = item_correct / item_attempts
+
+        rest_attempts = user_attempts[user_idx] - attempts
+        usable = rest_attempts > 0
+        rest = np.where(usable, (user_correct[user_idx] - correct) / np.where(usable, rest_attempts, 1), 0.0)
+        right = np.where(usable, correct, 0)
+        wrong = np.where(usable, attempts - correct, 0)
+
+        n1 = np.bincount(item_idx, weights=right, minlength=n_items)
+        n0 = np.bincount(item_idx, weights=wrong, minlength=n_items)
+        n = n1 + n0
+        mean1 = np.bincount(item_idx, weights=right * rest, minlength=n_items) / n1
+        mean0 = np.bincount(item_idx, weights=wrong * rest, minlength=n_items) / n0
+        mean = np.bincount(item_idx, weights=(right + wrong) * rest, minlength=n_items) / n
+        mean_sq = np.bincount(item_idx, weights=(right + wrong) * rest ** 2, minlength=n_items) / n
+        std = np.sqrt(np.maximum(mean_sq - mean ** 2, 0.0))
+        discrimination = (mean1 - mean0) / std * np.sqrt(n1 * n0) / n
+    discrimination[~np.isfinite(discrimination)] = np.nan
+    return item_attempts.astype(np.int64), item_correct.astype(np.int64), p_value, discrimination
+
+def score_distribution(user_idx, attempts, correct, bins=SCORE_BINS):
+    user_attempts = np.bincount(user_idx, weights=attempts)
+    user_correct = np.bincount(user_idx, weights=correct)
+    scores = user_correct[user_attempts > 0] / user_attempts[user_attempts > 0]
+    if scores.size == 0:
+        return None
+    counts, edges = np.histogram(scores, bins=bins, range=(0.0, 1.0))
+    return {
+        "users": int(scores.size),
+        "mean_score": float(scores.mean()),
+        "std_score": float(scores.std()),
+        "median_score": float(np.median(scores)),
+        "histogram": [{"from": round(float(lo), 4), "to": round(float(hi), 4), "users": int(c)}
+                      for lo, hi, c in zip(edges[:-1], edges[1:], counts)],
+    }
+
+def _finite(value):
+    return None if value is None or not np.isfinite(value) else float(value)
+
+# ===== WRITING =====
+
+def upsert_user_item_stats(cursor, accumulator, batch_size=WRITE_BATCH_SIZE):
+    rows = [(user, question, accumulator.question_course[question], a, c)
+            for (user, question), (a, c) in accumulator.pairs.items()]
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        cursor.execute(
+            "INSERT INTO quiz_user_item_stats (user_id, question_id, course_id, attempts, correct) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+            + " ON DUPLICATE KEY UPDATE attempts = attempts + VALUES(attempts), correct = correct + VALUES(correct)",
+            [value for row in batch for value in row],
+        )
+
+def load_course_pairs(cursor, course_id):
+    cursor.execute("SELECT user_id, question_id, attempts, correct FROM quiz_user_item_stats WHERE course_id = %s",
+                   (course_id,))
+    rows = cursor.fetchall()
+    return (np.fromiter((r["user_id"] for r in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((r["question_id"] for r in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((r["attempts"] for r in rows), dtype=np.float64, count=len(rows)),
+            np.fromiter((r["correct"] for r in rows), dtype=np.float64, count=len(rows)))
+
+def load_distractors(cursor, course_id):
+    """Existing tallies plus option text, so stored keys read like the options the editor shows"""
+    cursor.execute(
+        "SELECT q.id, q.options, a.distractors FROM course_questions q "
+        "LEFT JOIN quiz_item_analysis a ON a.question_id = q.id WHERE q.course_id = %s",
+        (course_id,))
+    tallies, option_text = {}, {}
+    for row in cursor.fetchall():
+        options = row["options"]
+        if isinstance(options, str):
+            try:
+                options = json.loads(options)
+            except json.JSONDecodeError:
+                options = []
+        option_text[row["id"]] = {normalize_answer(o): o for o in options or [] if isinstance(o, str)}
+        stored = row["distractors"]
+        if isinstance(stored, str):
+            stored = json.loads(stored)
+        tallies[row["id"]] = Counter({normalize_answer(k): v for k, v in (stored or {}).items()})
+    return tallies, option_text
+
+def analyze_course(cursor, course_id, new_distractors):
+    """Recompute one course's item rows and score distribution from its (user, question) counts"""
+    users, questions, attempts, correct = load_course_pairs(cursor, course_id)
+    if users.size == 0:
+        return 0
+    user_ids, user_idx = np.unique(users, return_inverse=True)
+    item_ids, item_idx = np.unique(questions, return_inverse=True)
+    item_attempts, item_correct, p_value, discrimination = item_statistics(
+        user_idx, item_idx, attempts, correct, len(item_ids))
+
+    tallies, option_text = load_distractors(cursor, course_id)
+    for (question, answer), count in new_distractors.items():
+        if question in tallies:
+            tallies[question][answer] += count
+
+    rows = []
+    for i, question in enumerate(item_ids.tolist()):
+        if question not in tallies:
+            continue  # deleted since the attempt was made
+        labels = option_text.get(question, {})
+        distractors = {labels.get(answer, answer): n for answer, n in tallies[question].most_common(MAX_DISTRACTORS)}
+        rows.append((question, course_id, int(item_attempts[i]), int(item_correct[i]),
+                     _finite(p_value[i]), _finite(discrimination[i]), json.dumps(distractors, ensure_ascii=False)))
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        batch = rows[start:start + WRITE_BATCH_SIZE]
+        cursor.execute(
+            "INSERT INTO quiz_item_analysis "
+            "(question_id, course_id, attempts, correct, p_value, discrimination, distractors) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(batch))
+            + " ON DUPLICATE KEY UPDATE attempts = VALUES(attempts), correct = VALUES(correct), "
+              "p_value = VALUES(p_value), discrimination = VALUES(discrimination), distractors = VALUES(distractors)",
+            [value for row in batch for value in row],
+        )
+
+    distribution = score_distribution(user_idx, attempts, correct)
+    if distribution:
+        cursor.execute(
+            "INSERT INTO quiz_course_score_distribution "
+            "(course_id, users, mean_score, std_score, median_score, histogram) VALUES (%s, %s, %s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE users = VALUES(users), mean_score = VALUES(mean_score), "
+            "std_score = VALUES(std_score), median_score = VALUES(median_score), histogram = VALUES(histogram)",
+            (course_id, distribution["users"], distribution["mean_score"], distribution["std_score"],
+             distribution["median_score"], json.dumps(distribution["histogram"])))
+    return len(rows)
+
+def run_analysis(connection, chunk_size=CHUNK_SIZE, full=False):
+    """Fold attempts past the watermark into the summary tables.
+
+    New attempts are streamed and reduced first; then, in one transaction,
+    the per-(user, question) counts are merged, every course that received
+    attempts is recomputed from those counts, and the watermark moves. A
+    crash before the commit leaves the watermark behind, so the next run
+    simply redoes the same delta.
+
+    A full rebuild reads user_quiz_attempts from the first row, so it is
+    refused once quiz_attempt_archive.py has deleted any: the incremental
+    summaries already include those attempts and a rebuild would drop them.
+    """
+    with connection.cursor() as cursor:
+        ensure_tables(cursor)
+        if full:
+            archived = archived_attempts(cursor)
+            if archived:
+                connection.rollback()
+                raise RuntimeError(f"--full would drop {archived:,} archived attempts that only survive in "
+                                   "user_quiz_attempt_rollups; run without --full to keep the summaries")
+            cursor.execute("DELETE FROM quiz_user_item_stats")
+            cursor.execute("DELETE FROM quiz_item_analysis")
+            cursor.execute("DELETE FROM quiz_course_score_distribution")
+            set_watermark(cursor, 0)
+        after_id = get_watermark(cursor)
+    connection.commit()
+
+    accumulator = AttemptAccumulator()
+    for chunk in iter_attempt_chunks(connection, after_id, chunk_size):
+        accumulator.add(chunk)
+        print(f"  ... {accumulator.attempts:,} new attempts read (through id {accumulator.last_id})")
+    if not accumulator.attempts:
+        return {"attempts": 0, "courses": 0, "questions": 0, "watermark": after_id}
+
+    connection.begin()
+    try:
+        with connection.cursor() as cursor:
+            upsert_user_item_stats(cursor, accumulator)
+            questions = 0
+            for course_id in accumulator.courses():
+                questions += analyze_course(cursor, course_id, accumulator.distractors)
+            set_watermark(cursor, accumulator.last_id)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return {"attempts": accumulator.attempts, "courses": len(accumulator.courses()),
+            "questions": questions, "watermark": accumulator.last_id}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate user_quiz_attempts into quiz item statistics")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="attempts per keyset page")
+    parser.add_argument("--full", action="store_true", help="discard the summaries and rebuild from the first attempt "
+                             "(refused once attempts have been archived)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    print(f"📊 Quiz item analysis{' (full rebuild)' if args.full else ''}...")
+    started = time.perf_counter()
+    try:
+        with get_pool().connection() as connection:
+            result = run_analysis(connection, args.chunk_size, args.full)
+    except Exception as e:
+        print(f"❌ Item analysis failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print(f"\n✅ {result['attempts']:,} new attempts, {result['questions']:,} questions in "
+          f"{result['courses']} courses updated in {time.perf_counter() - started:.2f}s "
+          f"(watermark: attempt {result['watermark']})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Quiz Variants
+Deterministic per-student option orders: a seeded hash of (user_id, question_id) picks one permutation from a cached per-question pool
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+
+# Must match QUIZ_VARIANT_SECRET in server.js, or students see a different order there
+VARIANT_SECRET = os.getenv("QUIZ_VARIANT_SECRET", "veelearn-quiz-variants")
+# Permutations per question; questions with n! <= POOL_SIZE options get every permutation
+POOL_SIZE = 24
+
+MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+
+def seed_from_secret(secret=VARIANT_SECRET):
+    return int.from_bytes(hashlib.sha256(secret.encode("utf-8")).digest()[:8], "little")
+
+SEED = seed_from_secret()
+
+def splitmix64(x):
+    """The splitmix64 finalizer on Python ints (mod 2**64); server.js has the BigInt twin"""
+    z = (x + _GOLDEN) & MASK64
+    z = ((z ^ (z >> 30)) * _MIX1) & MASK64
+    z = ((z ^ (z >> 27)) * _MIX2) & MASK64
+    return z ^ (z >> 31)
+
+def splitmix64_np(x):
+    """splitmix64 over a uint64 array; wraps mod 2**64 like the scalar version"""
+    z = x + np.uint64(_GOLDEN)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX2)
+    return z ^ (z >> np.uint64(31))
+
+def question_key(question_id, seed=SEED):
+    return splitmix64(seed ^ question_id)
+
+def variant_key(user_id, question_id, seed=SEED):
+    """64-bit hash of (user, question): the student's variant, recomputable anywhere"""
+    return splitmix64(question_key(question_id, seed) ^ user_id)
+
+def pool_size(n_options, size=POOL_SIZE):
+    return min(math.factorial(n_options), size) if n_options > 0 else 1
+
+def pool_permutation(question_id, n_options, k, seed=SEED):
+    """Permutation k of a question's pool, as the original option indices in display order.
+
+    Small questions (n! <= POOL_SIZE) use every permutation in
+    lexicographic order; larger ones a Fisher-Yates shuffle driven by a
+    splitmix64 stream seeded from (question, k).
+    """
+    if math.factorial(n_options) <= POOL_SIZE:
+        # k-th lexicographic permutation, unranked through the factorial number system
+        items, order = list(range(n_options)), []
+        for i in range(n_options, 0, -1):
+            index, k = divmod(k, math.factorial(i - 1))
+            order.append(items.pop(index))
+        return order
+    order = list(range(n_options))
+    state = question_key(question_id, seed) ^ k
+    for i in range(n_options - 1, 0, -1):
+        state = splitmix64(state)
+        j = state % (i + 1)
+        order[i], order[j] = order[j], order[i]
+    return order
+
+@lru_cache(maxsize=4096)
+def permutation_pool(question_id, n_options, seed=SEED):
+    """(pool size, n_options) uint8 array of the question's permutations, built once per process"""
+    pool = np.array([pool_permutation(question_id, n_options, k, seed)
+                     for k in range(pool_size(n_options))], dtype=np.uint8).reshape(-1, n_options)
+    pool.setflags(write=False)
+    return pool
+
+def option_order(user_id, question_id, n_options, seed=SEED):
+    """One student's option order for one question"""
+    pool = permutation_pool(question_id, n_options, seed)
+    return pool[variant_key(user_id, question_id, seed) % len(pool)].tolist()
+
+def generate_exams(user_ids, questions, seed=SEED):
+    """Option orders for every (student, question) pair in one vectorized pass.
+
+    `questions` is a list of (question id, option count). Returns a
+    (students, questions, max options) uint8 array of original option
+    indices, padded with 255 past each question's option count. The keys
+    are hashed with the NumPy splitmix64 and each question's pool is
+    gathered with one fancy-indexing op per option count.
+    """
+    users = np.asarray(user_ids, dtype=np.uint64)
+    qids = np.array([q for q, _ in questions], dtype=np.uint64)
+    counts = np.array([n for _, n in questions], dtype=np.int64)
+    width = int(counts.max()) if len(questions) else 0
+    exams = np.full((len(users), len(questions), width), 255, dtype=np.uint8)
+
+    qkeys = splitmix64_np(np.uint64(seed) ^ qids)
+    keys = splitmix64_np(qkeys[None, :] ^ users[:, None])  # (students, questions)
+    for n in np.unique(counts):
+        columns = np.nonzero(counts == n)[0]
+        pools = np.stack([permutation_pool(int(qids[c]), int(n), seed) for c in columns])  # (q, pool, n)
+        variants = keys[:, columns] % np.uint64(pools.shape[1])
+        exams[:, columns, :n] = pools[np.arange(len(columns))[None, :], variants.astype(np.intp)]
+    return exams
+
+def apply_order(options, order):
+    return [options[i] for i in order]
+
+# ===== DATABASE =====
+
+def fetch_exam_inputs(connection, course_id):
+    """Enrolled students and the course's questions (id, options) in order"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT user_id FROM enrollments WHERE course_id = %s ORDER BY user_id", (course_id,))
+        users = [r["user_id"] for r in cursor.fetchall()]
+        cursor.execute("SELECT id, options FROM course_questions WHERE course_id = %s ORDER BY order_index, id",
+                       (course_id,))
+        questions = []
+        for r in cursor.fetchall():
+            options = json.loads(r["options"]) if isinstance(r["options"], str) else (r["options"] or [])
+            questions.append((r["id"], options))
+    connection.commit()
+    return users, questions
+
+def write_exams(out, users, questions, exams):
+    """One JSON line per student: each question's options in that student's order"""
+    for u, user_id in enumerate(users):
+        out.write(json.dumps({
+            "user_id": user_id,
+            "questions": [{"question_id": q_id, "options": apply_order(options, exams[u, i, :len(options)])}
+                          for i, (q_id, options) in enumerate(questions)],
+        }, ensure_ascii=False) + "\n")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate per-student quiz variants for a course")
+    parser.add_argument("--course-id", type=int, required=True)
+    parser.add_argument("--output", help="JSONL file of every enrolled student's exam (default: summary only)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    try:
+        with get_pool().connection() as connection:
+            users, questions = fetch_exam_inputs(connection, args.course_id)
+    except Exception as e:
+        print(f"❌ Could not load course {args.course_id}: {e}")
+        return 1
+    finally:
+        close_pool()
+    if not users or not questions:
+        print(f"ℹ️ Course {args.course_id} has {len(users)} enrolled students and {len(questions)} questions")
+        return 0
+
+    started = time.perf_counter()
+    exams = generate_exams(users, [(q_id, len(options)) for q_id, options in questions])
+    elapsed = time.perf_counter() - started
+    print(f"🎲 {len(users):,} exams x {len(questions)} questions in {elapsed * 1000:.1f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            write_exams(f, users, questions, exams)
+        print(f"  ✓ Written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
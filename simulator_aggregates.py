@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulator Rating & Trending Aggregates
+Keeps simulator_stats (download counts, rating sums, decayed trending scores) current from watermarks
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+
+# Same weights as the original ORDER BY (downloads * 0.5 + rating * 10)
+DOWNLOAD_WEIGHT = 0.5
+RATING_WEIGHT = 10
+HALF_LIFE_DAYS = float(os.getenv("TRENDING_HALF_LIFE_DAYS", "7"))
+PAGE_SIZE = 10000
+WRITE_BATCH_SIZE = 1000
+
+STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS simulator_stats (
+        simulator_id INT PRIMARY KEY,
+        is_public BOOLEAN DEFAULT FALSE,
+        downloads INT NOT NULL DEFAULT 0,
+        rating_sum INT NOT NULL DEFAULT 0,
+        rating_count INT NOT NULL DEFAULT 0,
+        avg_rating DECIMAL(3,2) NOT NULL DEFAULT 0,
+        decayed_downloads DOUBLE NOT NULL DEFAULT 0,
+        trending_score DOUBLE NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (simulator_id) REFERENCES simulators(id) ON DELETE CASCADE,
+        INDEX idx_trending (is_public, trending_score)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS simulator_stats_watermarks (
+        source VARCHAR(64) PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        last_at DATETIME NULL
+    )
+    """,
+]
+
+def ensure_tables(cursor):
+    for ddl in STATS_TABLES:
+        cursor.execute(ddl)
+
+def get_watermark(cursor, source):
+    cursor.execute("SELECT last_id, last_at FROM simulator_stats_watermarks WHERE source = %s", (source,))
+    row = cursor.fetchone()
+    return (row["last_id"], row["last_at"]) if row else (0, None)
+
+def set_watermark(cursor, source, last_id=0, last_at=None):
+    cursor.execute(
+        "INSERT INTO simulator_stats_watermarks (source, last_id, last_at) VALUES (%s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), last_at = VALUES(last_at)",
+        (source, last_id, last_at))
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+def decay_factor(seconds, half_life_days=HALF_LIFE_DAYS):
+    return 0.5 ** (max(seconds, 0.0) / (half_life_days * 86400))
+
+def _in_list(ids):
+    return "(" + ", ".join(["%s"] * len(ids)) + ")"
+
+# ===== READING DELTAS =====
+
+def new_downloads(cursor, after_id, now, half_life_days, page_size=PAGE_SIZE):
+    """Count downloads past the id watermark per simulator, plus their decayed weight at `now`"""
+    counts, weights, last_id = {}, {}, after_id
+    while True:
+        cursor.execute(
+            "SELECT id, simulator_id, downloaded_at FROM simulator_downloads WHERE id > %s ORDER BY id LIMIT %s",
+            (last_id, page_size))
+        rows = cursor.fetchall()
+        for row in rows:
+            sim = row["simulator_id"]
+            counts[sim] = counts.get(sim, 0) + 1
+            age = (now - _as_datetime(row["downloaded_at"])).total_seconds()
+            weights[sim] = weights.get(sim, 0.0) + decay_factor(age, half_life_days)
+        if rows:
+            last_id = rows[-1]["id"]
+        if len(rows) < page_size:
+            return counts, weights, last_id
+
+def changed_rating_simulators(cursor, since):
+    """Simulators with a rating added or edited at or after `since` (the whole second is re-read)"""
+    if since is None:
+        cursor.execute("SELECT simulator_id, MAX(updated_at) AS last_at FROM simulator_ratings "
+                       "GROUP BY simulator_id")
+    else:
+        cursor.execute("SELECT simulator_id, MAX(updated_at) AS last_at FROM simulator_ratings "
+                       "WHERE updated_at >= %s GROUP BY simulator_id", (since,))
+    rows = cursor.fetchall()
+    latest = max((_as_datetime(r["last_at"]) for r in rows), default=_as_datetime(since))
+    return [r["simulator_id"] for r in rows], latest
+
+def rating_totals(cursor, simulator_ids):
+    """Exact SUM/COUNT for the given simulators (an edited rating replaces the old one, so
+    these are recomputed per simulator through idx_simulator rather than added as deltas)"""
+    totals = {}
+    for start in range(0, len(simulator_ids), WRITE_BATCH_SIZE):
+        batch = simulator_ids[start:start + WRITE_BATCH_SIZE]
+        cursor.execute(
+            "SELECT simulator_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count FROM simulator_ratings "
+            "WHERE simulator_id IN " + _in_list(batch) + " GROUP BY simulator_id", batch)
+        for row in cursor.fetchall():
+            totals[row["simulator_id"]] = (int(row["rating_sum"] or 0), row["rating_count"])
+    # Simulators whose last rating disappeared
+    for sim in simulator_ids:
+        totals.setdefault(sim, (0, 0))
+    return totals
+
+def changed_visibility(cursor, since):
+    if since is None:
+        cursor.execute("SELECT id, is_public, updated_at FROM simulators")
+    else:
+        cursor.execute("SELECT id, is_public, updated_at FROM simulators WHERE updated_at >= %s", (since,))
+    rows = cursor.fetchall()
+    latest = max((_as_datetime(r["updated_at"]) for r in rows), default=_as_datetime(since))
+    return {r["id"]: bool(r["is_public"]) for r in rows}, latest
+
+# ===== WRITING =====
+
+def ensure_stats_rows(cursor, simulator_ids):
+    for start in range(0, len(simulator_ids), WRITE_BATCH_SIZE):
+        batch = simulator_ids[start:start + WRITE_BATCH_SIZE]
+        cursor.execute(
+            "INSERT IGNORE INTO simulator_stats (simulator_id) SELECT id FROM simulators WHERE id IN "
+            + _in_list(batch), batch)
+
+def upsert_stats(cursor, assignments, columns, rows):
+    """Multi-row upsert of (simulator_id, *columns) rows into simulator_stats"""
+    placeholder = "(" + ", ".join(["%s"] * (len(columns) + 1)) + ")"
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        batch = rows[start:start + WRITE_BATCH_SIZE]
+        cursor.execute(
+            f"INSERT INTO simulator_stats (simulator_id, {', '.join(columns)}) VALUES "
+            + ", ".join([placeholder] * len(batch)) + " ON DUPLICATE KEY UPDATE " + assignments,
+            [value for row in batch for value in row])
+
+def refresh_stats(connection, now=None, half_life_days=HALF_LIFE_DAYS, decayed=False, full=False):
+    """Fold everything past the watermarks into simulator_stats in one transaction.
+
+    - downloads: counted incrementally from the simulator_downloads id watermark
+    - ratings: simulators with ratings touched since the last run get exact
+      SUM/COUNT recomputed, and simulators.rating is refreshed from them
+    - decay: every row's decayed_downloads is scaled by the same factor for
+      the time since the last run, then new downloads are added at their own age
+    - trending_score = downloads (or decayed downloads) * 0.5 + avg rating * 10
+    """
+    now = now or datetime.now().replace(microsecond=0)
+    with connection.cursor() as cursor:
+        ensure_tables(cursor)
+    connection.begin()
+    try:
+        with connection.cursor() as cursor:
+            if full:
+                cursor.execute("DELETE FROM simulator_stats")
+                cursor.execute("DELETE FROM simulator_stats_watermarks")
+            downloads_after, decayed_at = get_watermark(cursor, "downloads")
+            _, ratings_since = get_watermark(cursor, "ratings")
+            _, simulators_since = get_watermark(cursor, "simulators")
+
+            visibility, simulators_latest = changed_visibility(cursor, simulators_since)
+            counts, weights, downloads_last = new_downloads(cursor, downloads_after, now, half_life_days)
+            rated, ratings_latest = changed_rating_simulators(cursor, ratings_since)
+
+            touched = sorted(set(visibility) | set(counts) | set(rated))
+            ensure_stats_rows(cursor, touched)
+
+            if decayed_at is not None:
+                factor = decay_factor((now - _as_datetime(decayed_at)).total_seconds(), half_life_days)
+                cursor.execute("UPDATE simulator_stats SET decayed_downloads = decayed_downloads * %s", (factor,))
+
+            for is_public in (True, False):
+                ids = [sim for sim, public in visibility.items() if public == is_public]
+                for start in range(0, len(ids), WRITE_BATCH_SIZE):
+                    batch = ids[start:start + WRITE_BATCH_SIZE]
+                    cursor.execute("UPDATE simulator_stats SET is_public = %s WHERE simulator_id IN " + _in_list(batch),
+                                   [is_public] + batch)
+            upsert_stats(cursor, "downloads = downloads + VALUES(downloads), "
+                                 "decayed_downloads = decayed_downloads + VALUES(decayed_downloads)",
+                         ("downloads", "decayed_downloads"),
+                         [(sim, counts[sim], weights[sim]) for sim in sorted(counts)])
+            totals = rating_totals(cursor, rated)
+            upsert_stats(cursor, "rating_sum = VALUES(rating_sum), rating_count = VALUES(rating_count), "
+                                 "avg_rating = VALUES(avg_rating)",
+                         ("rating_sum", "rating_count", "avg_rating"),
+                         [(sim, rating_sum, rating_count, round(rating_sum / rating_count, 2) if rating_count else 0)
+                          for sim, (rating_sum, rating_count) in sorted(totals.items())])
+            for start in range(0, len(rated), WRITE_BATCH_SIZE):
+                batch = rated[start:start + WRITE_BATCH_SIZE]
+                cursor.execute(
+                    "UPDATE simulators SET rating = (SELECT avg_rating FROM simulator_stats "
+                    "WHERE simulator_stats.simulator_id = simulators.id) WHERE id IN " + _in_list(batch), batch)
+
+            # One statement over the (small) stats table; decay moves every score anyway
+            source = "decayed_downloads" if decayed else "downloads"
+            cursor.execute(f"UPDATE simulator_stats SET trending_score = {source} * %s + avg_rating * %s",
+                           (DOWNLOAD_WEIGHT, RATING_WEIGHT))
+
+            set_watermark(cursor, "downloads", downloads_last, now)
+            set_watermark(cursor, "ratings", last_at=ratings_latest)
+            # simulators.rating was just written, which bumps updated_at; that re-reads
+            # those rows next run, which is harmless
+            set_watermark(cursor, "simulators", last_at=simulators_latest)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return {"simulators": len(touched), "downloads": sum(counts.values()), "rated": len(rated)}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh simulator download/rating aggregates and trending scores")
+    parser.add_argument("--decayed", action="store_true",
+                        help="rank trending by time-decayed downloads instead of all-time downloads")
+    parser.add_argument("--half-life-days", type=float, default=HALF_LIFE_DAYS,
+                        help=f"half-life of a download in the decayed score (default {HALF_LIFE_DAYS:g})")
+    parser.add_argument("--full", action="store_true", help="rebuild simulator_stats from scratch")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    print(f"📈 Refreshing simulator aggregates{' (full rebuild)' if args.full else ''}...")
+    started = time.perf_counter()
+    try:
+        with get_pool().connection() as connection:
+            result = refresh_stats(connection, half_life_days=args.half_life_days, decayed=args.decayed,
+                                   full=args.full)
+    except Exception as e:
+        print(f"❌ Aggregation failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print(f"\n✅ {result['simulators']} simulators touched ({result['downloads']:,} new downloads, "
+          f"{result['rated']} with rating changes) in {time.perf_counter() - started:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
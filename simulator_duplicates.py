@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulator Near-Duplicate Finder
+Shingles every simulator's block graph, keeps MinHash signatures in a local LSH store refreshed from updated_at, and reports clusters of forks and copies
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import sys
+import time
+
+import numpy as np
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+from course_state_cache import PAGE_SIZE, _timestamp, iter_changed_rows
+from quiz_variants import splitmix64, splitmix64_np
+from simulator_evaluator import normalize_connections, parse_json_list
+from simulator_version_history import fetch_history, materialize
+
+DEFAULT_STORE_DIR = os.getenv(
+    "SIMULATOR_DEDUPE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".simulator_dedupe"),
+)
+STORE_NAME = "signatures.sqlite"
+ER_NO_SUCH_TABLE = 1146
+ER_BAD_FIELD_ERROR = 1054
+
+# Bump when the shingles change: stored signatures are then rebuilt
+SHINGLE_VERSION = 1
+NUM_PERM = 120
+# 20 bands of 6 rows: pairs at Jaccard 0.8 share a bucket 99.8% of the time, at 0.5 27%, at 0.3 1.5%
+BANDS = 20
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.8
+MINHASH_SEED = 0x5EED_D0C5
+# Version 0 of a simulator is its current graph; saved versions keep their own number
+CURRENT = 0
+
+# ===== SHINGLES =====
+
+def _param(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return format(float(value), ".6g")
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+def block_token(block):
+    """Type and parameters of a block; ids and canvas position are left out, so forks and rebuilt copies match"""
+    inputs = block.get("inputs") if isinstance(block.get("inputs"), dict) else {}
+    params = ",".join(f"{name}={_param(inputs[name])}" for name in sorted(inputs))
+    return f"{block.get('type')}({params})"
+
+def shingles(blocks, connections):
+    """The graph as a set of strings: one per block, two per wire.
+
+    A wire gives the typed port pair (which block kinds talk to each
+    other) and the same pair with both blocks' parameters. Repeats are
+    numbered, so three identical blocks differ from one.
+    """
+    blocks = [b for b in blocks if isinstance(b, dict)]
+    tokens = {}
+    for block in blocks:
+        tokens[block.get("id") if _hashable(block.get("id")) else None] = block_token(block)
+    edges, _ = normalize_connections([b for b in blocks if _hashable(b.get("id"))], connections)
+    types = {b.get("id"): b.get("type") for b in blocks if _hashable(b.get("id"))}
+    items = [f"b:{block_token(b)}" for b in blocks]
+    for edge in edges:
+        source, target = edge["from"], edge["to"]
+        items.append(f"e:{types[source]}.{edge['fromOutput']}>{types[target]}.{edge['toInput']}")
+        items.append(f"p:{tokens[source]}.{edge['fromOutput']}>{tokens[target]}.{edge['toInput']}")
+    seen, out = {}, set()
+    for item in items:
+        seen[item] = seen.get(item, 0) + 1
+        out.add(f"{item}#{seen[item]}")
+    return out
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+# ===== MINHASH =====
+
+PERMUTATION_SEEDS = np.array([splitmix64(MINHASH_SEED ^ i) for i in range(NUM_PERM)], dtype=np.uint64)[:, None]
+
+def shingle_hashes(items):
+    return np.fromiter((int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                        for s in items), dtype=np.uint64, count=len(items))
+
+def signature(items):
+    """NUM_PERM minimum hashes, each over a different splitmix64 permutation of the shingle hashes; None if empty"""
+    if not items:
+        return None
+    return splitmix64_np(shingle_hashes(items)[None, :] ^ PERMUTATION_SEEDS).min(axis=1)
+
+def band_keys(sig):
+    """One signed 64-bit bucket per band; two signatures collide when all ROWS values of a band agree"""
+    raw = sig.astype("<u8").tobytes()
+    return [int.from_bytes(hashlib.blake2b(struct.pack("<I", band) + raw[band * ROWS * 8:(band + 1) * ROWS * 8],
+                                           digest_size=8).digest(), "little", signed=True)
+            for band in range(BANDS)]
+
+# ===== SIGNATURE STORE =====
+
+STORE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS docs (
+        simulator_id INTEGER NOT NULL,
+        version_number INTEGER NOT NULL,
+        source_hash TEXT NOT NULL,
+        digest TEXT,
+        shingles INTEGER NOT NULL,
+        PRIMARY KEY (simulator_id, version_number)
+    );
+    CREATE INDEX IF NOT EXISTS docs_digest ON docs (digest);
+    CREATE TABLE IF NOT EXISTS signatures (
+        digest TEXT PRIMARY KEY,
+        signature BLOB NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS buckets (
+        bucket INTEGER NOT NULL,
+        digest TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS buckets_bucket ON buckets (bucket);
+    CREATE INDEX IF NOT EXISTS buckets_digest ON buckets (digest);
+    CREATE TABLE IF NOT EXISTS pairs (
+        a TEXT NOT NULL,
+        b TEXT NOT NULL,
+        similarity REAL NOT NULL,
+        PRIMARY KEY (a, b)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS pairs_b ON pairs (b);
+    CREATE TABLE IF NOT EXISTS watermark (
+        name TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+class SignatureStore:
+    """MinHash signatures of every indexed graph and their LSH buckets, in SQLite.
+
+    Graphs with the same signature share one digest, so a thousand
+    untouched forks cost one bucket entry and no pair checks. Only
+    distinct signatures go into buckets; a new one is checked against the
+    signatures it shares a bucket with, and pairs at or above the
+    threshold are kept. Nothing is ever compared pairwise across the table.
+    """
+
+    def __init__(self, path, threshold=THRESHOLD):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(STORE_SCHEMA)
+        self.threshold = threshold
+        self.checked = 0
+
+    def close(self):
+        self.db.close()
+
+    def get(self, name):
+        row = self.db.execute("SELECT value FROM watermark WHERE name = ?", (name,)).fetchone()
+        return row["value"] if row else None
+
+    def put(self, name, value):
+        self.db.execute("INSERT INTO watermark (name, value) VALUES (?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET value = excluded.value", (name, value))
+
+    def source_hashes(self, simulator_id=None):
+        sql, args = "SELECT simulator_id, version_number, source_hash FROM docs", ()
+        if simulator_id is not None:
+            sql, args = sql + " WHERE simulator_id = ?", (simulator_id,)
+        return {(r["simulator_id"], r["version_number"]): r["source_hash"] for r in self.db.execute(sql, args)}
+
+    def set_doc(self, simulator_id, version_number, source_hash, sig, shingle_count):
+        """Store one graph's signature; returns how many new near-duplicate pairs it added"""
+        digest = hashlib.sha256(sig.astype("<u8").tobytes()).hexdigest()[:32] if sig is not None else None
+        old = self.db.execute("SELECT digest FROM docs WHERE simulator_id = ? AND version_number = ?",
+                              (simulator_id, version_number)).fetchone()
+        self.db.execute(
+            "INSERT INTO docs (simulator_id, version_number, source_hash, digest, shingles) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(simulator_id, version_number) DO UPDATE SET source_hash = excluded.source_hash, "
+            "digest = excluded.digest, shingles = excluded.shingles",
+            (simulator_id, version_number, source_hash, digest, shingle_count))
+        added = 0
+        if digest is not None and old is not None and old["digest"] == digest:
+            return 0
+        if digest is not None and not self.db.execute("SELECT 1 FROM signatures WHERE digest = ?", (digest,)).fetchone():
+            added = self._add_signature(digest, sig, simulator_id)
+        if old is not None and old["digest"] not in (None, digest):
+            self._collect(old["digest"])
+        return added
+
+    def _add_signature(self, digest, sig, simulator_id):
+        keys = band_keys(sig)
+        candidates = [r["digest"] for r in self.db.execute(
+            "SELECT DISTINCT digest FROM buckets WHERE bucket IN (" + ", ".join("?" * len(keys)) + ")", keys)]
+        self.db.execute("INSERT INTO signatures (digest, signature) VALUES (?, ?)", (digest, sig.astype("<u8").tobytes()))
+        self.db.executemany("INSERT INTO buckets (bucket, digest) VALUES (?, ?)", [(k, digest) for k in keys])
+        if not candidates:
+            return 0
+        owners = {}
+        for start in range(0, len(candidates), 500):
+            chunk = candidates[start:start + 500]
+            for r in self.db.execute("SELECT digest, simulator_id FROM docs WHERE digest IN ("
+                                     + ", ".join("?" * len(chunk)) + ")", chunk):
+                owners.setdefault(r["digest"], set()).add(r["simulator_id"])
+        # Versions of one simulator are near-duplicates by construction
+        candidates = [d for d in candidates if owners.get(d, set()) - {simulator_id}]
+        pairs = []
+        for start in range(0, len(candidates), 500):
+            chunk = candidates[start:start + 500]
+            rows = self.db.execute("SELECT digest, signature FROM signatures WHERE digest IN ("
+                                   + ", ".join("?" * len(chunk)) + ")", chunk).fetchall()
+            if not rows:
+                continue
+            others = np.frombuffer(b"".join(r["signature"] for r in rows), dtype="<u8").reshape(len(rows), NUM_PERM)
+            # Estimated Jaccard similarity: the share of permutations whose minimum agrees
+            scores = (others == sig).mean(axis=1)
+            self.checked += len(rows)
+            pairs.extend((min(digest, r["digest"]), max(digest, r["digest"]), float(s))
+                         for r, s in zip(rows, scores) if s >= self.threshold)
+        self.db.executemany("INSERT OR REPLACE INTO pairs (a, b, similarity) VALUES (?, ?, ?)", pairs)
+        return len(pairs)
+
+    def _collect(self, digest):
+        """Drop a signature no graph uses any more, with its buckets and pairs"""
+        if self.db.execute("SELECT 1 FROM docs WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+        self.db.execute("DELETE FROM signatures WHERE digest = ?", (digest,))
+        self.db.execute("DELETE FROM buckets WHERE digest = ?", (digest,))
+        self.db.execute("DELETE FROM pairs WHERE a = ? OR b = ?", (digest, digest))
+
+    def remove_simulator(self, simulator_id):
+        digests = {r["digest"] for r in self.db.execute(
+            "SELECT digest FROM docs WHERE simulator_id = ? AND digest IS NOT NULL", (simulator_id,))}
+        self.db.execute("DELETE FROM docs WHERE simulator_id = ?", (simulator_id,))
+        for digest in digests:
+            self._collect(digest)
+
+    def clusters(self):
+        """Connected simulators: same signature, or a kept pair between their signatures.
+
+        Returns [{"simulators", "canonical", "members": {id: (similarity,
+        closest other simulator)}}], largest first. The canonical copy is the
+        lowest id, i.e. the one published first.
+        """
+        owners = {}
+        for r in self.db.execute("SELECT digest, simulator_id FROM docs WHERE digest IS NOT NULL"):
+            owners.setdefault(r["digest"], set()).add(r["simulator_id"])
+        parent = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        def union(a, b):
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+        best = {}
+
+        def link(sims, others, score):
+            for s in sims:
+                partners = others - {s}
+                if partners and score > best.get(s, (-1.0, None))[0]:
+                    best[s] = (score, min(partners))
+
+        for sims in owners.values():
+            first = min(sims)
+            for s in sims:
+                union(first, s)
+            link(sims, sims, 1.0)
+        for r in self.db.execute("SELECT a, b, similarity FROM pairs"):
+            a, b = owners.get(r["a"], set()), owners.get(r["b"], set())
+            if a and b and a | b != a & b:
+                union(min(a), min(b))
+                link(a, b, r["similarity"])
+                link(b, a, r["similarity"])
+
+        groups = {}
+        for s in best:
+            groups.setdefault(find(s), []).append(s)
+        return sorted(({"simulators": sorted(members), "canonical": min(members),
+                        "members": {s: best[s] for s in sorted(members)}}
+                       for members in groups.values() if len(members) > 1),
+                      key=lambda c: (-len(c["simulators"]), c["canonical"]))
+
+    def counts(self):
+        count = lambda table: self.db.execute(f"SELECT COUNT(*) AS n FROM {table}").fetchone()["n"]
+        return {"docs": count("docs"), "signatures": count("signatures"), "pairs_total": count("pairs")}
+
+# ===== REFRESH =====
+
+def source_hash(blocks, connections):
+    return hashlib.sha256(json.dumps([blocks, connections], sort_keys=True).encode("utf-8")).hexdigest()
+
+def index_graph(store, simulator_id, version_number, blocks, connections, known):
+    """Signature one graph unless its source is unchanged; returns (indexed, pairs added)"""
+    digest = source_hash(blocks, connections)
+    if known.get((simulator_id, version_number)) == digest:
+        return False, 0
+    items = shingles(blocks, connections)
+    return True, store.set_doc(simulator_id, version_number, digest, signature(items), len(items))
+
+def _params(threshold, versions):
+    return json.dumps({"shingles": SHINGLE_VERSION, "perm": NUM_PERM, "bands": BANDS, "seed": MINHASH_SEED,
+                       "threshold": threshold, "versions": versions}, sort_keys=True)
+
+def _refresh_versions(connection, store, since_id, changed):
+    """Index saved versions of simulators that gained one since `since_id`; returns (graphs, pairs, newest id)"""
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("SELECT simulator_id, MAX(id) AS newest FROM simulator_versions WHERE id > %s "
+                           "GROUP BY simulator_id ORDER BY simulator_id", (since_id,))
+        except Exception as e:
+            # simulator_versions only exists once server.js has created it
+            if getattr(e, "args", (None,))[0] != ER_NO_SUCH_TABLE:
+                raise
+            connection.rollback()
+            return 0, 0, since_id
+        targets = cursor.fetchall()
+    connection.commit()
+    graphs = pairs = 0
+    newest = since_id
+    for target in targets:
+        simulator_id = target["simulator_id"]
+        with connection.cursor() as cursor:
+            try:
+                rows = fetch_history(cursor, simulator_id)
+            except Exception as e:
+                # Before the delta columns exist every row is stored in full
+                if getattr(e, "args", (None,))[0] != ER_BAD_FIELD_ERROR:
+                    raise
+                connection.rollback()
+                cursor.execute("SELECT id, version_number, blocks, connections, 'full' AS storage, "
+                               "NULL AS base_version, NULL AS delta FROM simulator_versions "
+                               "WHERE simulator_id = %s ORDER BY version_number, id", (simulator_id,))
+                rows = cursor.fetchall()
+        connection.commit()
+        known = store.source_hashes(simulator_id)
+        for number, (blocks, connections) in materialize(rows).items():
+            indexed, added = index_graph(store, simulator_id, number, blocks, connections, known)
+            graphs += indexed
+            pairs += added
+            if indexed:
+                changed.add(simulator_id)
+        newest = max(newest, target["newest"])
+    return graphs, pairs, newest
+
+def refresh(connection, store, versions=False, page_size=PAGE_SIZE):
+    """Index simulators changed since the watermark and forget deleted ones.
+
+    With `versions`, saved versions are indexed too, so a fork of an old
+    version still finds its source. They are append-only, so they are
+    picked up by id rather than updated_at. Returns stats including the
+    set of simulator ids that changed.
+    """
+    started = time.perf_counter()
+    since = store.get("simulators")
+    newest = since
+    stats = {"graphs": 0, "empty": 0, "pairs": 0, "versions": 0, "removed": 0, "changed": set()}
+    known = store.source_hashes()
+    with store.db:
+        for row in iter_changed_rows(connection, "simulators", since, "id, blocks, connections, updated_at", page_size):
+            stamp = _timestamp(row["updated_at"])
+            newest = stamp if newest is None or stamp > newest else newest
+            blocks, connections = parse_json_list(row["blocks"]), parse_json_list(row["connections"])
+            indexed, added = index_graph(store, row["id"], CURRENT, blocks, connections, known)
+            if indexed:
+                stats["graphs"] += 1
+                stats["empty"] += not blocks
+                stats["pairs"] += added
+                stats["changed"].add(row["id"])
+        connection.commit()
+
+        if versions:
+            graphs, pairs, last_version = _refresh_versions(
+                connection, store, int(store.get("simulator_versions") or 0), stats["changed"])
+            stats["versions"], stats["pairs"] = graphs, stats["pairs"] + pairs
+            store.put("simulator_versions", str(last_version))
+
+        live, last_id = set(), 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT id FROM simulators WHERE id > %s ORDER BY id LIMIT %s", (last_id, page_size))
+                ids = [r["id"] for r in cursor.fetchall()]
+            live.update(ids)
+            if len(ids) < page_size:
+                break
+            last_id = ids[-1]
+        connection.commit()
+        for simulator_id in {key[0] for key in known} - live:
+            store.remove_simulator(simulator_id)
+            stats["removed"] += 1
+        if newest is not None:
+            store.put("simulators", newest)
+    stats["checked"] = store.checked
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def find_duplicates(connection, store_dir=DEFAULT_STORE_DIR, threshold=THRESHOLD, versions=False, full=False):
+    """Refresh the signature store and return (stats, clusters).
+
+    A run with different settings from the stored ones starts over, since
+    signatures and pairs would not be comparable.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, STORE_NAME)
+    params = _params(threshold, versions)
+    if not os.path.exists(path):
+        full = True
+    elif not full:
+        store = SignatureStore(path, threshold)
+        full = store.get("params") != params
+        store.close()
+    if full and os.path.exists(path):
+        os.remove(path)
+    store = SignatureStore(path, threshold)
+    try:
+        with store.db:
+            store.put("params", params)
+        stats = refresh(connection, store, versions)
+        stats.update(store.counts())
+        stats["full"] = full
+        return stats, store.clusters()
+    finally:
+        store.close()
+
+def print_report(stats, clusters, only_new=False):
+    mode = "full scan" if stats["full"] else "incremental"
+    print(f"\n✅ {mode}: {stats['graphs']} simulators and {stats['versions']} versions signed "
+          f"({stats['empty']} empty), {stats['removed']} removed in {stats['seconds']:.2f}s")
+    print(f"  ✓ {stats['docs']:,} graphs indexed as {stats['signatures']:,} distinct signatures; "
+          f"{stats['checked']:,} bucket candidates checked, {stats['pairs']} new pairs, {stats['pairs_total']:,} kept")
+    shown = [c for c in clusters if not only_new or stats["changed"] & set(c["simulators"])]
+    print(f"\n📊 {len(clusters)} clusters covering {sum(len(c['simulators']) for c in clusters)} simulators"
+          + (f", {len(shown)} touching changed simulators:" if only_new else ":"))
+    for c in shown:
+        new = " 🆕" if stats["changed"] & set(c["simulators"]) else ""
+        print(f"  [{c['canonical']}] {len(c['simulators'])} copies{new}")
+        for simulator_id, (score, partner) in c["members"].items():
+            if simulator_id != c["canonical"]:
+                print(f"      {simulator_id}: {score:.0%} like {partner}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate simulators with MinHash and LSH")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="signature store (default ./.simulator_dedupe)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="estimated Jaccard similarity that counts as a near-duplicate")
+    parser.add_argument("--versions", action="store_true", help="also match against every saved version")
+    parser.add_argument("--full", action="store_true", help="re-sign every simulator instead of only changed ones")
+    parser.add_argument("--only-new", action="store_true", help="only list clusters touching simulators changed this run")
+    parser.add_argument("--output", help="also write the clusters as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    print(f"🧬 Signing simulators into {args.store_dir} (threshold {args.threshold:.0%}"
+          f"{', with saved versions' if args.versions else ''})...")
+    try:
+        with get_pool().connection() as connection:
+            stats, clusters = find_duplicates(connection, args.store_dir, args.threshold, args.versions, args.full)
+    except Exception as e:
+        print(f"❌ Duplicate scan failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print_report(stats, clusters, args.only_new)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([{"canonical": c["canonical"], "simulators": c["simulators"],
+                        "members": [{"simulator_id": s, "similarity": score, "closest": partner}
+                                    for s, (score, partner) in c["members"].items()],
+                        "new": bool(stats["changed"] & set(c["simulators"]))} for c in clusters], f, indent=2)
+        print(f"\n  ✓ Clusters written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
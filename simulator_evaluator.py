@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulator Evaluator
+Headless twin of BlockExecutionEngine: compiles a simulator's block graph once and evaluates it with NumPy over every slider position
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+
+# Bump when a template's math changes so cached sweeps are recomputed once
+EVALUATOR_VERSION = 1
+DEFAULT_CACHE_DIR = os.getenv(
+    "SIMULATOR_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".simulator_cache"),
+)
+# Sweeps with more slider positions than this are skipped rather than allocated
+MAX_GRID_POINTS = int(os.getenv("SIMULATOR_MAX_GRID_POINTS", "1000000"))
+
+# ===== TEMPLATES =====
+# Mirrors veelearn-frontend/block-templates-unified.js. Each execute takes
+# scalars or arrays that broadcast against the slider grid; text inputs
+# (operators, modes) stay plain strings and pick the branch once.
+
+def _truthy(x):
+    """JS truthiness of a number: 0 and NaN are false"""
+    x = np.asarray(x, dtype=float)
+    return (x != 0) & ~np.isnan(x)
+
+def _false(*xs):
+    return np.zeros(np.broadcast(*xs).shape, dtype=bool)
+
+def _divide(inputs):
+    a, b = inputs["a"], inputs["b"]
+    if np.asarray(b).dtype == bool:
+        # `b !== 0` is always true for a JS boolean, so false divides to Infinity
+        return {"result": np.divide(a, b.astype(float))}
+    return {"result": np.where(np.asarray(b) != 0, np.divide(a, np.where(np.asarray(b) != 0, b, 1)), 0.0)}
+
+_COMPARE = {
+    ">": np.greater, "<": np.less, ">=": np.greater_equal, "<=": np.less_equal,
+    "==": np.equal, "===": np.equal, "!==": np.not_equal,
+}
+
+def _if_condition(inputs):
+    compare = _COMPARE.get(inputs["operator"])
+    v1, v2 = inputs["value1"], inputs["value2"]
+    result = compare(v1, v2) if compare else _false(v1, v2)
+    return {"result": result, "then_branch": result, "else_branch": ~result}
+
+def _range_mapper(inputs):
+    ratio = (inputs["value"] - inputs["inMin"]) / (inputs["inMax"] - inputs["inMin"])
+    return {"result": inputs["outMin"] + ratio * (inputs["outMax"] - inputs["outMin"])}
+
+def _trigonometry(inputs):
+    rad = np.multiply(inputs["angle"], math.pi / 180)
+    fn = inputs["function"]
+    if fn in ("sin", "cos", "tan"):
+        return {"result": getattr(np, fn)(rad)}
+    if fn in ("asin", "acos", "atan"):
+        return {"result": getattr(np, "arc" + fn[1:])(rad) * 180 / math.pi}
+    return {"result": np.zeros_like(rad)}
+
+def _random_number(inputs, ctx):
+    # The browser draws Math.random() every frame; here the draw is seeded by
+    # block id so cached sweeps stay reproducible
+    rng = np.random.default_rng(zlib.crc32(str(ctx["block_id"]).encode("utf-8")))
+    low, high = np.broadcast_arrays(inputs["min"], inputs["max"])
+    shape = np.broadcast_shapes(low.shape, ctx["shape"])
+    rand = rng.random(shape) * (high - low) + low
+    return {"result": np.floor(rand) if inputs["type"] == "int" else rand}
+
+def _collision(inputs):
+    distance = np.sqrt((inputs["x2"] - inputs["x1"]) ** 2 + (inputs["y2"] - inputs["y1"]) ** 2)
+    reach = inputs["r1"] + inputs["r2"]
+    return {"colliding": distance < reach, "distance": distance, "overlap": reach - distance}
+
+def _spring(inputs):
+    force = inputs["stiffness"] * (inputs["target"] - inputs["x"])
+    return {"force": force, "newPosition": inputs["x"] + force}
+
+def _easing(inputs):
+    t = np.asarray(inputs["t"], dtype=float)
+    kind = inputs["type"]
+    if kind == "ease-in":
+        return {"value": t * t}
+    if kind == "ease-out":
+        return {"value": 1 - (1 - t) * (1 - t)}
+    if kind == "ease-inout":
+        return {"value": np.where(t < 0.5, 2 * t * t, -1 + (4 - 2 * t) * t)}
+    return {"value": t}
+
+def _vector(inputs):
+    x1, y1, x2, y2 = inputs["x1"], inputs["y1"], inputs["x2"], inputs["y2"]
+    zero = np.zeros(np.broadcast(x1, y1, x2, y2).shape)
+    result, rx, ry = zero, zero, zero
+    op = inputs["operation"]
+    if op == "dot":
+        result = x1 * x2 + y1 * y2
+    elif op == "cross":
+        result = x1 * y2 - y1 * x2
+    elif op == "magnitude":
+        result = np.sqrt(np.multiply(x1, x1) + np.multiply(y1, y1))
+    elif op == "add":
+        rx, ry = np.add(x1, x2), np.add(y1, y2)
+    elif op == "subtract":
+        rx, ry = np.subtract(x1, x2), np.subtract(y1, y2)
+    return {"result": result, "resultX": rx, "resultY": ry}
+
+def _rotation(inputs):
+    rad = np.multiply(inputs["angle"], math.pi / 180)
+    cos, sin = np.cos(rad), np.sin(rad)
+    px, py = inputs["x"] - inputs["cx"], inputs["y"] - inputs["cy"]
+    return {"newX": inputs["cx"] + px * cos - py * sin, "newY": inputs["cy"] + px * sin + py * cos}
+
+def _raycast(inputs):
+    rad = np.multiply(inputs["angle"], math.pi / 180)
+    tx, ty = inputs["targetX"] - inputs["x"], inputs["targetY"] - inputs["y"]
+    projection = tx * np.cos(rad) + ty * np.sin(rad)
+    distance = np.sqrt(tx * tx + ty * ty)
+    hit = (distance <= inputs["targetRadius"]) & (projection > 0) & (projection < inputs["maxDistance"])
+    return {"hit": hit, "distance": distance}
+
+def _frame_counter(inputs, ctx):
+    count = np.where(_truthy(inputs["reset"]), 0, ctx["frame"] + 1)
+    return {"count": count, "time": count * 0.016}
+
+def _template(inputs, outputs, execute, uses_context=False, boolean_inputs=()):
+    """inputs: (name, default) pairs; a str default marks a text input.
+
+    Wired booleans arrive as 0/1 floats except in boolean_inputs, for the
+    templates whose JS behaves differently on true/false than on 1/0.
+    """
+    return {"inputs": inputs, "outputs": outputs, "execute": execute, "uses_context": uses_context,
+            "boolean_inputs": boolean_inputs}
+
+def _drawing(*inputs):
+    return _template(list(inputs), [], lambda i: {})
+
+TEMPLATES = {
+    "variable": _template([("name", "myVar"), ("value", 0)], ["value"], lambda i: {"value": i["value"]}),
+    "set-variable": _template([("name", "myVar"), ("value", 0)], [], lambda i: {}),
+    "if-condition": _template([("value1", 0), ("operator", ">"), ("value2", 0)],
+                              ["result", "then_branch", "else_branch"], _if_condition),
+    "condition-trigger": _template(
+        [("condition", 0), ("onTrue", 1), ("onFalse", 0)], ["result"],
+        lambda i: {"result": np.where(_truthy(i["condition"]), i["onTrue"], i["onFalse"])}),
+    "range-mapper": _template([("value", 50), ("inMin", 0), ("inMax", 100), ("outMin", 0), ("outMax", 1)],
+                              ["result"], _range_mapper),
+    "add": _template([("a", 0), ("b", 0)], ["result"], lambda i: {"result": np.add(i["a"], i["b"])}),
+    "subtract": _template([("a", 10), ("b", 3)], ["result"], lambda i: {"result": np.subtract(i["a"], i["b"])}),
+    "multiply": _template([("a", 1), ("b", 1)], ["result"], lambda i: {"result": np.multiply(i["a"], i["b"])}),
+    "divide": _template([("a", 10), ("b", 2)], ["result"], _divide, boolean_inputs=("b",)),
+    "power": _template([("base", 2), ("exponent", 2)], ["result"],
+                       lambda i: {"result": np.power(np.asarray(i["base"], dtype=float), i["exponent"])}),
+    "sqrt": _template([("value", 4)], ["result"], lambda i: {"result": np.sqrt(i["value"])}),
+    # JS % keeps the dividend's sign, like fmod
+    "modulo": _template([("a", 10), ("b", 3)], ["result"], lambda i: {"result": np.fmod(i["a"], i["b"])}),
+    "absolute": _template([("value", -5)], ["result"], lambda i: {"result": np.abs(i["value"])}),
+    "min-max": _template(
+        [("a", 5), ("b", 10), ("mode", "min")], ["result"],
+        lambda i: {"result": (np.minimum if i["mode"] == "min" else np.maximum)(i["a"], i["b"])}),
+    "clamp": _template([("value", 50), ("min", 0), ("max", 100)], ["result"],
+                       lambda i: {"result": np.maximum(i["min"], np.minimum(i["max"], i["value"]))}),
+    "trigonometry": _template([("angle", 45), ("function", "sin")], ["result"], _trigonometry),
+    "random-number": _template([("min", 0), ("max", 100), ("type", "float")], ["result"], _random_number, True),
+
+    "draw-circle": _drawing(("x", 184), ("y", 200), ("radius", 50), ("color", "#667eea")),
+    "draw-rectangle": _drawing(("x", 50), ("y", 150), ("width", 100), ("height", 80), ("color", "#10b981")),
+    "draw-line": _drawing(("x1", 50), ("y1", 50), ("x2", 300), ("y2", 350), ("color", "#333"), ("width", 2)),
+    "draw-text": _drawing(("text", "Hello"), ("x", 100), ("y", 200), ("color", "#000"), ("size", 16)),
+    "draw-polygon": _drawing(("cx", 184), ("cy", 200), ("sides", 6), ("radius", 50), ("color", "#667eea")),
+    "draw-arc": _drawing(("x", 184), ("y", 200), ("radius", 50), ("startAngle", 0), ("endAngle", 180),
+                         ("color", "#667eea")),
+    "draw-gradient-rect": _drawing(("x", 50), ("y", 100), ("width", 200), ("height", 100),
+                                   ("color1", "#667eea"), ("color2", "#764ba2")),
+    "trace-path": _drawing(("x", 100), ("y", 100), ("color", "#667eea"), ("size", 2)),
+    "clear-canvas": _drawing(("color", "white")),
+
+    "gravity": _template([("mass", 1), ("g", 9.8), ("damping", 0.99)], ["force", "acceleration"],
+                         lambda i: {"force": np.multiply(i["mass"], i["g"]),
+                                    "acceleration": np.divide(np.multiply(i["mass"], i["g"]), i["mass"])}),
+    "velocity": _template(
+        [("vx", 0), ("vy", 0), ("duration", 1)], ["vx", "vy", "distance"],
+        lambda i: {"vx": i["vx"], "vy": i["vy"],
+                   "distance": np.sqrt(np.square(i["vx"]) + np.square(i["vy"])) * i["duration"]}),
+    "collision-detection": _template([("x1", 100), ("y1", 100), ("r1", 20), ("x2", 200), ("y2", 100), ("r2", 20)],
+                                     ["colliding", "distance", "overlap"], _collision),
+    "spring-physics": _template([("x", 0), ("target", 100), ("stiffness", 0.1), ("damping", 0.05)],
+                                ["force", "newPosition"], _spring),
+    # Particles are a list of objects, not numbers: nothing to sweep
+    "particle-system": _template([("x", 184), ("y", 200), ("count", 10), ("speed", 5), ("color", "#ff00ff")],
+                                 ["particles"], lambda i: {}),
+    "gravity-simulation": _template(
+        [("vy", 0), ("g", 9.8), ("dt", 0.016)], ["newVy", "newY"],
+        lambda i: {"newVy": i["vy"] + i["g"] * i["dt"],
+                   "newY": i["vy"] * i["dt"] + 0.5 * i["g"] * i["dt"] * i["dt"]}),
+
+    "animation-loop": _template(
+        [("duration", 1000), ("repeat", 1)], ["progress", "frameCount"],
+        lambda i, ctx: {"progress": np.fmod(ctx["frame"], i["duration"]) / i["duration"],
+                        "frameCount": np.asarray(float(ctx["frame"]))}, True),
+    "frame-counter": _template([("reset", 0)], ["count", "time"], _frame_counter, True),
+    "easing-function": _template([("t", 0.5), ("type", "linear")], ["value"], _easing),
+
+    "vector-operation": _template([("x1", 1), ("y1", 0), ("x2", 0), ("y2", 1), ("operation", "dot")],
+                                  ["result", "resultX", "resultY"], _vector),
+    "rotation": _template([("x", 100), ("y", 0), ("cx", 0), ("cy", 0), ("angle", 45)], ["newX", "newY"], _rotation),
+    "raycast": _template([("x", 0), ("y", 0), ("angle", 0), ("maxDistance", 500), ("targetX", 200),
+                          ("targetY", 200), ("targetRadius", 20)], ["hit", "distance"], _raycast),
+
+    "slider": _template([("variable", "myVar"), ("min", 0), ("max", 100), ("default", 50)], ["value"],
+                        lambda i: {"value": i["default"]}),
+}
+
+def _number(value):
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+# ===== GRAPH =====
+
+def parse_json_list(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+def connection_ends(connection, owner=None):
+    """(source, output, target, input) of one saved wire.
+
+    The editors save a top-level list of {from, fromOutputType, to,
+    toInputType}; older graphs keep wires on the block itself (`owner`),
+    either outgoing ({targetBlockId}) or incoming ({from | fromBlockId, toInput}).
+    """
+    c = connection
+    if owner is None:
+        return (c.get("from", c.get("fromBlockId")), c.get("fromOutputType"),
+                c.get("to", c.get("targetBlockId")), c.get("toInputType", c.get("toInput")))
+    if "targetBlockId" in c:
+        return owner, c.get("fromOutputType"), c["targetBlockId"], c.get("toInput", c.get("toInputType"))
+    return c.get("from", c.get("fromBlockId")), c.get("fromOutputType"), owner, c.get("toInput", c.get("toInputType"))
+
+def is_dangling(connection, ids, owner=None):
+    """True for a wire that is not an object or whose ends are not both blocks in `ids`"""
+    if not isinstance(connection, dict):
+        return True
+    source, _, target, _ = connection_ends(connection, owner)
+    try:
+        return source not in ids or target not in ids
+    except TypeError:  # an id that is a list or object
+        return True
+
+def normalize_connections(blocks, connections):
+    """Every wire of a simulator as {from, fromOutput, to, toInput}, dropping dangling ones.
+
+    Returns (edges, dropped) where dropped counts wires whose ends are
+    not blocks of this graph. A wire from a block to itself is kept: it
+    is a cycle, as in BlockExecutionEngine.topologicalSort.
+    """
+    ids = {b.get("id") for b in blocks if isinstance(b, dict)}
+    edges, dropped = [], 0
+    wires = [(c, None) for c in connections]
+    for block in blocks:
+        if isinstance(block, dict) and isinstance(block.get("connections"), list):
+            wires.extend((c, block.get("id")) for c in block["connections"])
+    for c, owner in wires:
+        if is_dangling(c, ids, owner):
+            dropped += 1
+            continue
+        source, output, target, input_name = connection_ends(c, owner)
+        edges.append({"from": source, "fromOutput": output, "to": target, "toInput": input_name})
+    return edges, dropped
+
+def topological_order(block_ids, edges):
+    """Kahn's algorithm like BlockExecutionEngine.topologicalSort.
+
+    Ready blocks run in their saved order. Returns (order, cyclic) where
+    cyclic lists the blocks left over because they sit on or behind a cycle.
+    """
+    successors = {b: [] for b in block_ids}
+    in_degree = dict.fromkeys(block_ids, 0)
+    for e in edges:
+        successors[e["from"]].append(e["to"])
+        in_degree[e["to"]] += 1
+    queue = deque(b for b in block_ids if in_degree[b] == 0)
+    order = []
+    while queue:
+        b = queue.popleft()
+        order.append(b)
+        for n in successors[b]:
+            in_degree[n] -= 1
+            if in_degree[n] == 0:
+                queue.append(n)
+    placed = set(order)
+    return order, [b for b in block_ids if b not in placed]
+
+class CompiledPlan:
+    """A simulator's blocks in execution order with every input resolved to a constant or a wire"""
+
+    def __init__(self, steps, skipped, dropped):
+        self.steps = steps          # (block id, template, [(input, default, wire or None, value)])
+        self.skipped = skipped      # block types without a template, skipped like the browser does
+        self.dropped = dropped      # dangling wires ignored
+        self.outputs = [(block_id, name) for block_id, template, _ in steps for name in template["outputs"]]
+
+    def inputs_named(self, name):
+        return [block_id for block_id, template, _ in self.steps
+                if any(n == name for n, *_ in template["inputs"])]
+
+    def sliders(self):
+        return {block_id: resolved for block_id, template, resolved in self.steps if template is TEMPLATES["slider"]}
+
+def compile_plan(blocks, connections):
+    """Compile a saved graph once; raises ValueError on a cycle like the browser engine"""
+    blocks = [b for b in parse_json_list(blocks) if isinstance(b, dict)]
+    edges, dropped = normalize_connections(blocks, parse_json_list(connections))
+    by_id = {}
+    for b in blocks:
+        by_id.setdefault(b.get("id"), b)
+    order, cyclic = topological_order(list(by_id), edges)
+    if cyclic:
+        raise ValueError(f"Circular dependency through blocks {cyclic[:10]}")
+
+    # First wire into each input wins, as the viewer's connections.find does
+    wires = {}
+    for e in edges:
+        wires.setdefault((e["to"], e["toInput"]), e)
+
+    steps, skipped = [], []
+    for block_id in order:
+        block = by_id[block_id]
+        template = TEMPLATES.get(block.get("type"))
+        if template is None:
+            skipped.append(block.get("type"))
+            continue
+        saved = block.get("inputs") if isinstance(block.get("inputs"), dict) else {}
+        resolved = []
+        for name, default in template["inputs"]:
+            value = saved.get(name)
+            if value is None:
+                value = default
+            if not isinstance(default, str):
+                value = _number(value)
+            wire = wires.get((block_id, name))
+            if wire is not None:
+                source = TEMPLATES.get(by_id[wire["from"]].get("type"))
+                outputs = source["outputs"] if source else []
+                # The wire's own output, else the source's first output like the engine
+                output = wire["fromOutput"] if wire["fromOutput"] in outputs else (outputs[0] if outputs else None)
+                wire = (wire["from"], output) if output else None
+            resolved.append((name, default, wire, value))
+        steps.append((block_id, template, resolved))
+    return CompiledPlan(steps, skipped, dropped)
+
+def evaluate(plan, overrides=None, shape=(), frame=0):
+    """Run a compiled plan once over a whole slider grid.
+
+    `overrides` maps (block id, input name) to an array broadcastable to
+    `shape`; each block then executes once with array inputs instead of
+    once per slider position. Returns {(block id, output): array of `shape`}.
+    """
+    overrides = overrides or {}
+    values = {}
+    with np.errstate(all="ignore"):
+        for block_id, template, resolved in plan.steps:
+            inputs = {}
+            for name, default, wire, value in resolved:
+                if wire is not None and wire[1] in values.get(wire[0], {}):
+                    value = values[wire[0]][wire[1]]
+                    inputs[name] = value if name in template["boolean_inputs"] else value.astype(float, copy=False)
+                elif isinstance(default, str):
+                    inputs[name] = value
+                else:
+                    inputs[name] = overrides.get((block_id, name), value)
+            if template["uses_context"]:
+                out = template["execute"](inputs, {"block_id": block_id, "shape": shape, "frame": frame})
+            else:
+                out = template["execute"](inputs)
+            if template["outputs"]:
+                values[block_id] = {name: np.asarray(v) for name, v in out.items()}
+    return {(block_id, name): np.broadcast_to(v.astype(float, copy=False), shape)
+            for block_id, out in values.items() for name, v in out.items()}
+
+# ===== SLIDER GRID =====
+
+def slider_axis(min_value, max_value, step_value):
+    """Every position of one slider, min to max inclusive by step"""
+    low, high, step = float(min_value), float(max_value), float(step_value or 0)
+    if step <= 0 or high <= low:
+        return np.array([low])
+    count = int(math.floor((high - low) / step + 1e-9)) + 1
+    return low + step * np.arange(count)
+
+def bind_params(plan, params):
+    """The (block id, input) pairs each slider row drives.
+
+    block_id names the block inside the simulator. The course editor
+    still saves block_id 1, so when no block has that id the row binds to
+    slider blocks whose variable is param_name, then to every block with
+    an input called param_name.
+    """
+    bound = []
+    sliders = plan.sliders()
+    for p in params:
+        targets = [(block_id, p["param_name"]) for block_id in plan.inputs_named(p["param_name"])
+                   if str(block_id) == str(p["block_id"])]
+        if not targets:
+            targets = [(block_id, "default") for block_id, resolved in sliders.items()
+                       if any(name == "variable" and value == p["param_name"] for name, _, _, value in resolved)]
+        if not targets:
+            targets = [(block_id, p["param_name"]) for block_id in plan.inputs_named(p["param_name"])]
+        bound.append(targets)
+    return bound
+
+def sweep(plan, params, max_points=MAX_GRID_POINTS, frame=0):
+    """Evaluate `plan` at every slider position of `params`.
+
+    Each bound slider is one grid axis, shaped to broadcast along its own
+    dimension. Returns (axes, outputs, unbound) with axes as
+    [(param name, values)], or raises ValueError if the grid is too big.
+    """
+    axes, overrides, unbound = [], {}, []
+    bindings = bind_params(plan, params)
+    for p, targets in zip(params, bindings):
+        if targets:
+            axes.append((p, slider_axis(p["min_value"], p["max_value"], p["step_value"]), targets))
+        else:
+            unbound.append(p["param_name"])
+    shape = tuple(len(values) for _, values, _ in axes)
+    points = math.prod(shape)
+    if points > max_points:
+        raise ValueError(f"{points:,} slider positions exceed the {max_points:,} limit")
+    for dim, (_, values, targets) in enumerate(axes):
+        column = values.reshape([-1 if d == dim else 1 for d in range(len(axes))])
+        for target in targets:
+            overrides[target] = column
+    outputs = evaluate(plan, overrides, shape, frame)
+    return [(p["param_name"], values) for p, values, _ in axes], outputs, unbound
+
+# ===== CACHE =====
+
+def sweep_digest(blocks, connections, params):
+    payload = json.dumps({
+        "version": EVALUATOR_VERSION,
+        "blocks": parse_json_list(blocks),
+        "connections": parse_json_list(connections),
+        "params": [[p["block_id"], p["param_name"], float(p["min_value"]), float(p["max_value"]),
+                    float(p["step_value"] or 0)] for p in params],
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def cache_path(cache_dir, course_id, simulator_block_id):
+    return os.path.join(cache_dir, f"course_{course_id}_block_{simulator_block_id}.npz")
+
+def save_sweep(path, digest, simulator_id, axes, outputs):
+    arrays = {f"axis:{i}": values for i, (_, values) in enumerate(axes)}
+    arrays.update({f"out:{block_id}:{name}": values for (block_id, name), values in outputs.items()})
+    meta = {"digest": digest, "simulator_id": simulator_id, "axes": [name for name, _ in axes]}
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+def load_sweep(path):
+    """(meta, {output key: array}) of a cached sweep, or (None, {}) if there is none"""
+    try:
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            return meta, {key[4:]: data[key] for key in data.files if key.startswith("out:")}
+    except (OSError, KeyError, ValueError):
+        return None, {}
+
+def compare_outputs(cached, outputs):
+    """Output keys that differ from the cached sweep (missing, new, or other values)"""
+    fresh = {f"{block_id}:{name}": values for (block_id, name), values in outputs.items()}
+    drift = sorted(set(cached) ^ set(fresh))
+    for key in sorted(set(cached) & set(fresh)):
+        if cached[key].shape != fresh[key].shape or not np.allclose(cached[key], fresh[key], rtol=1e-9,
+                                                                       atol=1e-12, equal_nan=True):
+            drift.append(key)
+    return drift
+
+# ===== DATABASE =====
+
+def _simulator_id(block):
+    data = block.get("data") if isinstance(block.get("data"), dict) else {}
+    return block.get("simulatorId") or data.get("simulatorId")
+
+def fetch_sweep_jobs(connection, course_ids=None):
+    """One job per simulator placed in a course that has sliders configured.
+
+    Returns a list of {course_id, simulator_block_id, simulator_id,
+    params, blocks, connections}; sliders whose course block or simulator
+    no longer exists are left out.
+    """
+    with connection.cursor() as cursor:
+        sql = ("SELECT course_id, simulator_block_id, block_id, param_name, min_value, max_value, step_value "
+               "FROM simulator_interactive_params")
+        if course_ids:
+            sql += " WHERE course_id IN (" + ", ".join(["%s"] * len(course_ids)) + ")"
+        cursor.execute(sql + " ORDER BY course_id, simulator_block_id, id", course_ids or ())
+        groups = {}
+        for row in cursor.fetchall():
+            groups.setdefault((row["course_id"], row["simulator_block_id"]), []).append(row)
+        if not groups:
+            connection.commit()
+            return []
+
+        course_list = sorted({c for c, _ in groups})
+        cursor.execute("SELECT id, blocks FROM courses WHERE id IN (" + ", ".join(["%s"] * len(course_list)) + ")",
+                       course_list)
+        placed = {}
+        for row in cursor.fetchall():
+            for block in parse_json_list(row["blocks"]):
+                if isinstance(block, dict) and _simulator_id(block):
+                    placed[(row["id"], str(block.get("id")))] = int(_simulator_id(block))
+
+        simulator_ids = sorted(set(placed.values()))
+        simulators = {}
+        if simulator_ids:
+            cursor.execute("SELECT id, blocks, connections FROM simulators WHERE id IN ("
+                           + ", ".join(["%s"] * len(simulator_ids)) + ")", simulator_ids)
+            simulators = {row["id"]: row for row in cursor.fetchall()}
+    connection.commit()
+
+    jobs = []
+    for (course_id, block_id), params in groups.items():
+        simulator = simulators.get(placed.get((course_id, str(block_id))))
+        if simulator is None:
+            continue
+        jobs.append({"course_id": course_id, "simulator_block_id": block_id, "simulator_id": simulator["id"],
+                     "params": params, "blocks": simulator["blocks"], "connections": simulator["connections"]})
+    return jobs
+
+def run_sweeps(jobs, cache_dir=DEFAULT_CACHE_DIR, check=False, force=False, max_points=MAX_GRID_POINTS):
+    """Sweep every job, caching results, or with check=True compare against the cache instead.
+
+    Plans are compiled once per simulator and shared by every course that
+    embeds it. Returns a stats dict; stats["drift"] lists jobs whose
+    outputs no longer match their cached sweep.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    plans = {}
+    stats = {"jobs": len(jobs), "evaluated": 0, "cached": 0, "points": 0, "failed": [], "drift": [],
+             "unbound": [], "missing": 0, "stale": 0}
+    for job in jobs:
+        label = f"course {job['course_id']} / simulator {job['simulator_id']}"
+        path = cache_path(cache_dir, job["course_id"], job["simulator_block_id"])
+        digest = sweep_digest(job["blocks"], job["connections"], job["params"])
+        meta, cached = load_sweep(path)
+        if not check and not force and meta and meta.get("digest") == digest:
+            stats["cached"] += 1
+            continue
+        try:
+            if job["simulator_id"] not in plans:
+                plans[job["simulator_id"]] = compile_plan(job["blocks"], job["connections"])
+            axes, outputs, unbound = sweep(plans[job["simulator_id"]], job["params"], max_points)
+        except ValueError as e:
+            stats["failed"].append((label, str(e)))
+            continue
+        stats["evaluated"] += 1
+        stats["points"] += math.prod(len(values) for _, values in axes)
+        stats["unbound"].extend(f"{label}: {name}" for name in unbound)
+        if check:
+            if meta is None:
+                stats["missing"] += 1
+            elif meta.get("digest") != digest:
+                # The graph or its sliders were edited since: not a regression
+                stats["stale"] += 1
+            else:
+                drift = compare_outputs(cached, outputs)
+                if drift:
+                    stats["drift"].append((label, drift))
+        else:
+            save_sweep(path, digest, job["simulator_id"], axes, outputs)
+    return stats
+
+def print_report(stats, elapsed, check):
+    verb = "checked" if check else "evaluated"
+    print(f"\n✅ {stats['evaluated']} sweeps {verb} ({stats['points']:,} slider positions) in {elapsed:.2f}s, "
+          f"{stats['cached']} already cached")
+    for label, error in stats["failed"]:
+        print(f"  ⚠️ {label}: {error}")
+    for entry in stats["unbound"]:
+        print(f"  ⚠️ Slider matches no block input: {entry}")
+    if check:
+        if stats["missing"]:
+            print(f"  ℹ️ {stats['missing']} sweeps have no cached result yet")
+        if stats["stale"]:
+            print(f"  ℹ️ {stats['stale']} sweeps were edited since they were cached (run without --check)")
+        for label, keys in stats["drift"]:
+            print(f"  ❌ {label}: {len(keys)} outputs changed ({', '.join(keys[:5])})")
+        if not stats["drift"]:
+            print("  ✓ Every cached sweep still matches")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate simulators headlessly across every slider position")
+    parser.add_argument("--course-ids", help="comma-separated course ids (default: every course with sliders)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="sweep cache directory (default ./.simulator_cache)")
+    parser.add_argument("--check", action="store_true",
+                        help="re-evaluate and compare with the cached sweeps instead of writing them")
+    parser.add_argument("--force", action="store_true", help="re-evaluate sweeps even when nothing changed")
+    parser.add_argument("--max-points", type=int, default=MAX_GRID_POINTS,
+                        help="skip sweeps with more slider positions than this")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    course_ids = [int(c) for c in args.course_ids.split(",")] if args.course_ids else None
+    try:
+        with get_pool().connection() as connection:
+            jobs = fetch_sweep_jobs(connection, course_ids)
+    except Exception as e:
+        print(f"❌ Could not load simulators: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print(f"🧮 {len(jobs)} simulator sweeps to {'check' if args.check else 'evaluate'}...")
+    started = time.perf_counter()
+    stats = run_sweeps(jobs, args.cache_dir, args.check, args.force, args.max_points)
+    print_report(stats, time.perf_counter() - started, args.check)
+    return 1 if args.check and stats["drift"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulator Preview Thumbnails
+Moves base64 preview images out of simulators rows into simulator_previews, re-encoded as bounded thumbnails in parallel and stored once per content hash
+"""
+
+import argparse
+import base64
+import binascii
+import hashlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import unquote_to_bytes
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+BATCH_SIZE = 50
+# Thumbnails fit in half the 800x600 simulator canvas and in MAX_BYTES
+MAX_SIZE = (400, 300)
+MAX_BYTES = 48 * 1024
+WEBP_QUALITIES = (80, 65, 50)
+# Larger sources are refused before being decoded
+MAX_SOURCE_PIXELS = 40_000_000
+# What server.js expands into /api/simulator-previews/<hash>
+REF_PREFIX = "sha256:"
+# Served back as stored, so only raster types a browser renders inertly (no SVG)
+IMAGE_TYPES = frozenset(("image/png", "image/jpeg", "image/webp", "image/gif"))
+# An unreferenced preview is kept this long, in case a fork is saving a reference it just copied
+GC_GRACE_HOURS = 24
+
+PREVIEWS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS simulator_previews (
+        hash CHAR(64) PRIMARY KEY,
+        mime_type VARCHAR(32) NOT NULL,
+        width INT NULL,
+        height INT NULL,
+        byte_size INT NOT NULL,
+        data MEDIUMBLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+def ensure_previews_table(cursor):
+    cursor.execute(PREVIEWS_TABLE_SQL)
+
+# ===== IMAGES =====
+
+def parse_data_url(value):
+    """(mime type, bytes) of a data: URL; ValueError if it is not one"""
+    header, sep, payload = (value or "").partition(",")
+    if not sep or not header.lower().startswith("data:"):
+        raise ValueError("not a data URL")
+    params = [p.strip().lower() for p in header[5:].split(";")]
+    mime = params[0] or "text/plain"
+    if "base64" not in params[1:]:
+        return mime, unquote_to_bytes(payload)
+    payload = "".join(payload.split())
+    try:
+        return mime, base64.b64decode(payload + "=" * (-len(payload) % 4), validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"bad base64: {e}") from None
+
+# Leading bytes of each servable type, for checking uploads when Pillow is not there to decode them
+_MAGIC = ((b"\x89PNG\r\n\x1a\n", "image/png"), (b"\xff\xd8\xff", "image/jpeg"), (b"GIF87a", "image/gif"),
+          (b"GIF89a", "image/gif"))
+
+def sniff_type(data):
+    """The image type the bytes actually are (not what the data URL claims), or None"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return next((mime for magic, mime in _MAGIC if data.startswith(magic)), None)
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+
+def make_thumbnail(mime, data):
+    """(bytes, mime type, width, height) of the thumbnail for one decoded preview.
+
+    The image is shrunk to fit MAX_SIZE and saved as WebP, lowering the
+    quality and then the size until it fits MAX_BYTES. An original that
+    already fits both bounds is kept when the re-encode is not smaller.
+    Without Pillow, originals of a servable type are stored as they are.
+    """
+    if Image is None:
+        if sniff_type(data) is None:
+            raise ValueError(f"not a PNG, JPEG, GIF or WebP image (declared {mime})")
+        return data, sniff_type(data), None, None
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.UnidentifiedImageError:
+        raise ValueError(f"not a readable image (declared {mime})") from None
+    with image:
+        width, height = image.size
+        if width * height > MAX_SOURCE_PIXELS:
+            raise ValueError(f"{width}x{height} source is too large")
+        image.load()  # Image.open only reads the header; truncated data fails here
+        source_type = (Image.MIME.get(image.format) or "").lower()
+        frame = image.convert("RGBA" if _has_alpha(image) else "RGB")
+    bounds = MAX_SIZE
+    while True:
+        thumb = frame.copy()
+        thumb.thumbnail(bounds, Image.Resampling.LANCZOS)
+        for quality in WEBP_QUALITIES:
+            out = io.BytesIO()
+            thumb.save(out, "WEBP", quality=quality, method=6)
+            if out.tell() <= MAX_BYTES:
+                break
+        if out.tell() <= MAX_BYTES or min(bounds) <= 16:
+            break
+        bounds = (bounds[0] // 2, bounds[1] // 2)
+    encoded = out.getvalue()
+    if (source_type in IMAGE_TYPES and width <= MAX_SIZE[0] and height <= MAX_SIZE[1]
+            and len(data) <= min(len(encoded), MAX_BYTES)):
+        return data, source_type, width, height
+    return encoded, "image/webp", thumb.width, thumb.height
+
+_IMAGE_ERRORS = (ValueError, OSError) + ((Image.DecompressionBombError,) if Image is not None else ())
+
+def thumbnail_preview(item):
+    """Worker entry point: (simulator id, preview) -> (simulator id, (hash, mime, width, height, bytes) or None, error)"""
+    simulator_id, value = item
+    try:
+        data, mime, width, height = make_thumbnail(*parse_data_url(value))
+    except _IMAGE_ERRORS as e:
+        return simulator_id, None, str(e) or type(e).__name__
+    return simulator_id, (hashlib.sha256(data).hexdigest(), mime, width, height, data), None
+
+# ===== DATABASE =====
+
+def iter_preview_batches(connection, simulator_ids=None, batch_size=BATCH_SIZE):
+    """Yield batches of (id, preview_image, updated_at) still holding a data: URL, one keyset page per query"""
+    last_id = 0
+    while True:
+        sql = "SELECT id, preview_image, updated_at FROM simulators WHERE id > %s AND preview_image LIKE 'data:%%'"
+        args = [last_id]
+        if simulator_ids:
+            sql += " AND id IN (" + ", ".join(["%s"] * len(simulator_ids)) + ")"
+            args.extend(simulator_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(sql + " ORDER BY id LIMIT %s", args + [batch_size])
+            rows = cursor.fetchall()
+        connection.commit()
+        if not rows:
+            return
+        last_id = rows[-1]["id"]
+        yield rows
+        if len(rows) < batch_size:
+            return
+
+def stored_hashes(cursor, hashes):
+    hashes = list(hashes)
+    cursor.execute("SELECT hash FROM simulator_previews WHERE hash IN (" + ", ".join(["%s"] * len(hashes)) + ")", hashes)
+    return {row["hash"] for row in cursor.fetchall()}
+
+def write_back(connection, moves):
+    """Store one batch of thumbnails and point their rows at them, in a single transaction.
+
+    `moves` are (simulator id, thumbnail, updated_at, preview length).
+    Only thumbnails not stored yet are sent. A row is only rewritten if
+    its updated_at and preview length still match what was read, so a
+    preview saved while the batch converted is kept; its thumbnail is
+    left for collect_garbage. Returns (ids written, hashes newly stored).
+    """
+    thumbs = {thumb[0]: thumb for _, thumb, _, _ in moves}
+    connection.begin()
+    try:
+        with connection.cursor() as cursor:
+            stored = stored_hashes(cursor, thumbs)
+            new = [thumb for digest, thumb in thumbs.items() if digest not in stored]
+            if new:
+                cursor.executemany(
+                    "INSERT IGNORE INTO simulator_previews (hash, mime_type, width, height, byte_size, data) "
+                    "VALUES (%s, %s, %s, %s, %s, %s)",
+                    [(digest, mime, width, height, len(data), data) for digest, mime, width, height, data in new])
+            written = []
+            for simulator_id, thumb, updated_at, length in moves:
+                # Not a user edit: updated_at is kept so caches keyed on it stay valid
+                cursor.execute("UPDATE simulators SET preview_image = %s, updated_at = updated_at "
+                               "WHERE id = %s AND updated_at = %s AND LENGTH(preview_image) = %s",
+                               (REF_PREFIX + thumb[0], simulator_id, updated_at, length))
+                if cursor.rowcount == 1:
+                    written.append(simulator_id)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return written, {thumb[0] for thumb in new}
+
+def move_previews(connection, workers=None, simulator_ids=None, batch_size=BATCH_SIZE, dry_run=False):
+    """Convert every data: URL preview (or those of `simulator_ids`) on a pool of worker processes.
+
+    Returns per-simulator results: bytes in the row before and after, the
+    thumbnail and whether this run stored it, or the conversion error.
+    """
+    with connection.cursor() as cursor:
+        # DDL commits implicitly, so do it before any write transaction
+        ensure_previews_table(cursor)
+    connection.commit()
+
+    results, seen = [], set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in iter_preview_batches(connection, simulator_ids, batch_size):
+            by_id = {row["id"]: row for row in rows}
+            moves, batch = [], []
+            for simulator_id, thumb, error in executor.map(
+                    thumbnail_preview, [(row["id"], row["preview_image"]) for row in rows]):
+                length = len(by_id[simulator_id]["preview_image"].encode("utf-8"))
+                result = {"simulator_id": simulator_id, "before": length, "after": length, "error": error,
+                          "hash": None, "mime": None, "size": None, "bytes": 0, "new": False, "written": False}
+                if thumb is not None and len(REF_PREFIX) + len(thumb[0]) >= length:
+                    result["error"] = "already shorter than a reference"
+                elif thumb is not None:
+                    digest, mime, width, height, data = thumb
+                    result.update(hash=digest, mime=mime, size=(width, height), bytes=len(data),
+                                  after=len(REF_PREFIX) + len(digest))
+                    moves.append((simulator_id, thumb, by_id[simulator_id]["updated_at"], length))
+                batch.append(result)
+            if moves and not dry_run:
+                written, new = write_back(connection, moves)
+            elif moves:
+                with connection.cursor() as cursor:
+                    new = {m[1][0] for m in moves} - stored_hashes(cursor, {m[1][0] for m in moves})
+                connection.commit()
+                written = [m[0] for m in moves]
+            written = set(written) if moves else set()
+            for result in batch:
+                result["written"] = result["simulator_id"] in written
+                # Counted once: later rows with the same image share it
+                result["new"] = result["written"] and result["hash"] in new and result["hash"] not in seen
+                if result["written"]:
+                    seen.add(result["hash"])
+            results.extend(batch)
+    return results
+
+def collect_garbage(connection, grace_hours=GC_GRACE_HOURS, dry_run=False):
+    """Delete previews no simulator points at any more and older than `grace_hours`; returns (count, bytes)"""
+    cutoff = datetime.now() - timedelta(hours=grace_hours)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT hash, byte_size FROM simulator_previews WHERE created_at < %s", (cutoff,))
+        candidates = {row["hash"]: row["byte_size"] for row in cursor.fetchall()}
+        cursor.execute("SELECT preview_image FROM simulators WHERE preview_image LIKE 'sha256:%%'")
+        referenced = {row["preview_image"][len(REF_PREFIX):] for row in cursor.fetchall()}
+    connection.commit()
+    orphans = [digest for digest in candidates if digest not in referenced]
+    if orphans and not dry_run:
+        with connection.cursor() as cursor:
+            for start in range(0, len(orphans), 500):
+                chunk = orphans[start:start + 500]
+                cursor.execute("DELETE FROM simulator_previews WHERE hash IN ("
+                               + ", ".join(["%s"] * len(chunk)) + ")", chunk)
+        connection.commit()
+    return len(orphans), sum(candidates[digest] for digest in orphans)
+
+def print_report(results, removed=None, dry_run=False):
+    print("\n📊 Per-simulator previews:")
+    for r in results:
+        if r["error"]:
+            print(f"  ❌ [{r['simulator_id']}] {r['before']:,} bytes left in the row: {r['error']}")
+            continue
+        if not r["written"]:
+            print(f"  ✗ [{r['simulator_id']}] changed while converting, skipped")
+            continue
+        width, height = r["size"]
+        size = f" {width}x{height}" if width else ""
+        print(f"  ✓ [{r['simulator_id']}] {r['before']:,} -> {r['after']} bytes in the row, "
+              f"{r['bytes']:,}-byte {r['mime']}{size} ({'new' if r['new'] else 'shared'})")
+    moved = [r for r in results if r["written"]]
+    before = sum(r["before"] for r in moved)
+    after = sum(r["after"] for r in moved)
+    stored = sum(r["bytes"] for r in moved if r["new"])
+    verb = "would move" if dry_run else "moved"
+    print(f"\n{len(moved)} of {len(results)} previews {verb}: {before - after:,} bytes out of simulators rows, "
+          f"{stored:,} bytes of thumbnails for {sum(1 for r in moved if r['new'])} new images "
+          f"({sum(1 for r in moved if not r['new'])} shared an image already stored)")
+    if removed is not None:
+        count, size = removed
+        print(f"🧹 {count} unreferenced previews ({size:,} bytes) {'would be ' if dry_run else ''}removed")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Move simulator preview images out of the simulators table")
+    parser.add_argument("--simulator-ids", help="comma-separated simulator ids (default: every simulator)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="encoder processes (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="previews read and written per transaction")
+    parser.add_argument("--gc-grace-hours", type=float, default=GC_GRACE_HOURS,
+                        help="keep unreferenced previews this long before deleting them")
+    parser.add_argument("--no-gc", action="store_true", help="do not delete unreferenced previews")
+    parser.add_argument("--dry-run", action="store_true", help="report what would move, write nothing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    if Image is None:
+        print("ℹ️ Pillow is not installed (pip install Pillow); previews are moved as uploaded, without resizing")
+    simulator_ids = [int(i) for i in args.simulator_ids.split(",") if i.strip()] if args.simulator_ids else None
+    print(f"🖼️ Moving simulator previews with {args.workers} workers{' (dry run)' if args.dry_run else ''}...")
+    started = time.perf_counter()
+    removed = None
+    try:
+        with get_pool().connection() as connection:
+            results = move_previews(connection, args.workers, simulator_ids, args.batch_size, args.dry_run)
+            if not args.no_gc and not simulator_ids:
+                removed = collect_garbage(connection, args.gc_grace_hours, args.dry_run)
+    except Exception as e:
+        print(f"❌ Preview move failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print_report(results, removed, args.dry_run)
+    print(f"\n✅ Done in {time.perf_counter() - started:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulator Version History
+Compacts simulator_versions into full keyframes plus JSON-patch deltas against them, so any version rebuilds from at most two rows
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from aiven_db import AIVEN_CONFIG, get_pool, close_pool
+from compact_simulator_json import parse_blob
+
+# A new keyframe at least every KEYFRAME_INTERVAL versions, so deltas stay small
+KEYFRAME_INTERVAL = 10
+# Store a version in full when its delta would be more than this share of the full size
+MAX_DELTA_RATIO = 0.5
+ER_BAD_FIELD_ERROR = 1054
+
+# Added by server.js at startup too; storage is 'full' or 'delta', delta rows rebuild from base_version
+DELTA_COLUMNS = (
+    ("storage", "VARCHAR(8) NOT NULL DEFAULT 'full'"),
+    ("base_version", "INT NULL"),
+    ("delta", "LONGTEXT NULL"),
+)
+
+# ===== JSON PATCH =====
+# The add / remove / replace subset of RFC 6902, with RFC 6901 pointers.
+# server.js applies the same ops (applyJsonPatch) when it serves a version.
+
+def _escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+def _dump(value):
+    """Minified JSON that keeps every value as stored: 64.0 stays 64.0 so rebuilt versions match byte for byte"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+def _same(a, b):
+    # 1 == 1.0 == True in Python but they serialize differently
+    return type(a) is type(b) and a == b
+
+def diff(old, new, path=""):
+    """JSON-patch ops turning `old` into `new`, keeping key order exact.
+
+    Dicts recurse per key. New keys are appended, as JSON.parse would
+    order them, so a dict whose key order changed is replaced whole.
+    Lists drop their common prefix and suffix; the middle recurses pairwise
+    and the length difference becomes adds or removes.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        rebuilt = [k for k in old if k in new] + [k for k in new if k not in old]
+        if rebuilt != list(new):
+            return [{"op": "replace", "path": path, "value": new}]
+        ops = [{"op": "remove", "path": f"{path}/{_escape(k)}"} for k in old if k not in new]
+        for k in new:
+            if k in old:
+                ops.extend(diff(old[k], new[k], f"{path}/{_escape(k)}"))
+            else:
+                ops.append({"op": "add", "path": f"{path}/{_escape(k)}", "value": new[k]})
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        start = 0
+        while start < len(old) and start < len(new) and _deep_equal(old[start], new[start]):
+            start += 1
+        end_old, end_new = len(old), len(new)
+        while end_old > start and end_new > start and _deep_equal(old[end_old - 1], new[end_new - 1]):
+            end_old -= 1
+            end_new -= 1
+        common = min(end_old - start, end_new - start)
+        ops = []
+        for i in range(start, start + common):
+            ops.extend(diff(old[i], new[i], f"{path}/{i}"))
+        for i in range(start + common, end_new):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+        ops.extend({"op": "remove", "path": f"{path}/{start + common}"} for _ in range(end_old - start - common))
+        return ops
+    return [] if _same(old, new) else [{"op": "replace", "path": path, "value": new}]
+
+def _deep_equal(a, b):
+    return _dump(a) == _dump(b) if isinstance(a, (dict, list)) else _same(a, b)
+
+def apply_patch(document, ops):
+    """Apply JSON-patch ops; `document` is modified in place and the (possibly new) root returned"""
+    for op in ops:
+        if op["path"] == "":
+            document = op["value"]
+            continue
+        *parents, last = [_unescape(t) for t in op["path"].split("/")[1:]]
+        target = document
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        if isinstance(target, list):
+            index = len(target) if last == "-" else int(last)
+            if op["op"] == "add":
+                target.insert(index, op["value"])
+            elif op["op"] == "remove":
+                del target[index]
+            else:
+                target[index] = op["value"]
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = op["value"]
+    return document
+
+# ===== HISTORY =====
+
+def version_state(row):
+    """(blocks, connections) of a full row; connections defaults to [] like the API"""
+    blocks = parse_blob(row["blocks"])
+    connections = parse_blob(row["connections"]) if row.get("connections") else []
+    return blocks, connections
+
+def rebuild(row, base_row=None):
+    """(blocks, connections) of any row: a keyframe directly, a delta from its keyframe"""
+    if row.get("storage", "full") != "delta":
+        return version_state(row)
+    blocks, connections = version_state(base_row)
+    patch = json.loads(row["delta"])
+    return apply_patch(blocks, patch["blocks"]), apply_patch(connections, patch["connections"])
+
+def plan_history(versions, interval=KEYFRAME_INTERVAL, max_ratio=MAX_DELTA_RATIO):
+    """Storage for one simulator's history.
+
+    `versions` are (version_number, blocks, connections, full size in
+    bytes) in version order. Returns {version_number: None for a keyframe,
+    or (base version, delta JSON) for a delta}. Every delta is taken
+    against its keyframe rather than the previous version, so reading
+    one version costs one keyframe plus one patch however long the
+    history is. A version becomes a keyframe when `interval` versions
+    have passed since the last one or when its delta would not be much
+    smaller than the full copy.
+    """
+    plan, keyframe = {}, None
+    for number, blocks, connections, size in versions:
+        if keyframe is not None and number - keyframe[0] < interval:
+            delta = _dump({"blocks": diff(keyframe[1], blocks), "connections": diff(keyframe[2], connections)})
+            if len(delta.encode("utf-8")) <= max_ratio * size:
+                plan[number] = (keyframe[0], delta)
+                continue
+        plan[number] = None
+        keyframe = (number, blocks, connections)
+    return plan
+
+# ===== DATABASE =====
+
+def ensure_delta_columns(connection):
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("SELECT storage, base_version, delta FROM simulator_versions LIMIT 0")
+            cursor.fetchall()
+        except Exception as e:
+            if getattr(e, "args", (None,))[0] != ER_BAD_FIELD_ERROR:
+                raise
+            connection.rollback()
+            # DDL commits implicitly, so do it before any write transaction
+            for column, definition in DELTA_COLUMNS:
+                try:
+                    cursor.execute(f"ALTER TABLE simulator_versions ADD COLUMN {column} {definition}")
+                except Exception as e:
+                    if getattr(e, "args", (None,))[0] != 1060:  # ER_DUP_FIELDNAME: added already
+                        raise
+    connection.commit()
+
+VERSION_COLUMNS = "id, version_number, blocks, connections, storage, base_version, delta"
+
+def load_version(connection, simulator_id, version_number):
+    """(blocks, connections) of one version in a single round trip: the row joined to its keyframe"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT v.version_number, v.blocks, v.connections, v.storage, v.delta, "
+            "k.blocks AS base_blocks, k.connections AS base_connections "
+            "FROM simulator_versions v LEFT JOIN simulator_versions k "
+            "ON k.simulator_id = v.simulator_id AND k.version_number = v.base_version "
+            "WHERE v.simulator_id = %s AND v.version_number = %s",
+            (simulator_id, version_number))
+        row = cursor.fetchone()
+    connection.commit()
+    if row is None:
+        return None
+    return rebuild(row, {"blocks": row["base_blocks"], "connections": row["base_connections"]})
+
+def fetch_history(cursor, simulator_id):
+    cursor.execute(f"SELECT {VERSION_COLUMNS} FROM simulator_versions WHERE simulator_id = %s "
+                   "ORDER BY version_number, id", (simulator_id,))
+    return cursor.fetchall()
+
+def materialize(rows):
+    """{version_number: (blocks, connections)} of every row, deltas rebuilt from their keyframes"""
+    by_number = {row["version_number"]: row for row in rows}
+    return {row["version_number"]: rebuild(row, by_number.get(row["base_version"])) for row in rows}
+
+def stored_bytes(row):
+    return sum(len((row.get(c) or "").encode("utf-8")) for c in ("blocks", "connections", "delta"))
+
+def compact_simulator(connection, simulator_id, interval=KEYFRAME_INTERVAL, max_ratio=MAX_DELTA_RATIO,
+                      dry_run=False):
+    """Re-plan one simulator's history and rewrite only the rows whose storage changes.
+
+    Runs in one transaction. Every version is rebuilt from the stored
+    rows first; after writing, the rows are read back and every version
+    must rebuild to the same JSON, or the transaction is rolled back.
+    Duplicate version numbers (two concurrent saves) are left as they are.
+    Returns (bytes before, bytes after, rows rewritten).
+    """
+    connection.begin()
+    try:
+        with connection.cursor() as cursor:
+            rows = fetch_history(cursor, simulator_id)
+            numbers = [row["version_number"] for row in rows]
+            before = sum(stored_bytes(row) for row in rows)
+            if len(set(numbers)) != len(numbers) or len(rows) < 2:
+                connection.rollback()
+                return before, before, 0
+            states = materialize(rows)
+            expected = {n: _dump(list(state)) for n, state in states.items()}
+
+            full_text = {}
+            for row in rows:
+                if row["storage"] == "delta":
+                    blocks, connections = states[row["version_number"]]
+                    full_text[row["version_number"]] = (_dump(blocks), _dump(connections))
+                else:
+                    full_text[row["version_number"]] = (row["blocks"], row["connections"])
+            plan = plan_history(
+                [(n, *states[n], sum(len((t or "").encode("utf-8")) for t in full_text[n])) for n in numbers],
+                interval, max_ratio)
+
+            updates = []
+            for row in rows:
+                n = row["version_number"]
+                if plan[n] is None and row["storage"] != "delta":
+                    continue  # keyframe already stored in full: its text is left byte for byte
+                if plan[n] is None:
+                    blocks, connections = full_text[n]
+                    updates.append((blocks, connections, "full", None, None, row["id"]))
+                elif (row["storage"], row["base_version"], row["delta"]) != ("delta", *plan[n]):
+                    updates.append(("", None, "delta", plan[n][0], plan[n][1], row["id"]))
+            if updates and not dry_run:
+                # Keyframes first: a delta row never points at a row that is still a delta
+                updates.sort(key=lambda u: u[2] != "full")
+                for update in updates:
+                    cursor.execute("UPDATE simulator_versions SET blocks = %s, connections = %s, storage = %s, "
+                                   "base_version = %s, delta = %s WHERE id = %s", update)
+                rows = fetch_history(cursor, simulator_id)
+                rebuilt = {n: _dump(list(state)) for n, state in materialize(rows).items()}
+                if rebuilt != expected:
+                    raise RuntimeError(f"simulator {simulator_id}: rebuilt history differs, nothing written")
+            after = sum(stored_bytes(row) for row in rows) if not dry_run else _planned_bytes(rows, plan, full_text)
+        if dry_run:
+            connection.rollback()
+        else:
+            connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return before, after, len(updates)
+
+def _planned_bytes(rows, plan, full_text):
+    total = 0
+    for row in rows:
+        n = row["version_number"]
+        if plan[n] is not None:
+            total += len(plan[n][1].encode("utf-8"))
+        elif row["storage"] == "delta":
+            total += sum(len((t or "").encode("utf-8")) for t in full_text[n])
+        else:
+            total += stored_bytes(row)
+    return total
+
+def compact_histories(connection, simulator_ids=None, interval=KEYFRAME_INTERVAL, max_ratio=MAX_DELTA_RATIO,
+                      dry_run=False):
+    """Compact every simulator with at least two versions; returns per-simulator results"""
+    ensure_delta_columns(connection)
+    with connection.cursor() as cursor:
+        sql = "SELECT simulator_id, COUNT(*) AS versions FROM simulator_versions"
+        if simulator_ids:
+            sql += " WHERE simulator_id IN (" + ", ".join(["%s"] * len(simulator_ids)) + ")"
+        cursor.execute(sql + " GROUP BY simulator_id HAVING COUNT(*) > 1 ORDER BY simulator_id", simulator_ids or ())
+        targets = cursor.fetchall()
+    connection.commit()
+
+    results = []
+    for target in targets:
+        before, after, rewritten = compact_simulator(connection, target["simulator_id"], interval, max_ratio, dry_run)
+        results.append({"simulator_id": target["simulator_id"], "versions": target["versions"],
+                        "before": before, "after": after, "rewritten": rewritten})
+    return results
+
+def print_report(results, dry_run=False):
+    print("\n📊 Per-simulator history:")
+    for r in results:
+        saved = r["before"] - r["after"]
+        pct = 100.0 * saved / r["before"] if r["before"] else 0.0
+        verb = "would rewrite" if dry_run else "rewrote"
+        print(f"  [{r['simulator_id']}] {r['versions']} versions: {r['before']:,} -> {r['after']:,} bytes "
+              f"({saved:,} saved, {pct:.1f}%), {verb} {r['rewritten']} rows")
+    before = sum(r["before"] for r in results)
+    after = sum(r["after"] for r in results)
+    print(f"\n{len(results)} histories, {before - after:,} of {before:,} bytes saved "
+          f"({100.0 * (before - after) / before if before else 0.0:.1f}%)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Store simulator version history as keyframes plus deltas")
+    parser.add_argument("--simulator-ids", help="comma-separated simulator ids (default: every simulator)")
+    parser.add_argument("--interval", type=int, default=KEYFRAME_INTERVAL,
+                        help="a full keyframe at least every N versions")
+    parser.add_argument("--max-delta-ratio", type=float, default=MAX_DELTA_RATIO,
+                        help="store in full when the delta is larger than this share of the version")
+    parser.add_argument("--dry-run", action="store_true", help="report the savings, write nothing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not AIVEN_CONFIG["password"]:
+        print("❌ ERROR: Set AIVEN_PASSWORD environment variable!")
+        return 1
+
+    simulator_ids = [int(s) for s in args.simulator_ids.split(",")] if args.simulator_ids else None
+    print(f"🗜️ Compacting simulator version history (keyframe every {args.interval})"
+          f"{' (dry run)' if args.dry_run else ''}...")
+    started = time.perf_counter()
+    try:
+        with get_pool().connection() as connection:
+            results = compact_histories(connection, simulator_ids, args.interval, args.max_delta_ratio, args.dry_run)
+    except Exception as e:
+        print(f"❌ Compaction failed: {e}")
+        return 1
+    finally:
+        close_pool()
+
+    print_report(results, args.dry_run)
+    print(f"\n✅ Done in {time.perf_counter() - started:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -257,6 +257,19 @@ const initializeDatabase = async () => {
         `);
         console.log('✓ Simulators table ready');
 
+        // Preview images moved out of simulators rows (simulator_previews.py), keyed by their sha256
+        await query(`
+            CREATE TABLE IF NOT EXISTS simulator_previews (
+                hash CHAR(64) PRIMARY KEY,
+                mime_type VARCHAR(32) NOT NULL,
+                width INT NULL,
+                height INT NULL,
+                byte_size INT NOT NULL,
+                data MEDIUMBLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        `);
+
         // Dependents on Users & Courses
         await query(`
             CREATE TABLE IF NOT EXISTS admin_favorites (
@@ -350,6 +363,10 @@ const initializeDatabase = async () => {
                 INDEX idx_simulator (simulator_id)
             )
         `);
+        // Delta storage (simulator_version_history.py): 'delta' rows rebuild from the base_version keyframe
+        await addColumn('simulator_versions', 'storage', "VARCHAR(8) NOT NULL DEFAULT 'full'");
+        await addColumn('simulator_versions', 'base_version', 'INT NULL');
+        await addColumn('simulator_versions', 'delta', 'LONGTEXT NULL');
         console.log('✓ Simulator dependent tables ready');
 
         // Integration tables
@@ -1014,6 +1031,119 @@ app.get('/api/courses/:id', authenticateToken, (req, res) => {
     });
 });
 
+// Precompiled course bundles (build_course_artifacts.py): course row, parsed blocks, questions
+// without answers, simulators and params in one precompressed, content-hashed file
+const COURSE_ARTIFACT_DIR = process.env.COURSE_ARTIFACT_DIR || path.join(__dirname, '..', 'dist', 'courses');
+let courseArtifactManifest = { mtimeMs: 0, courses: {} };
+
+const loadCourseArtifactManifest = () => {
+    const manifestPath = path.join(COURSE_ARTIFACT_DIR, 'manifest.json');
+    try {
+        const { mtimeMs } = fs.statSync(manifestPath);
+        if (mtimeMs !== courseArtifactManifest.mtimeMs) {
+            const parsed = JSON.parse(fs.readFileSync(manifestPath, 'utf8'));
+            courseArtifactManifest = { mtimeMs, courses: parsed.courses || {} };
+        }
+    } catch (e) {
+        courseArtifactManifest = { mtimeMs: 0, courses: {} };
+    }
+    return courseArtifactManifest.courses;
+};
+
+app.get('/api/courses/:id/bundle', authenticateToken, (req, res) => {
+    const entry = loadCourseArtifactManifest()[String(parseInt(req.params.id))];
+    if (!entry) {
+        // Not approved, or not built yet: the client falls back to GET /api/courses/:id
+        return apiResponse(res, 404, 'No precompiled bundle for this course');
+    }
+
+    const etag = `"${entry.hash}"`;
+    res.setHeader('ETag', etag);
+    res.setHeader('Vary', 'Accept-Encoding');
+    res.setHeader('Cache-Control', 'private, no-cache');
+    if (req.headers['if-none-match'] === etag) {
+        return res.status(304).end();
+    }
+
+    const encoding = req.acceptsEncodings(Object.keys(entry.files).filter(e => e !== 'identity').concat('identity')) || 'identity';
+    const file = path.join(COURSE_ARTIFACT_DIR, entry.files[encoding] || entry.files.identity);
+    res.setHeader('Content-Type', 'application/json; charset=utf-8');
+    if (encoding !== 'identity' && entry.files[encoding]) {
+        res.setHeader('Content-Encoding', encoding);
+    }
+    fs.createReadStream(file)
+        .on('error', (err) => {
+            console.error('Error reading course bundle:', err.message);
+            if (!res.headersSent) {
+                res.removeHeader('Content-Encoding');
+                apiResponse(res, 404, 'No precompiled bundle for this course');
+            } else {
+                res.end();
+            }
+        })
+        .pipe(res);
+});
+
+// Course sections (course_sections.py): the content cut at its <h2> headings, with the quiz
+// placeholders placed in their modules, so the viewer only downloads the section being read
+const withViewableCourse = (req, res, next) => {
+    db.query('SELECT creator_id, status FROM courses WHERE id = ?', [req.params.id], (err, results) => {
+        if (err) {
+            console.error('Error fetching course:', err);
+            return apiResponse(res, 500, 'Server error');
+        }
+        if (results.length === 0) {
+            return apiResponse(res, 404, 'Course not found');
+        }
+        const course = results[0];
+        if (course.status !== 'approved' && parseInt(course.creator_id) !== parseInt(req.user.id)
+            && !['admin', 'superadmin'].includes(req.user.role)) {
+            return apiResponse(res, 403, 'Access denied. You do not have permission to view this course');
+        }
+        next();
+    });
+};
+
+app.get('/api/courses/:id/sections', authenticateToken, withViewableCourse, (req, res) => {
+    const query = `
+        SELECT section_index, kind, title, module_number, question_count, byte_offset, byte_length, content_hash
+        FROM course_sections
+        WHERE course_id = ?
+        ORDER BY section_index
+    `;
+    db.query(query, [req.params.id], (err, sections) => {
+        if (err && err.code === 'ER_NO_SUCH_TABLE') {
+            // Never built: the client falls back to the full content
+            return apiResponse(res, 200, 'No sections for this course', []);
+        }
+        if (err) {
+            console.error('Error fetching course sections:', err);
+            return apiResponse(res, 500, 'Server error fetching course sections');
+        }
+        apiResponse(res, 200, 'Course sections fetched successfully', sections);
+    });
+});
+
+app.get('/api/courses/:id/sections/:index', authenticateToken, withViewableCourse, (req, res) => {
+    const query = 'SELECT section_index, title, content_hash, html FROM course_sections WHERE course_id = ? AND section_index = ?';
+    db.query(query, [req.params.id, parseInt(req.params.index)], (err, results) => {
+        if (err && err.code !== 'ER_NO_SUCH_TABLE') {
+            console.error('Error fetching course section:', err);
+            return apiResponse(res, 500, 'Server error fetching course section');
+        }
+        if (err || results.length === 0) {
+            return apiResponse(res, 404, 'Section not found');
+        }
+        const etag = `"${results[0].content_hash}"`;
+        res.setHeader('ETag', etag);
+        res.setHeader('Cache-Control', 'private, no-cache');
+        if (req.headers['if-none-match'] === etag) {
+            return res.status(304).end();
+        }
+        apiResponse(res, 200, 'Course section fetched successfully', results[0]);
+    });
+});
+
 // Update course
 app.put('/api/courses/:id', authenticateToken, (req, res) => {
     const courseId = req.params.id;
@@ -1090,6 +1220,13 @@ app.put('/api/courses/:id', authenticateToken, (req, res) => {
             }
             console.log('✅ Course updated - ID:', courseId, 'Status:', status || 'unchanged');
 
+            // Sections (course_sections.py) are cut from the old content; drop them so viewers fall back to it
+            if ((content || '') !== (course.content || '')) {
+                db.query('DELETE FROM course_sections WHERE course_id = ?', [courseId], (secErr) => {
+                    if (secErr && secErr.code !== 'ER_NO_SUCH_TABLE') console.error('Error clearing course sections:', secErr.message);
+                });
+            }
+
             // Auto-grant volunteer hours from tracked creation time
             if (creation_time !== undefined) {
                 const newSeconds = parseInt(creation_time) || 0;
@@ -1148,16 +1285,21 @@ app.delete('/api/courses/:id', authenticateToken, (req, res) => {
 
 app.get('/api/courses', authenticateToken, (req, res) => {
     const userId = req.user.id;
-    // Show approved courses from everyone + own courses (even if pending)
+    // Show approved courses from everyone + own courses (even if pending).
+    // With ?content=own only the user's own courses carry their content (the editor needs it);
+    // clients that load other courses by section, or from GET /api/courses/:id, opt in to skip
+    // downloading every course body. Without it every course keeps its content as before.
+    const ownContentOnly = req.query.content === 'own';
+    const contentColumn = ownContentOnly ? 'CASE WHEN c.creator_id = ? THEN c.content END AS content' : 'c.content';
     const query = `
-SELECT c.id, c.title, c.description, c.content, c.blocks, c.creator_id, c.status, c.is_paid, c.shells_cost, c.creation_time, u.email as creator_email
+SELECT c.id, c.title, c.description, ${contentColumn}, c.blocks, c.creator_id, c.status, c.is_paid, c.shells_cost, c.creation_time, u.email as creator_email
 FROM courses c
 LEFT JOIN users u ON c.creator_id = u.id
 WHERE c.status = 'approved' OR c.creator_id = ?
 ORDER BY c.created_at DESC
 `;
 
-    db.query(query, [userId], (err, results) => {
+    db.query(query, ownContentOnly ? [userId, userId] : [userId], (err, results) => {
         if (err) {
             console.error('Error fetching courses:', err);
             return apiResponse(res, 500, 'Server error fetching courses');
@@ -1478,6 +1620,47 @@ app.post('/api/courses/:id/complete', authenticateToken, (req, res) => {
 
 // ===== SIMULATOR MARKETPLACE ROUTES =====
 
+// simulator_previews.py leaves 'sha256:<hash>' in simulators.preview_image; clients get a URL for it
+const PREVIEW_REF_RE = /^sha256:([0-9a-f]{64})$/;
+const PREVIEW_URL_RE = /\/api\/simulator-previews\/([0-9a-f]{64})$/;
+
+const previewUrl = (req, value) => {
+    const match = PREVIEW_REF_RE.exec(value || '');
+    return match ? `${req.protocol}://${req.get('host')}/api/simulator-previews/${match[1]}` : value;
+};
+
+// A fork sends back the URL it was given; store the short reference again
+const previewRef = (value) => {
+    const match = PREVIEW_URL_RE.exec(value || '');
+    return match ? `sha256:${match[1]}` : value;
+};
+
+// Public like the image itself: the hash is only known to whoever could read the simulator row
+app.get('/api/simulator-previews/:hash', (req, res) => {
+    const hash = String(req.params.hash).toLowerCase();
+    if (!/^[0-9a-f]{64}$/.test(hash)) {
+        return apiResponse(res, 404, 'Preview not found');
+    }
+    const etag = `"${hash}"`;
+    if (req.headers['if-none-match'] === etag) {
+        return res.status(304).end();
+    }
+    db.query('SELECT mime_type, data FROM simulator_previews WHERE hash = ?', [hash], (err, results) => {
+        if (err && err.code !== 'ER_NO_SUCH_TABLE') {
+            console.error('Error fetching preview:', err);
+            return apiResponse(res, 500, 'Error fetching preview');
+        }
+        if (err || results.length === 0) {
+            return apiResponse(res, 404, 'Preview not found');
+        }
+        res.setHeader('Content-Type', results[0].mime_type);
+        res.setHeader('X-Content-Type-Options', 'nosniff');
+        res.setHeader('ETag', etag);
+        res.setHeader('Cache-Control', 'public, max-age=31536000, immutable');
+        res.end(results[0].data);
+    });
+});
+
 // Get all public simulators (paginated)
 app.get('/api/simulators', (req, res) => {
     const page = parseInt(req.query.page) || 1;
@@ -1528,6 +1711,7 @@ app.get('/api/simulators', (req, res) => {
             console.error('Error fetching simulators:', err);
             return apiResponse(res, 500, 'Error fetching simulators');
         }
+        results.forEach(s => { s.preview_image = previewUrl(req, s.preview_image); });
 
         // Get total count for pagination
         const countQuery = `SELECT COUNT(*) as total FROM simulators s WHERE 1=1${whereClause.includes('WHERE') ? ' AND ' + whereClause.split('WHERE')[1] : ''}`;
@@ -1571,6 +1755,7 @@ app.get('/api/simulators/:id', (req, res) => {
         }
 
         const simulator = results[0];
+        simulator.preview_image = previewUrl(req, simulator.preview_image);
 
         // Parse JSON fields
         try {
@@ -1624,7 +1809,7 @@ app.post('/api/simulators', authenticateToken, (req, res) => {
 
         db.query(
             insertQuery,
-            [creator_id, title, description || '', blocksJson, connectionsJson, tags || '', preview_image || '', is_public ? 1 : 0],
+            [creator_id, title, description || '', blocksJson, connectionsJson, tags || '', previewRef(preview_image) || '', is_public ? 1 : 0],
             (err, result) => {
                 if (err) {
                     console.error('❌ Database error:', err);
@@ -1677,7 +1862,7 @@ app.put('/api/simulators/:id', authenticateToken, (req, res) => {
             const params = [title, description];
             if (blocks) params.push(blocksJson);
             if (connections) params.push(connectionsJson);
-            params.push(tags, preview_image, is_public ? 1 : 0, simulatorId);
+            params.push(tags, previewRef(preview_image), is_public ? 1 : 0, simulatorId);
 
             db.query(updateQuery, params, (err) => {
                 if (err) {
@@ -1829,24 +2014,7 @@ app.post('/api/simulators/:id/ratings', authenticateToken, (req, res) => {
                 return apiResponse(res, 500, 'Error adding rating');
             }
 
-            // Recalculate average rating
-            db.query(
-                'SELECT AVG(rating) as avg_rating FROM simulator_ratings WHERE simulator_id = ?',
-                [simulatorId],
-                (ratingErr, ratingResults) => {
-                    if (!ratingErr && ratingResults.length > 0) {
-                        const avgRating = parseFloat(ratingResults[0].avg_rating).toFixed(2);
-                        db.query(
-                            'UPDATE simulators SET rating = ? WHERE id = ?',
-                            [avgRating, simulatorId],
-                            (updateErr) => {
-                                if (updateErr) console.error('Error updating rating:', updateErr);
-                            }
-                        );
-                    }
-                }
-            );
-
+            // simulators.rating is refreshed by simulator_aggregates.py instead of an AVG() per rating
             apiResponse(res, 201, 'Rating added successfully');
         }
     );
@@ -1922,8 +2090,20 @@ app.get('/api/simulators/:id/comments', (req, res) => {
 });
 
 // Get trending simulators
+// simulator_stats is kept current by simulator_aggregates.py, so this is a top-k read on
+// idx_trending; until that job has run, fall back to scoring every public simulator
 app.get('/api/simulators/trending/all', (req, res) => {
     const query = `
+        SELECT 
+            s.id, s.title, s.description, s.creator_id, s.tags, s.downloads, 
+            s.rating, s.is_public, s.created_at
+        FROM simulator_stats st
+        JOIN simulators s ON s.id = st.simulator_id
+        WHERE st.is_public = TRUE AND s.is_public = TRUE
+        ORDER BY st.trending_score DESC
+        LIMIT 10
+    `;
+    const fallbackQuery = `
         SELECT 
             id, title, description, creator_id, tags, downloads, 
             rating, is_public, created_at
@@ -1934,11 +2114,20 @@ app.get('/api/simulators/trending/all', (req, res) => {
     `;
 
     db.query(query, (err, results) => {
-        if (err) {
+        if (err && err.code !== 'ER_NO_SUCH_TABLE') {
             console.error('Error fetching trending simulators:', err);
             return apiResponse(res, 500, 'Error fetching trending simulators');
         }
-        apiResponse(res, 200, 'Trending simulators fetched successfully', results);
+        if (!err && results.length > 0) {
+            return apiResponse(res, 200, 'Trending simulators fetched successfully', results);
+        }
+        db.query(fallbackQuery, (fallbackErr, fallbackResults) => {
+            if (fallbackErr) {
+                console.error('Error fetching trending simulators:', fallbackErr);
+                return apiResponse(res, 500, 'Error fetching trending simulators');
+            }
+            apiResponse(res, 200, 'Trending simulators fetched successfully', fallbackResults);
+        });
     });
 });
 
@@ -2066,6 +2255,7 @@ app.get('/api/courses/:courseId/simulators', authenticateToken, (req, res) => {
             console.error('Error fetching course simulators:', err);
             return apiResponse(res, 500, 'Error fetching simulators');
         }
+        results.forEach(s => { s.preview_image = previewUrl(req, s.preview_image); });
         apiResponse(res, 200, 'Course simulators fetched successfully', results);
     });
 });
@@ -2164,13 +2354,42 @@ app.get('/api/simulators/:id/versions', (req, res) => {
     );
 });
 
+// add / remove / replace ops of a JSON patch, as written by simulator_version_history.py
+const applyJsonPatch = (doc, ops) => {
+    for (const op of ops || []) {
+        if (op.path === '') {
+            doc = op.value;
+            continue;
+        }
+        const tokens = op.path.split('/').slice(1).map(t => t.replace(/~1/g, '/').replace(/~0/g, '~'));
+        const last = tokens.pop();
+        const target = tokens.reduce((node, token) => node[token], doc);
+        if (Array.isArray(target)) {
+            const index = last === '-' ? target.length : Number(last);
+            if (op.op === 'add') target.splice(index, 0, op.value);
+            else if (op.op === 'remove') target.splice(index, 1);
+            else target[index] = op.value;
+        } else if (op.op === 'remove') {
+            delete target[last];
+        } else {
+            target[last] = op.value;
+        }
+    }
+    return doc;
+};
+
 // Get specific version
 app.get('/api/simulators/:id/versions/:versionNumber', (req, res) => {
     const simulatorId = req.params.id;
     const versionNumber = req.params.versionNumber;
 
+    // One round trip: a delta row comes back joined to its keyframe
     db.query(
-        'SELECT version_number, blocks, connections, created_at FROM simulator_versions WHERE simulator_id = ? AND version_number = ?',
+        `SELECT v.version_number, v.blocks, v.connections, v.created_at, v.storage, v.delta,
+                k.blocks AS base_blocks, k.connections AS base_connections
+         FROM simulator_versions v
+         LEFT JOIN simulator_versions k ON k.simulator_id = v.simulator_id AND k.version_number = v.base_version
+         WHERE v.simulator_id = ? AND v.version_number = ?`,
         [simulatorId, versionNumber],
         (err, results) => {
             if (err) {
@@ -2181,10 +2400,16 @@ app.get('/api/simulators/:id/versions/:versionNumber', (req, res) => {
                 return apiResponse(res, 404, 'Version not found');
             }
 
-            const version = results[0];
+            const { storage, delta, base_blocks, base_connections, ...version } = results[0];
             try {
-                version.blocks = JSON.parse(version.blocks);
-                version.connections = JSON.parse(version.connections);
+                if (storage === 'delta') {
+                    const patch = JSON.parse(delta);
+                    version.blocks = applyJsonPatch(JSON.parse(base_blocks), patch.blocks);
+                    version.connections = applyJsonPatch(JSON.parse(base_connections || '[]'), patch.connections);
+                } else {
+                    version.blocks = JSON.parse(version.blocks);
+                    version.connections = JSON.parse(version.connections);
+                }
             } catch (e) {
                 console.error('Error parsing version JSON:', e);
             }
@@ -2197,7 +2422,14 @@ app.get('/api/simulators/:id/versions/:versionNumber', (req, res) => {
 
 // ===== QUIZ QUESTIONS API =====
 
-// Create quiz question
+// course_questions has no updated_at: bump the course's instead, so jobs that refresh from
+// courses.updated_at (course_search_index.py, build_course_artifacts.py) pick up question edits
+const touchCourse = (courseId) => {
+    db.query('UPDATE courses SET updated_at = CURRENT_TIMESTAMP WHERE id = ?', [courseId], (err) => {
+        if (err) console.error('Error touching course', courseId, ':', err.message);
+    });
+};
+
 app.post('/api/courses/:courseId/questions', authenticateToken, (req, res) => {
     const courseId = req.params.courseId;
     const userId = req.user.id;
@@ -2232,22 +2464,64 @@ app.post('/api/courses/:courseId/questions', authenticateToken, (req, res) => {
                 console.error('Error creating question:', err);
                 return apiResponse(res, 500, 'Server error creating question');
             }
+            touchCourse(courseId);
             apiResponse(res, 201, 'Question created successfully', { questionId: result.insertId });
         });
     });
 });
 
 // Get all questions for a course
+// Per-student option order (quiz_variants.py): a seeded splitmix64 hash of (user, question) picks
+// one permutation of the stored options, so the order is stable per student without being stored
+const QUIZ_VARIANT_SECRET = process.env.QUIZ_VARIANT_SECRET || 'veelearn-quiz-variants';
+const QUIZ_VARIANT_SEED = require('crypto').createHash('sha256').update(QUIZ_VARIANT_SECRET).digest().readBigUInt64LE(0);
+const QUIZ_POOL_SIZE = 24;
+const MASK64 = (1n << 64n) - 1n;
+
+const splitmix64 = (x) => {
+    let z = (x + 0x9E3779B97F4A7C15n) & MASK64;
+    z = ((z ^ (z >> 30n)) * 0xBF58476D1CE4E5B9n) & MASK64;
+    z = ((z ^ (z >> 27n)) * 0x94D049BB133111EBn) & MASK64;
+    return z ^ (z >> 31n);
+};
+
+const factorial = (n) => (n <= 1 ? 1 : n * factorial(n - 1));
+
+const quizOptionOrder = (userId, questionId, n) => {
+    const questionKey = splitmix64(QUIZ_VARIANT_SEED ^ BigInt(questionId));
+    const poolSize = Math.min(factorial(n), QUIZ_POOL_SIZE);
+    let k = Number(splitmix64(questionKey ^ BigInt(userId)) % BigInt(poolSize));
+    const items = [...Array(n).keys()];
+    if (factorial(n) <= QUIZ_POOL_SIZE) {
+        // k-th lexicographic permutation
+        const order = [];
+        for (let i = n; i > 0; i--) {
+            const f = factorial(i - 1);
+            order.push(items.splice(Math.floor(k / f), 1)[0]);
+            k %= f;
+        }
+        return order;
+    }
+    let state = questionKey ^ BigInt(k);
+    for (let i = n - 1; i > 0; i--) {
+        state = splitmix64(state);
+        const j = Number(state % BigInt(i + 1));
+        [items[i], items[j]] = [items[j], items[i]];
+    }
+    return items;
+};
+
 app.get('/api/courses/:courseId/questions', authenticateToken, (req, res) => {
     const courseId = req.params.courseId;
     console.log(`DEBUG GET QUESTIONS: Course ${courseId}, User: ${req.user.id}, Role: ${req.user.role}`);
 
     const query = `
-        SELECT id, course_id, question_text, question_type, options, correct_answer, 
-               explanation, points, order_index, created_at
-        FROM course_questions
-        WHERE course_id = ?
-        ORDER BY order_index ASC, created_at ASC
+        SELECT q.id, q.course_id, q.question_text, q.question_type, q.options, q.correct_answer,
+               q.explanation, q.points, q.order_index, q.created_at, c.creator_id
+        FROM course_questions q
+        JOIN courses c ON c.id = q.course_id
+        WHERE q.course_id = ?
+        ORDER BY q.order_index ASC, q.created_at ASC
     `;
 
     db.query(query, [courseId], (err, results) => {
@@ -2256,7 +2530,7 @@ app.get('/api/courses/:courseId/questions', authenticateToken, (req, res) => {
             return apiResponse(res, 500, 'Server error fetching questions');
         }
 
-        // Parse options JSON
+        // Parse options JSON; students get their own option order, the course creator the stored one
         const questions = results.map(q => {
             if (q.options && typeof q.options === 'string') {
                 try {
@@ -2265,6 +2539,10 @@ app.get('/api/courses/:courseId/questions', authenticateToken, (req, res) => {
                     q.options = [];
                 }
             }
+            if (Array.isArray(q.options) && q.options.length > 1 && parseInt(q.creator_id) !== parseInt(req.user.id)) {
+                q.options = quizOptionOrder(req.user.id, q.id, q.options.length).map(i => q.options[i]);
+            }
+            delete q.creator_id;
             return q;
         });
 
@@ -2310,6 +2588,7 @@ app.put('/api/courses/:courseId/questions/:questionId', authenticateToken, (req,
             if (result.affectedRows === 0) {
                 return apiResponse(res, 404, 'Question not found');
             }
+            touchCourse(courseId);
             apiResponse(res, 200, 'Question updated successfully');
         });
     });
@@ -2341,6 +2620,7 @@ app.delete('/api/courses/:courseId/questions/:questionId', authenticateToken, (r
             if (result.affectedRows === 0) {
                 return apiResponse(res, 404, 'Question not found');
             }
+            touchCourse(courseId);
             apiResponse(res, 200, 'Question deleted successfully');
         });
     });
@@ -2386,7 +2666,10 @@ app.post('/api/courses/:courseId/questions/:questionId/answer', authenticateToke
     });
 });
 
-// Get user's attempts for a question
+// Get user's attempts for a question.
+// Attempts older than the retention window are archived by quiz_attempt_archive.py and
+// only survive as one user_quiz_attempt_rollups row, returned here as `archived`;
+// `truncated` says the `attempts` list is not the full history.
 app.get('/api/courses/:courseId/questions/:questionId/attempts', authenticateToken, (req, res) => {
     const { questionId } = req.params;
     const userId = req.user.id;
@@ -2403,7 +2686,78 @@ app.get('/api/courses/:courseId/questions/:questionId/attempts', authenticateTok
             console.error('Error fetching attempts:', err);
             return apiResponse(res, 500, 'Server error fetching attempts');
         }
-        apiResponse(res, 200, 'Attempts fetched successfully', results);
+        const rollupQuery = `
+            SELECT attempts, correct_attempts, best_is_correct, first_attempt_at, last_attempt_at
+            FROM user_quiz_attempt_rollups
+            WHERE user_id = ? AND question_id = ?
+        `;
+        db.query(rollupQuery, [userId, questionId], (rollupErr, rollups) => {
+            if (rollupErr && rollupErr.code !== 'ER_NO_SUCH_TABLE') {
+                console.error('Error fetching archived attempts:', rollupErr);
+                return apiResponse(res, 500, 'Server error fetching attempts');
+            }
+            const archived = !rollupErr && rollups.length > 0 ? {
+                attempts: rollups[0].attempts,
+                correct_attempts: rollups[0].correct_attempts,
+                best_is_correct: !!rollups[0].best_is_correct,
+                first_attempt_at: rollups[0].first_attempt_at,
+                last_attempt_at: rollups[0].last_attempt_at
+            } : null;
+            apiResponse(res, 200, 'Attempts fetched successfully', {
+                attempts: results,
+                archived,
+                truncated: archived !== null,
+                total_attempts: results.length + (archived ? archived.attempts : 0)
+            });
+        });
+    });
+});
+
+// Get item analysis for a course's questions (written nightly by quiz_item_analysis.py)
+app.get('/api/courses/:courseId/questions-analysis', authenticateToken, (req, res) => {
+    const { courseId } = req.params;
+    const userId = req.user.id;
+
+    db.query('SELECT creator_id FROM courses WHERE id = ?', [courseId], (err, results) => {
+        if (err) {
+            console.error('Error fetching course:', err);
+            return apiResponse(res, 500, 'Server error');
+        }
+        if (results.length === 0) {
+            return apiResponse(res, 404, 'Course not found');
+        }
+        if (parseInt(results[0].creator_id) !== parseInt(userId) && !['admin', 'superadmin'].includes(req.user.role)) {
+            return apiResponse(res, 403, 'You can only view analysis for your own courses');
+        }
+
+        const itemsQuery = `
+            SELECT question_id, attempts, correct, p_value, discrimination, distractors, analyzed_at
+            FROM quiz_item_analysis
+            WHERE course_id = ?
+        `;
+        db.query(itemsQuery, [courseId], (err, items) => {
+            if (err && err.code === 'ER_NO_SUCH_TABLE') {
+                // The analysis job has never run
+                return apiResponse(res, 200, 'No analysis available yet', { items: [], distribution: null });
+            }
+            if (err) {
+                console.error('Error fetching item analysis:', err);
+                return apiResponse(res, 500, 'Server error fetching item analysis');
+            }
+            db.query('SELECT users, mean_score, std_score, median_score, histogram, analyzed_at FROM quiz_course_score_distribution WHERE course_id = ?', [courseId], (err, distribution) => {
+                if (err) {
+                    console.error('Error fetching score distribution:', err);
+                    return apiResponse(res, 500, 'Server error fetching score distribution');
+                }
+                const parse = value => (typeof value === 'string' ? JSON.parse(value) : value);
+                items.forEach(item => { item.distractors = parse(item.distractors) || {}; });
+                const summary = distribution[0] || null;
+                if (summary) {
+                    summary.histogram = parse(summary.histogram) || [];
+                }
+                apiResponse(res, 200, 'Item analysis fetched successfully', { items, distribution: summary });
+            });
+        });
     });
 });
 
@@ -2531,56 +2885,23 @@ app.get('/api/users/volunteer-stats', authenticateToken, (req, res) => {
                         });
                     }
 
+                    // Missing milestones are issued by backfill_certificates.py (cron) and
+                    // update-volunteer-hours, never from this GET; just report what is pending
                     const maxMilestone = Math.floor(totalHours / 5) * 5;
-                    const existingHours = certs.map(c => Number(c.hours_certified));
-                    const missingMilestones = [];
+                    const existingHours = new Set(certs.map(c => Number(c.hours_certified)));
+                    const pendingMilestones = [];
                     for (let i = 5; i <= maxMilestone; i += 5) {
-                        if (!existingHours.includes(i)) {
-                            missingMilestones.push(i);
+                        if (!existingHours.has(i)) {
+                            pendingMilestones.push(i);
                         }
                     }
 
-                    if (missingMilestones.length > 0) {
-                        console.log(`Creating ${missingMilestones.length} missing certificates for user ${userId}:`, missingMilestones);
-                        const crypto = require('crypto');
-                        let inserted = 0;
-                        missingMilestones.forEach(milestone => {
-                            const verificationCode = crypto.randomBytes(16).toString('hex');
-                            db.query(
-                                'INSERT INTO certificates (user_id, certificate_type, hours_certified, verification_code) VALUES (?, ?, ?, ?)',
-                                [userId, 'volunteer_hours', milestone, verificationCode],
-                                (insertErr) => {
-                                    inserted++;
-                                    if (insertErr) console.error('Error creating certificate for milestone', milestone, insertErr.message);
-                                    else console.log(`✓ Created ${milestone}h certificate for user ${userId}`);
-
-                                    if (inserted === missingMilestones.length) {
-                                        db.query(
-                                            'SELECT * FROM certificates WHERE user_id = ? ORDER BY hours_certified ASC',
-                                            [userId],
-                                            (err3, allCerts) => {
-                                                if (err3) {
-                                                    console.error('volunteer-stats: re-fetch certs error:', err3.message);
-                                                    return apiResponse(res, 500, 'Server error');
-                                                }
-                                                apiResponse(res, 200, 'Stats retrieved', {
-                                                    total_volunteer_hours: totalHours,
-                                                    is_verified_creator: results[0].is_verified_creator,
-                                                    certificates: allCerts
-                                                });
-                                            }
-                                        );
-                                    }
-                                }
-                            );
-                        });
-                    } else {
-                        apiResponse(res, 200, 'Stats retrieved', {
-                            total_volunteer_hours: totalHours,
-                            is_verified_creator: results[0].is_verified_creator,
-                            certificates: certs
-                        });
-                    }
+                    apiResponse(res, 200, 'Stats retrieved', {
+                        total_volunteer_hours: totalHours,
+                        is_verified_creator: results[0].is_verified_creator,
+                        certificates: certs,
+                        pending_milestones: pendingMilestones
+                    });
                 }
             );
         }
@@ -2611,24 +2932,24 @@ app.post('/api/users/update-volunteer-hours', authenticateToken, authorize('admi
                 }
 
                 if (milestones.length > 0) {
-                    // Check existing certificates to avoid duplicates
+                    // One multi-row insert; NOT EXISTS skips milestones that are already issued
+                    const crypto = require('crypto');
+                    const rows = milestones.map(() => 'SELECT ? AS user_id, ? AS hours, ? AS code').join(' UNION ALL ');
+                    const params = [];
+                    milestones.forEach(milestone => {
+                        params.push(user_id, milestone, crypto.randomBytes(16).toString('hex'));
+                    });
                     db.query(
-                        'SELECT hours_certified FROM certificates WHERE user_id = ? AND certificate_type = "volunteer_hours"',
-                        [user_id],
-                        (certErr, existingCerts) => {
-                            if (!certErr) {
-                                const existingHours = existingCerts.map(c => c.hours_certified);
-
-                                milestones.forEach(milestone => {
-                                    if (!existingHours.includes(milestone)) {
-                                        const verificationCode = require('crypto').randomBytes(16).toString('hex');
-                                        db.query(
-                                            'INSERT INTO certificates (user_id, certificate_type, hours_certified, verification_code) VALUES (?, "volunteer_hours", ?, ?)',
-                                            [user_id, milestone, verificationCode]
-                                        );
-                                        console.log(`Issued volunteer certificate for ${milestone} hours to user ${user_id}`);
-                                    }
-                                });
+                        `INSERT INTO certificates (user_id, certificate_type, hours_certified, verification_code)
+                         SELECT m.user_id, 'volunteer_hours', m.hours, m.code FROM (${rows}) m
+                         WHERE NOT EXISTS (SELECT 1 FROM certificates c WHERE c.user_id = m.user_id
+                             AND c.certificate_type = 'volunteer_hours' AND c.hours_certified = m.hours)`,
+                        params,
+                        (certErr, certResult) => {
+                            if (certErr) {
+                                console.error('Error issuing volunteer certificates:', certErr.message);
+                            } else if (certResult.affectedRows > 0) {
+                                console.log(`Issued ${certResult.affectedRows} volunteer certificate(s) to user ${user_id}`);
                             }
                         }
                     );
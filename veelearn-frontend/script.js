@@ -22,6 +22,7 @@ let lastDeletedQuestion = null; // Store last deleted question for undo
 let savedSelection = null; // Save cursor position when editor loses focus
 
 let courseTimerInterval = null;
+let viewerRenderToken = 0; // Bumped by every course viewer render; stale section loads compare against it
 let courseActiveSeconds = 0;
 let lastActivityTime = Date.now();
 let isTimerActive = false;
@@ -1633,7 +1634,8 @@ function rejectCourse(courseId) {
 
 function loadUserCourses() {
   console.log("=== LOADING USER COURSES ===");
-  fetch(`${API_BASE_URL}/api/courses`, {
+  // Other courses' content is loaded by section when they are opened
+  fetch(`${API_BASE_URL}/api/courses?content=own`, {
     headers: { Authorization: `Bearer ${authToken}` },
   })
     .then((res) => res.json())
@@ -1655,7 +1657,8 @@ function loadUserCourses() {
 
 function loadAvailableCourses() {
   console.log("=== LOADING AVAILABLE COURSES ===");
-  fetch(`${API_BASE_URL}/api/courses`, {
+  // Other courses' content is loaded by section when they are opened
+  fetch(`${API_BASE_URL}/api/courses?content=own`, {
     headers: { Authorization: `Bearer ${authToken}` },
   })
     .then((res) => res.json())
@@ -1983,23 +1986,43 @@ async function viewCourse(courseId) {
 
   const viewerContent = document.getElementById("course-viewer-content");
 
-  // Split content into pages for viewer
-  const rawContent = course.content || "";
+  // Sectioned courses show one section per page, each downloaded when it is opened;
+  // otherwise split the full content into pages for viewer
+  const sections = await loadCourseSections(courseId);
   let viewerPages = [];
-  if (rawContent.includes('<hr class="page-break">')) {
-    viewerPages = rawContent.split('<hr class="page-break">');
+  if (sections.length > 0) {
+    viewerPages = sections.map(() => null);
   } else {
-    viewerPages = [rawContent];
+    const rawContent = (course.content != null ? course.content : await loadCourseContent(courseId)) || "";
+    if (rawContent.includes('<hr class="page-break">')) {
+      viewerPages = rawContent.split('<hr class="page-break">');
+    } else {
+      viewerPages = [rawContent];
+    }
   }
 
   let currentViewerPageIndex = 0;
 
-  const renderViewerPage = (index) => {
+  const renderViewerPage = async (index) => {
+    // Sections load asynchronously: a later click (or another course) may start a newer
+    // render while this one waits, and only the newest render may touch the page
+    const token = ++viewerRenderToken;
+    let pageHtml = viewerPages[index];
+    if (pageHtml === null) {
+      try {
+        pageHtml = await loadCourseSection(courseId, sections[index].section_index);
+        viewerPages[index] = pageHtml;
+      } catch (error) {
+        console.error('Error loading course section:', error);
+        pageHtml = `<p style="color: #c0392b;">This page could not be loaded. Go to another page and back to retry.</p>`;
+      }
+      if (token !== viewerRenderToken || index !== currentViewerPageIndex) return;
+    }
     viewerContent.innerHTML = `
          <h1>${course.title}</h1>
          <p><strong>Description:</strong> ${course.description || "No description"}</p>
          <div id="course-content-display" style="margin: 20px 0; position: relative; min-height: 400px;">
-             ${viewerPages[index] || "No content"}
+             ${pageHtml || "No content"}
          </div>
          <button onclick="showDashboard()" style="padding: 8px 16px; background: #667eea; color: white; border: none; border-radius: 4px; cursor: pointer;">Back to Dashboard</button>
      `;
@@ -2828,6 +2851,53 @@ async function loadCourseQuestions(courseId) {
   }
 }
 
+async function loadCourseSections(courseId) {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/courses/${courseId}/sections`, {
+      headers: {
+        'Authorization': `Bearer ${authToken}`
+      }
+    });
+
+    const result = await response.json();
+    return result.success ? result.data : [];
+  } catch (error) {
+    console.error('Error loading course sections:', error);
+    return [];
+  }
+}
+
+// Throws on failure so the viewer can show an error and refetch on the next visit
+async function loadCourseSection(courseId, sectionIndex) {
+  const response = await fetch(`${API_BASE_URL}/api/courses/${courseId}/sections/${sectionIndex}`, {
+    headers: {
+      'Authorization': `Bearer ${authToken}`
+    }
+  });
+
+  const result = await response.json();
+  if (!result.success) {
+    throw new Error(result.message || `Section ${sectionIndex} could not be loaded`);
+  }
+  return result.data.html;
+}
+
+async function loadCourseContent(courseId) {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/courses/${courseId}`, {
+      headers: {
+        'Authorization': `Bearer ${authToken}`
+      }
+    });
+
+    const result = await response.json();
+    return result.success ? result.data.content : "";
+  } catch (error) {
+    console.error('Error loading course content:', error);
+    return "";
+  }
+}
+
 function hydrateQuizPlaceholders() {
   const viewerContent = document.getElementById('course-viewer-content');
   if (!viewerContent) {